@@ -0,0 +1,208 @@
+"""
+Headless loader for main.py, used by the scripts in this folder.
+
+Copies the app into a scratch directory (so tasks.json, session_logs.json and
+data/ are never touched) and installs a minimal in-memory stand-in for rumps,
+so the app can be constructed and ticked without a menu bar or a Cocoa run loop.
+"""
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import types
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Files main.py reads from its own directory
+APP_FILES = ["main.py", "settings.json"]
+
+
+class SetterCounter:
+    """Counts title/visibility writes that reach the (fake) Cocoa objects"""
+
+    def __init__(self):
+        self.titles = 0
+        self.hidden = 0
+
+    def reset(self):
+        self.titles = 0
+        self.hidden = 0
+
+
+SETTERS = SetterCounter()
+
+
+def _build_rumps():
+    rumps = types.ModuleType("rumps")
+    rumps.separator = None
+    rumps.notifications = []
+
+    class _NSMenuItem:
+        def __init__(self):
+            self.hidden = False
+
+        def setHidden_(self, hidden):
+            SETTERS.hidden += 1
+            self.hidden = hidden
+
+    class _NSMenu:
+        def removeAllItems(self):
+            pass
+
+    class MenuItem:
+        def __init__(self, title, callback=None, key=None, icon=None):
+            self._title = str(title)
+            self.callback = callback
+            self._menuitem = _NSMenuItem()
+            # Like rumps, the submenu only exists once the first item is added
+            self._menu = None
+            self._items = {}
+
+        @property
+        def title(self):
+            return self._title
+
+        @title.setter
+        def title(self, value):
+            SETTERS.titles += 1
+            self._title = value
+
+        def __setitem__(self, key, value):
+            if value is None:
+                value = MenuItem("-")
+            self._ensure_menu()
+            self._items[key] = value
+
+        def _ensure_menu(self):
+            if self._menu is None:
+                self._menu = _NSMenu()
+
+        def __getitem__(self, key):
+            return self._items[key]
+
+        def __delitem__(self, key):
+            del self._items[key]
+
+        def __contains__(self, key):
+            return key in self._items
+
+        def __iter__(self):
+            return iter(self._items)
+
+        def keys(self):
+            return list(self._items)
+
+        def values(self):
+            return list(self._items.values())
+
+        def get(self, key, default=None):
+            return self._items.get(key, default)
+
+        def add(self, item):
+            self._ensure_menu()
+            if item is None:
+                self._items["-%d" % len(self._items)] = MenuItem("-")
+            else:
+                self._items[item.title] = item
+
+        def update(self, items):
+            for item in items:
+                self.add(item)
+
+        def insert_after(self, existing_key, item):
+            self._ensure_menu()
+            self._items[item.title] = item
+
+        def insert_before(self, existing_key, item):
+            self._ensure_menu()
+            self._items[item.title] = item
+
+        def clear(self):
+            # Raises AttributeError on a never-populated item, as rumps does
+            self._menu.removeAllItems()
+            self._items.clear()
+
+    class App:
+        def __init__(self, name, title=None, icon=None, quit_button="Quit"):
+            self.name = name
+            self._title = title or name
+            self._menu = MenuItem(name)
+
+        @property
+        def title(self):
+            return self._title
+
+        @title.setter
+        def title(self, value):
+            SETTERS.titles += 1
+            self._title = value
+
+        @property
+        def menu(self):
+            return self._menu
+
+        @menu.setter
+        def menu(self, items):
+            self._menu.update(items)
+
+        def run(self):
+            pass
+
+    class Timer:
+        def __init__(self, callback, interval):
+            self.callback = callback
+            self.interval = interval
+            self._alive = False
+
+        def start(self):
+            self._alive = True
+
+        def stop(self):
+            self._alive = False
+
+        def is_alive(self):
+            return self._alive
+
+    class Window:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def run(self):
+            return types.SimpleNamespace(clicked=0, text="")
+
+    def timer(interval):
+        def decorator(f):
+            return f
+        return decorator
+
+    def notification(title, subtitle, message, **kwargs):
+        rumps.notifications.append((title, subtitle, message))
+
+    rumps.MenuItem = MenuItem
+    rumps.App = App
+    rumps.Timer = Timer
+    rumps.Window = Window
+    rumps.timer = timer
+    rumps.notification = notification
+    rumps.alert = lambda *args, **kwargs: 1
+    rumps.quit_application = lambda *args, **kwargs: None
+    return rumps
+
+
+def load_main(workdir=None):
+    """Import a scratch copy of main.py with rumps replaced; returns (module, workdir)"""
+    if workdir is None:
+        workdir = tempfile.mkdtemp(prefix="pomodoro-bench-")
+    for name in os.listdir(REPO_DIR):
+        if name in APP_FILES or name.endswith(".html"):
+            shutil.copy(os.path.join(REPO_DIR, name), workdir)
+
+    sys.modules["rumps"] = _build_rumps()
+    spec = importlib.util.spec_from_file_location("main", os.path.join(workdir, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["main"] = module
+    spec.loader.exec_module(module)
+    # Keep notifications in memory (module.NOTIFIER.backend.sent) instead of calling osascript
+    module.NOTIFIER.set_backend(module.RecordingNotificationBackend())
+    return module, workdir
@@ -0,0 +1,272 @@
+"""
+Load test for the local server's JSON endpoints.
+
+Fills a scratch copy of the app with synthetic tasks and session logs, starts the
+local server headless and hammers it from --concurrency keep-alive clients, while
+this script's main thread plays the app's run loop: it applies queued state
+changes (MainThreadCommands.drain, as the AppHelper.callAfter wake-up would) and
+flushes the coalesced menu refresh once a second (as the tick would).
+
+Reports throughput, latency percentiles and errors per endpoint, and how many
+times each data file was opened for reading and writing - where per-request
+rewrites of tasks.json or re-reads of the session log start to dominate.
+
+    python benchmarks/load_test.py [--concurrency N] [--requests N] [--tasks N]
+                                   [--sessions N] [--history N] [--batch-size N]
+                                   [--endpoints create,save,...] [--port PORT]
+"""
+import argparse
+import builtins
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from headless import load_main
+
+PRIORITIES = ["High", "Medium", "Low"]
+
+DEFAULT_ENDPOINTS = ["create", "create_batch", "save", "settings", "sessions_today"]
+
+# How often the fake run loop looks for queued commands; the real app is woken at once
+DRAIN_INTERVAL_SECONDS = 0.001
+
+
+def synthetic_task(n, created_at):
+    return {
+        'id': str(uuid.uuid4()),
+        'name': f"Synthetic task {n}",
+        'priority': PRIORITIES[n % len(PRIORITIES)],
+        'created_at': created_at.isoformat(),
+        'status': 'active',
+        'repeat_number': 1 if n % 5 == 0 else None,
+        'repeat_unit': 'day' if n % 5 == 0 else None,
+        'allowed_days': None,
+        'last_completed': None
+    }
+
+
+def synthetic_session(n, task, start):
+    return {
+        'id': str(uuid.uuid4()),
+        'task_id': task['id'],
+        'task_name': task['name'],
+        'priority': task['priority'],
+        'session_type': 'WORK',
+        'session_number': n % 8 + 1,
+        'start_time': start.isoformat(),
+        'end_time': (start + timedelta(minutes=25)).isoformat(),
+        'duration_minutes': 25,
+        'duration_seconds': 1500,
+        'mood': '💪',
+        'reflection': f"Synthetic reflection {n}",
+        'blockers': '',
+        'completed': True,
+        'logged_at': (start + timedelta(minutes=25)).isoformat()
+    }
+
+
+def write_fixtures(workdir, task_count, today_count, history_count):
+    """tasks.json, session_logs_today.json and session_logs_history.json; returns the tasks"""
+    now = datetime.now()
+    tasks = [synthetic_task(n, now - timedelta(days=n % 90)) for n in range(task_count)]
+    # Today's sessions all start after midnight so the app doesn't archive them on load
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    today = [synthetic_session(n, tasks[n % task_count], midnight + timedelta(seconds=n * (now - midnight).seconds // max(today_count, 1)))
+             for n in range(today_count)]
+    history = [synthetic_session(n, tasks[n % task_count], midnight - timedelta(hours=1 + n))
+               for n in range(history_count)]
+    for name, data in (("tasks.json", {'tasks': tasks}),
+                       ("session_logs_today.json", {'sessions': today}),
+                       ("session_logs_history.json", {'sessions': history})):
+        with open(os.path.join(workdir, name), 'w') as f:
+            json.dump(data, f, indent=2)
+    return tasks
+
+
+class FileCounter:
+    """Counts open() calls made by main.py, per file and mode (read/write)"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def install(self, module):
+        def counting_open(file, mode='r', *args, **kwargs):
+            kind = 'write' if any(c in mode for c in 'wax+') else 'read'
+            name = os.path.basename(os.fspath(file)).removesuffix('.tmp')
+            with self._lock:
+                self.counts[(name, kind)] += 1
+            return builtins.open(file, mode, *args, **kwargs)
+        # Module globals shadow builtins, so this catches every open() in main.py
+        module.open = counting_open
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+
+
+class Client:
+    """One keep-alive connection; builds and sends requests for the chosen endpoints"""
+
+    def __init__(self, port, task_ids, batch_size, rng):
+        self.connection = http.client.HTTPConnection('localhost', port, timeout=30)
+        self.task_ids = task_ids
+        self.batch_size = batch_size
+        self.rng = rng
+
+    def request(self, endpoint):
+        if endpoint == 'create':
+            return self._send('POST', '/create', {'name': self._name(), 'priority': self.rng.choice(PRIORITIES)})
+        if endpoint == 'create_batch':
+            tasks = [{'name': self._name(), 'priority': self.rng.choice(PRIORITIES)} for _ in range(self.batch_size)]
+            return self._send('POST', '/create_batch', {'tasks': tasks})
+        if endpoint == 'save':
+            return self._send('POST', '/save', {'id': self.rng.choice(self.task_ids), 'name': self._name(),
+                                                'priority': self.rng.choice(PRIORITIES)})
+        if endpoint == 'settings':
+            return self._send('GET', '/settings')
+        if endpoint == 'sessions_today':
+            return self._send('GET', '/api/sessions/today')
+        raise ValueError(endpoint)
+
+    def _name(self):
+        return f"Load task {self.rng.getrandbits(32):08x}"
+
+    def _send(self, method, path, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body else {}
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()  # Reconnects on the next request
+            return None
+
+
+def run_clients(port, endpoints, total, concurrency, task_ids, batch_size, seed):
+    """Start clients sharing total requests (endpoints round-robin); returns (threads, {endpoint: [(latency, status)]})"""
+    results = {endpoint: [] for endpoint in endpoints}
+    results_lock = threading.Lock()
+    counter = iter(range(total))
+    counter_lock = threading.Lock()
+
+    def worker(index):
+        client = Client(port, task_ids, batch_size, random.Random(seed + index))
+        local = []
+        while True:
+            with counter_lock:
+                n = next(counter, None)
+            if n is None:
+                break
+            endpoint = endpoints[n % len(endpoints)]
+            started = time.perf_counter()
+            status = client.request(endpoint)
+            local.append((endpoint, time.perf_counter() - started, status))
+        client.connection.close()
+        with results_lock:
+            for endpoint, latency, status in local:
+                results[endpoint].append((latency, status))
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel clients (default: 8)")
+    parser.add_argument("--requests", type=int, default=2000, help="total requests (default: 2000)")
+    parser.add_argument("--tasks", type=int, default=500, help="tasks in tasks.json (default: 500)")
+    parser.add_argument("--sessions", type=int, default=50, help="sessions logged today (default: 50)")
+    parser.add_argument("--history", type=int, default=5000, help="sessions in the history log (default: 5000)")
+    parser.add_argument("--batch-size", type=int, default=10, help="tasks per /create_batch (default: 10)")
+    parser.add_argument("--endpoints", default=",".join(DEFAULT_ENDPOINTS),
+                        help=f"comma-separated mix, sent round-robin (default: {','.join(DEFAULT_ENDPOINTS)})")
+    parser.add_argument("--port", type=int, default=7979, help="port for the local server (default: 7979)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the request payloads")
+    args = parser.parse_args()
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(endpoints) - set(DEFAULT_ENDPOINTS)
+    if unknown or not endpoints:
+        parser.error(f"--endpoints must be taken from {', '.join(DEFAULT_ENDPOINTS)}")
+    if args.concurrency < 1 or args.requests < 1 or args.tasks < 1:
+        parser.error("--concurrency, --requests and --tasks must be at least 1")
+
+    module, workdir = load_main()
+    tasks = write_fixtures(workdir, args.tasks, args.sessions, args.history)
+    files = FileCounter()
+    files.install(module)
+
+    app = module.PomodoroMenuBarApp()
+    module.NOTIFIER.set_backend(module.RecordingNotificationBackend())  # settings.json may pick another
+    app.server_port = args.port
+    app.start_server()
+    if app.httpd is None:
+        print(f"FAIL: could not start the server on port {args.port}")
+        return 1
+    app.refresh_scheduler.flush()
+    files.reset()
+
+    print(f"{args.requests} requests, {args.concurrency} clients, endpoints: {', '.join(endpoints)}")
+    print(f"fixtures: {args.tasks} tasks, {args.sessions} sessions today, {args.history} in history")
+
+    started = time.perf_counter()
+    threads, results = run_clients(args.port, endpoints, args.requests, args.concurrency,
+                                   [t['id'] for t in tasks], args.batch_size, args.seed)
+    # The app's main thread: apply queued commands right away, refresh the menu once a second
+    drains = commands = refreshes = 0
+    next_flush = started + 1
+    while any(thread.is_alive() for thread in threads):
+        ran = app.commands.drain()
+        if ran:
+            drains += 1
+            commands += ran
+        if time.perf_counter() >= next_flush:
+            refreshes += app.refresh_scheduler.flush()
+            next_flush += 1
+        if not ran:
+            time.sleep(DRAIN_INTERVAL_SECONDS)
+    elapsed = time.perf_counter() - started
+    refreshes += app.refresh_scheduler.flush()
+    app.stop_server()
+
+    total = sum(len(r) for r in results.values())
+    errors = sum(1 for r in results.values() for _, status in r if status is None or status >= 400)
+    print(f"\nthroughput: {total / elapsed:.0f} req/s over {elapsed:.2f}s ({errors} errors)")
+    print(f"{'endpoint':<16}{'count':>7}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}")
+    for endpoint in endpoints:
+        latencies = sorted(latency * 1000 for latency, _ in results[endpoint])
+        endpoint_errors = sum(1 for _, status in results[endpoint] if status is None or status >= 400)
+        print(f"{endpoint:<16}{len(latencies):>7}{len(latencies) / elapsed:>9.0f}"
+              f"{percentile(latencies, 50):>9.1f}{percentile(latencies, 90):>9.1f}"
+              f"{percentile(latencies, 99):>9.1f}{(latencies[-1] if latencies else 0):>9.1f}{endpoint_errors:>8}")
+
+    print(f"\nmain thread: {commands} commands in {drains} drains "
+          f"({commands / max(drains, 1):.1f} per transaction), {refreshes} menu refreshes")
+    print(f"tasks at the end: {len(app.task_manager.tasks)}")
+    print("file opens by main.py:")
+    for (name, kind), count in sorted(files.counts.items()):
+        print(f"  {name:<28}{kind:<6}{count:>7}")
+    print(f"scratch dir: {workdir}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Allocation benchmark for the 1 second update_timer tick.
+
+Runs the tick headless on a fake clock through a dynamic schedule WORK session
+with a task selected, and exits with status 1 when a steady-state tick (same
+minute as the previous one):
+  - allocates more than the budget at its peak,
+  - keeps growing memory (second half of the run retains more than one tick's budget),
+  - or writes a menu title/visibility that did not change.
+
+    python benchmarks/tick_alloc.py [--ticks N] [--budget BYTES]
+"""
+import argparse
+import array
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from headless import SETTERS, load_main
+
+# A TickSnapshot, a few floats and an int or two; string formatting or strptime blow past this
+DEFAULT_BUDGET_BYTES = 1024
+
+ONE_SECOND = timedelta(seconds=1)
+
+# Ticks must stay inside the first 25 minute WORK session (where nothing on screen changes)
+MAX_TICKS = 1400
+
+
+class FakeClock(datetime):
+    """datetime whose now() returns a value the benchmark controls"""
+    current = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=600, help="ticks to measure (default: 600)")
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET_BYTES,
+                        help=f"peak bytes allowed per steady-state tick (default: {DEFAULT_BUDGET_BYTES})")
+    args = parser.parse_args()
+    if not 0 < args.ticks <= MAX_TICKS:
+        parser.error(f"--ticks must be between 1 and {MAX_TICKS}")
+
+    module, workdir = load_main()
+    module.datetime = FakeClock
+
+    # Saturday evening: no fixed schedule, so only the dynamic schedule drives the tick
+    FakeClock.current = FakeClock(2026, 1, 3, 19, 0, 0)
+    app = module.PomodoroMenuBarApp()
+    app.current_task = app.task_manager.add_task("Benchmark task", "High")
+    module.generate_dynamic_schedule(FakeClock.current)
+
+    # Warm-up: session start, first menu refresh, caches filled
+    for _ in range(5):
+        app.update_timer(None)
+        FakeClock.current = FakeClock.current + ONE_SECOND
+
+    gc.collect()
+    gc.disable()
+    # Preallocated so the benchmark's own bookkeeping doesn't show up as retained memory
+    peaks = array.array('q', bytes(8 * args.ticks))
+    steady_flags = array.array('b', bytes(args.ticks))
+    redundant_writes = 0
+    tracemalloc.start()
+    start_current, _ = tracemalloc.get_traced_memory()
+    half_current = start_current
+    for i in range(args.ticks):
+        if i == args.ticks // 2:
+            half_current, _ = tracemalloc.get_traced_memory()
+        previous_minute = FakeClock.current.minute
+        FakeClock.current = FakeClock.current + ONE_SECOND
+        steady = FakeClock.current.minute == previous_minute
+
+        SETTERS.reset()
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        app.update_timer(None)
+        _, peak = tracemalloc.get_traced_memory()
+
+        peaks[i] = peak - before
+        steady_flags[i] = steady
+        if steady:
+            redundant_writes += SETTERS.titles + SETTERS.hidden
+
+    end_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.enable()
+
+    retained = end_current - start_current
+    growth = end_current - half_current
+    boundary_peaks = [p for p, s in zip(peaks, steady_flags) if not s]
+    peaks = sorted(p for p, s in zip(peaks, steady_flags) if s)
+    print(f"ticks: {args.ticks} ({len(peaks)} steady, {len(boundary_peaks)} on a minute boundary)")
+    print(f"steady-state peak bytes/tick: median {peaks[len(peaks) // 2]}, max {peaks[-1]} (budget {args.budget})")
+    if boundary_peaks:
+        print(f"minute-boundary peak bytes/tick: max {max(boundary_peaks)}")
+    print(f"retained bytes after {args.ticks} ticks: {retained} (second half: {growth})")
+    print(f"redundant title/visibility writes: {redundant_writes}")
+    print(f"scratch dir: {workdir}")
+
+    failures = []
+    if peaks[-1] > args.budget:
+        failures.append(f"steady-state tick peaked at {peaks[-1]} bytes (budget {args.budget})")
+    if growth > args.budget:
+        failures.append(f"memory grew by {growth} bytes over the last {args.ticks - args.ticks // 2} ticks")
+    if redundant_writes:
+        failures.append(f"{redundant_writes} setter calls for unchanged values")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
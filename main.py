@@ -11,378 +11,1190 @@ import time
 import os
 import webbrowser
 import json
+import copy
+import re
+import gzip
+import mimetypes
+import html
 import uuid
+import socket
+import difflib
+import heapq
 import threading
+import asyncio
+import calendar
+import queue
 import signal
 import atexit
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse, parse_qs
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http import HTTPStatus
+from http.server import DEFAULT_ERROR_MESSAGE, DEFAULT_ERROR_CONTENT_TYPE
+from urllib.parse import urlparse, parse_qs, unquote
+from email.utils import formatdate, parsedate_to_datetime
 
 # Global reference to app for server callbacks
 APP_INSTANCE = None
 
-class TaskServer(BaseHTTPRequestHandler):
-    """Simple HTTP server to handle HTML form interactions"""
-    
-    def do_GET(self):
-        """Serve the edit task HTML page"""
-        parsed_path = urlparse(self.path)
-        
-        if parsed_path.path == '/edit':
-            # Get task ID from query params
-            query = parse_qs(parsed_path.query)
-            task_id = query.get('id', [None])[0]
-            
-            if not task_id or not APP_INSTANCE:
-                self.send_error(400, "Missing task ID or app instance")
-                return
-            
-            # Find task
-            task = None
-            for t in APP_INSTANCE.task_manager.tasks:
-                if t['id'] == task_id:
-                    task = t
-                    break
-            
-            if not task:
-                self.send_error(404, "Task not found")
-                return
-            
-            # Read template
-            try:
-                with open(os.path.join(os.path.dirname(__file__), 'edit_task.html'), 'r') as f:
-                    html_content = f.read()
-                
-                # Inject task data into HTML
-                # We'll use simple string replacement for now
-                # In a real app, we'd use a template engine
-                
-                # Prepare data for injection
-                repeat_num = str(task.get('repeat_number') or '')
-                repeat_unit = task.get('repeat_unit') or ''
-                allowed_days = task.get('allowed_days') or []
-                
-                # Checkboxes for days
-                days_js = json.dumps(allowed_days)
-                
-                html_content = html_content.replace('{{TASK_ID}}', task['id'])
-                html_content = html_content.replace('{{TASK_NAME}}', task['name'])
-                html_content = html_content.replace('{{TASK_PRIORITY}}', task['priority'])
-                html_content = html_content.replace('{{REPEAT_NUMBER}}', repeat_num)
-                html_content = html_content.replace('{{REPEAT_UNIT}}', repeat_unit)
-                html_content = html_content.replace('{{ALLOWED_DAYS}}', days_js)
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(html_content.encode('utf-8'))
-                
-            except Exception as e:
-                self.send_error(500, f"Error serving template: {e}")
-                
-        elif parsed_path.path == '/add':
-            # Serve the add task HTML page
-            try:
-                with open(os.path.join(os.path.dirname(__file__), 'add.html'), 'r') as f:
-                    html_content = f.read()
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(html_content.encode('utf-8'))
-                
-            except Exception as e:
-                self.send_error(500, f"Error serving add page: {e}")
-                
-        elif parsed_path.path == '/paste':
-            # Serve the paste task HTML page
-            try:
-                with open(os.path.join(os.path.dirname(__file__), 'paste_task.html'), 'r') as f:
-                    html_content = f.read()
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(html_content.encode('utf-8'))
-                
-            except Exception as e:
-                self.send_error(500, f"Error serving paste page: {e}")
-        
-        elif parsed_path.path == '/settings_page':
-            # Serve the settings HTML page
-            try:
-                with open(os.path.join(os.path.dirname(__file__), 'settings.html'), 'r') as f:
-                    html_content = f.read()
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(html_content.encode('utf-8'))
-                
-            except Exception as e:
-                self.send_error(500, f"Error serving settings page: {e}")
-        
-        elif parsed_path.path == '/settings':
-            # Return current settings as JSON
-            try:
-                if APP_INSTANCE:
-                    settings = APP_INSTANCE.settings_manager.settings
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps(settings).encode('utf-8'))
-                else:
-                    self.send_error(500, "App instance not available")
-            except Exception as e:
-                self.send_error(500, f"Error getting settings: {e}")
-        
-        elif parsed_path.path == '/history':
-            # Serve the session history HTML page
+# {{NAME}} (or {{ NAME }}) placeholders in the HTML templates
+TEMPLATE_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+def script_json(value):
+    """value as JSON that is safe to put inside a <script> block (no </script>, <!-- or entities)"""
+    return json.dumps(value).replace('<', '\\u003c').replace('>', '\\u003e').replace('&', '\\u0026')
+
+
+class CompiledTemplate:
+    """An HTML template split at its placeholders, so rendering is a single join.
+
+    parts alternates literal text and placeholder names ([text, name, text, ...]);
+    body/gzip_body are the encoded template as-is, for pages without placeholders.
+    """
+
+    def __init__(self, text, mtime_ns):
+        self.mtime_ns = mtime_ns
+        self.parts = TEMPLATE_PLACEHOLDER.split(text)
+        self.names = self.parts[1::2]
+        self.body = text.encode('utf-8')
+        self._gzip_body = None
+
+    @property
+    def gzip_body(self):
+        """Gzipped body, compressed on first use and kept with the template"""
+        if self._gzip_body is None:
+            self._gzip_body = gzip.compress(self.body)
+        return self._gzip_body
+
+    def render(self, values):
+        """Fill in placeholders from values (unknown ones are left as they were)"""
+        parts = self.parts[:]
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            parts[i] = values[name] if name in values else "{{" + name + "}}"
+        return "".join(parts)
+
+
+class TemplateCache:
+    """HTML templates kept in memory and re-read only when their file's mtime changes"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """CompiledTemplate for name (raises OSError if the file is missing)"""
+        path = os.path.join(self.directory, name)
+        mtime_ns = os.stat(path).st_mtime_ns
+        template = self._templates.get(name)
+        if template is not None and template.mtime_ns == mtime_ns:
+            return template
+        
+        with open(path, 'r', encoding='utf-8') as f:
+            template = CompiledTemplate(f.read(), mtime_ns)
+        with self._lock:
+            self._templates[name] = template
+        return template
+
+
+TEMPLATES = TemplateCache(os.path.dirname(os.path.abspath(__file__)))
+
+# Folders (next to main.py) served as static files, besides the top-level HTML pages
+STATIC_DIRS = ('videos', 'screenshots')
+
+
+class EventBroadcaster:
+    """Fan-out of live app events to the /api/events streams (Server-Sent Events).
+
+    Streams run on the local server's event loop, each with its own bounded asyncio
+    queue. publish() may be called from any thread: it serializes an event once and
+    hands it to the loop with call_soon_threadsafe, so it never blocks. A stream that
+    falls behind loses its oldest events instead of holding up the timer tick.
+    """
+
+    QUEUE_SIZE = 100
+    KEEPALIVE_SECONDS = 15  # Comment line sent on quiet streams so proxies/browsers keep them open
+
+    def __init__(self):
+        self._subscribers = []  # (loop, asyncio.Queue)
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        """Whether any stream is listening (publishers skip building events otherwise)"""
+        return bool(self._subscribers)
+
+    @staticmethod
+    def format(event, data):
+        """One SSE message"""
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+
+    def subscribe(self, loop):
+        """Queue receiving every published message, to be read on loop"""
+        subscription = asyncio.Queue(self.QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.append((loop, subscription))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s[1] is not subscription]
+
+    @staticmethod
+    def _offer(subscription, message):
+        if subscription.full():
+            subscription.get_nowait()  # Drop the oldest
+        subscription.put_nowait(message)
+
+    def publish(self, event, data):
+        if not self._subscribers:
+            return
+        message = self.format(event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, subscription in subscribers:
             try:
-                with open(os.path.join(os.path.dirname(__file__), 'history_today.html'), 'r') as f:
-                    html_content = f.read()
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(html_content.encode('utf-8'))
-                
-            except Exception as e:
-                self.send_error(500, f"Error serving history page: {e}")
-        
-        elif parsed_path.path == '/api/sessions/today':
-            # Return today's session logs as JSON
+                loop.call_soon_threadsafe(self._offer, subscription, message)
+            except RuntimeError:
+                pass  # Server loop already closed
+
+
+EVENTS = EventBroadcaster()
+
+
+class HttpRequest:
+    """A parsed request: method, path, query (parse_qs dict), headers (lower-case names) and body"""
+
+    def __init__(self, method, target, version, headers, body=b''):
+        self.method = method
+        self.version = version
+        parsed = urlparse(target)
+        self.path = parsed.path
+        self.query = parse_qs(parsed.query)
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        """Body parsed as JSON ({} when empty); raises ValueError"""
+        return json.loads(self.body.decode('utf-8')) if self.body else {}
+
+    def accepts_gzip(self):
+        return 'gzip' in self.headers.get('accept-encoding', '')
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return 'keep-alive' in connection
+        return 'close' not in connection
+
+
+class HttpResponse:
+    """What a route returns: a complete body, a file range or a stream.
+
+    file is (path, offset, length) and is sent with sendfile; stream is an async
+    iterator of bytes, sent with chunked transfer encoding.
+    """
+
+    def __init__(self, body=b'', content_type='text/plain', status=200, headers=None, file=None, stream=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.body = body
+        self.content_type = content_type
+        self.status = status
+        self.headers = headers or {}
+        self.file = file
+        self.stream = stream
+
+    @classmethod
+    def json(cls, data, status=200, headers=None):
+        return cls(json.dumps(data), 'application/json', status, headers)
+
+    @classmethod
+    def error(cls, status, message=None):
+        """Error page in the same format http.server used"""
+        status = HTTPStatus(status)
+        body = DEFAULT_ERROR_MESSAGE % {
+            'code': status.value,
+            'message': html.escape(message or status.phrase, quote=False),
+            'explain': html.escape(status.description, quote=False),
+        }
+        return cls(body, DEFAULT_ERROR_CONTENT_TYPE, status.value)
+
+
+class LocalServer:
+    """Local HTTP/1.1 server running on one asyncio event loop.
+
+    Connections are kept alive and served by coroutines, so open tabs and /api/events
+    streams don't cost a thread each. Requests go to the route table of handler_class
+    (see TaskServer): plain handlers run on a small thread pool, since they may wait
+    for the main thread; coroutine handlers (streams) run on the loop itself.
+
+    The socket is bound in __init__. serve_until_idle() runs the loop and returns once
+    no request has arrived for idle_timeout seconds (0 = never) or close() is called.
+    """
+
+    timeout = 1  # How often serve_until_idle checks for idleness / close()
+    KEEPALIVE_TIMEOUT = 30  # Close keep-alive connections idle for this many seconds
+    MAX_HEADER_BYTES = 64 * 1024
+    MAX_BODY_BYTES = 10 * 1024 * 1024
+    WORKERS = 8
+
+    def __init__(self, server_address, handler_class, idle_timeout=0):
+        self.socket = socket.create_server(server_address)
+        self.handler = handler_class(self)
+        self.idle_timeout = idle_timeout
+        self.last_activity = time.monotonic()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._connections = set()
+
+    def touch(self):
+        """Record activity; returns False if the server has already shut down"""
+        with self._lock:
+            if self._closed:
+                return False
+            self.last_activity = time.monotonic()
+            return True
+
+    def close(self):
+        """Stop serving (takes effect within `timeout` seconds)"""
+        with self._lock:
+            self._closed = True
+
+    def serve_until_idle(self):
+        executor = ThreadPoolExecutor(self.WORKERS, thread_name_prefix='local-server')
+        try:
+            return asyncio.run(self._serve(executor))
+        finally:
+            executor.shutdown(wait=False)
+
+    async def _serve(self, executor):
+        asyncio.get_running_loop().set_default_executor(executor)
+        server = await asyncio.start_server(self._handle_connection, sock=self.socket, limit=self.MAX_HEADER_BYTES)
+        while True:
+            await asyncio.sleep(self.timeout)
+            with self._lock:
+                idle = self.idle_timeout and time.monotonic() - self.last_activity > self.idle_timeout
+                if idle or self._closed:
+                    # Close the socket under the lock so touch() == False means the port is free
+                    self._closed = True
+                    server.close()
+                    break
+        for connection in list(self._connections):
+            connection.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        return bool(idle)
+
+    async def _handle_connection(self, reader, writer):
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        # asyncio only disables Nagle for sockets created with IPPROTO_TCP, which accepted ones
+        # aren't; without this a small keep-alive response waits ~40ms for the client's delayed ACK
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader, writer), self.KEEPALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except ValueError as e:
+                    await self._write_response(reader, writer, None, HttpResponse.error(400, str(e)), False)
+                    break
+                if request is None:
+                    break  # Client closed the connection between requests
+
+                self.touch()
+                response = await self.handler.dispatch(request)
+                keep_alive = request.keep_alive and not self._closed
+                await self._write_response(reader, writer, request, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # Client went away (e.g. seeking a video, closing a page)
+        except asyncio.CancelledError:
+            pass  # Server shutting down; end quietly instead of as a cancelled task
+        finally:
+            self._connections.discard(connection)
+            writer.close()
+
+    async def _read_request(self, reader, writer):
+        """Next request on the connection, None at a clean EOF; ValueError if malformed"""
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as e:
+            if not e.partial.strip():
+                return None
+            raise
+        except asyncio.LimitOverrunError:
+            raise ValueError("Request headers too large")
+
+        lines = head.decode('latin-1').split('\r\n')
+        request_line = lines[0].split()
+        if len(request_line) != 3:
+            raise ValueError(f"Bad request line: {lines[0]!r}")
+        method, target, version = request_line
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(':')
+            if not sep:
+                raise ValueError(f"Bad header line: {line!r}")
+            headers[name.strip().lower()] = value.strip()
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise ValueError("Chunked request bodies are not supported")
+        length = int(headers.get('content-length') or 0)
+        if not 0 <= length <= self.MAX_BODY_BYTES:
+            raise ValueError("Bad Content-Length")
+        if length and headers.get('expect', '').lower() == '100-continue':
+            writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+        body = await reader.readexactly(length) if length else b''
+        return HttpRequest(method, target, version, headers, body)
+
+    async def _write_response(self, reader, writer, request, response, keep_alive):
+        head = [
+            f"HTTP/1.1 {response.status} {HTTPStatus(response.status).phrase}",
+            f"Date: {formatdate(usegmt=True)}",
+            f"Content-Type: {response.content_type}",
+        ]
+        head.extend(f"{name}: {value}" for name, value in response.headers.items())
+        if response.stream is not None:
+            head.append("Transfer-Encoding: chunked")
+        elif response.file is not None:
+            head.append(f"Content-Length: {response.file[2]}")
+        elif response.status not in (204, 304):
+            head.append(f"Content-Length: {len(response.body)}")
+        head.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        head = ("\r\n".join(head) + "\r\n\r\n").encode('latin-1')
+
+        if request is not None and request.method == 'HEAD':
+            writer.write(head)
+            if response.stream is not None:
+                await response.stream.aclose()
+        elif response.stream is not None:
+            writer.write(head)
             try:
-                if APP_INSTANCE:
-                    sessions = APP_INSTANCE.session_logger.sessions
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({'sessions': sessions}).encode('utf-8'))
+                async for chunk in response.stream:
+                    # Nothing reads from this connection while streaming, so EOF means the page closed
+                    if writer.transport.is_closing() or reader.at_eof():
+                        break
+                    if chunk:
+                        writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                        await writer.drain()
                 else:
-                    self.send_error(500, "App instance not available")
-            except Exception as e:
-                self.send_error(500, f"Error getting sessions: {e}")
-                
+                    writer.write(b"0\r\n\r\n")
+            finally:
+                await response.stream.aclose()
+        elif response.file is not None:
+            path, offset, length = response.file
+            writer.write(head)
+            await writer.drain()
+            if length:
+                with open(path, 'rb') as f:
+                    # os.sendfile (kernel copy) where the transport supports it, read/write otherwise
+                    await asyncio.get_running_loop().sendfile(writer.transport, f, offset, length)
         else:
-            self.send_error(404, "Not found")
+            writer.write(head + response.body)  # One segment for the usual small response
+        await writer.drain()
+
+
+class TaskServer:
+    """Routes of the local server: HTML pages, the task and session APIs and live events.
 
+    Handlers take an HttpRequest and return an HttpResponse. routes maps (method, path)
+    to a handler and prefix_routes catch every method under a path prefix; other GETs
+    fall through to static files. HEAD is answered by the GET handler, without the body.
+    """
+
+    # Pages served straight from the template cache
+    PAGES = {
+        '/add': 'add.html',
+        '/paste': 'paste_task.html',
+        '/settings_page': 'settings.html',
+        '/history': 'history_today.html',
+        '/break': 'break.html',  # Reads ?duration= and follows /api/events
+        '/switch': 'switch.html',  # Quick switcher, searches /api/tasks/search as you type
+    }
+    # The only .html files served by name too; the others (edit_task.html, feedback.html,
+    # go_home.html) are templates that only make sense rendered by their route
+    STATIC_PAGES = frozenset(PAGES.values())
+
+    # Names this server answers to; anything else in Host or Origin is another site
+    LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+    def __init__(self, server):
+        self.server = server
+        self.routes = {
+            ('GET', '/edit'): self.edit_page,
+            ('GET', '/go_home'): self.go_home_page,
+            ('GET', '/feedback'): self.feedback_page,
+            ('GET', '/settings'): self.get_settings,
+            ('GET', '/api/sessions/today'): self.today_sessions,
+            ('GET', '/api/events'): self.stream_events,
+            ('POST', '/create'): self.create_task,
+            ('POST', '/create_batch'): self.create_batch,
+            ('POST', '/save'): self.save_task,
+            ('POST', '/save_settings'): self.save_settings,
+            ('POST', '/feedback'): self.save_feedback,
+            # Sent by pages when they close; the server stays up (it stops itself when idle)
+            ('POST', '/shutdown'): lambda request: HttpResponse.json({'status': 'success'}),
+            # Cancellations - nothing to clean up
+            ('POST', '/cancel'): lambda request: HttpResponse.json({'status': 'cancelled'}),
+            ('POST', '/cancel_op'): lambda request: HttpResponse.json({'status': 'cancelled'}),
+        }
+        for path, name in self.PAGES.items():
+            self.routes[('GET', path)] = lambda request, name=name: self._template(request, name)
+        self.prefix_routes = [('/api/tasks', self.tasks_api)]
+
+    def _find_handler(self, request):
+        method = 'GET' if request.method == 'HEAD' else request.method
+        handler = self.routes.get((method, request.path))
+        if handler is not None:
+            return handler
+        for prefix, handler in self.prefix_routes:
+            if request.path == prefix or request.path.startswith(prefix + '/'):
+                return handler
+        if method == 'GET' and self._static_file(request.path):
+            return self.static_file
+        return None
+
+    async def dispatch(self, request):
+        """Response for request (coroutine handlers run on the loop, the others on the thread pool)"""
+        handler = self._find_handler(request)
+        if handler is None:
+            return HttpResponse.error(404, "Not found")
+        refused = self._refuse_cross_site(request)
+        if refused is not None:
+            return refused
+        try:
+            if asyncio.iscoroutinefunction(handler):
+                return await handler(request)
+            return await asyncio.get_running_loop().run_in_executor(None, handler, request)
+        except Exception as e:
+            return HttpResponse.error(500, f"Error handling {request.path}: {e}")
+
+    def _refuse_cross_site(self, request):
+        """Error response for a state-changing request that another web page could have sent
+        (foreign Origin, non-local Host as in DNS rebinding, or a body that isn't JSON, which
+        a page can POST without a CORS preflight); None if it may go ahead"""
+        if request.method in ('GET', 'HEAD'):
+            return None
+        port = self.server.socket.getsockname()[1]
+        try:
+            host = urlparse('//' + request.headers.get('host', ''))
+            if host.hostname not in self.LOCAL_HOSTS or host.port not in (None, port):
+                return HttpResponse.error(403, "Unexpected Host")
+            origin = request.headers.get('origin')
+            if origin is not None:
+                origin = urlparse(origin)
+                if origin.scheme != 'http' or origin.hostname not in self.LOCAL_HOSTS or origin.port != port:
+                    return HttpResponse.error(403, "Cross-origin requests are not allowed")
+        except ValueError:  # Malformed port
+            return HttpResponse.error(403, "Unexpected Host or Origin")
+        if request.body:
+            content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+            if content_type != 'application/json':
+                return HttpResponse.error(415, "Content-Type must be application/json")
+        return None
+
+    def _template(self, request, name, values=None):
+        """A cached HTML template, rendered with values if given"""
+        template = TEMPLATES.get(name)
+        if values is not None:
+            return HttpResponse(template.render(values), 'text/html')
+        if request.accepts_gzip():
+            return HttpResponse(template.gzip_body, 'text/html', headers={'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'})
+        return HttpResponse(template.body, 'text/html', headers={'Vary': 'Accept-Encoding'})
+
+    def _on_main(self, name, func, *args):
+        """Run a state change on the app's main thread (see MainThreadCommands) and return its result"""
+        return APP_INSTANCE.commands.call(name, func, *args)
+
+    # -- Static files ------------------------------------------------------
+
+    def _static_file(self, url_path):
+        """Path of the static file a URL refers to (one of STATIC_PAGES or in STATIC_DIRS), or None"""
+        parts = unquote(url_path).lstrip('/').split('/')
+        if any(part in ('', '.', '..') for part in parts):
+            return None
+        if len(parts) == 1 and parts[0] in self.STATIC_PAGES or len(parts) == 2 and parts[0] in STATIC_DIRS:
+            path = os.path.join(TEMPLATES.directory, *parts)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def _not_modified(self, request, etag, mtime):
+        """Whether the client's cached copy (If-None-Match / If-Modified-Since) is current"""
+        if_none_match = request.headers.get('if-none-match')
+        if if_none_match:
+            return any(tag.strip() in (etag, '*') for tag in if_none_match.split(','))
+        if_modified_since = request.headers.get('if-modified-since')
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _byte_range(self, request, size, etag):
+        """(start, end) requested by a single-range Range header, None for the whole file,
+        or False when the range can't be satisfied"""
+        header = request.headers.get('range', '')
+        if not header.startswith('bytes='):
+            return None
+        if_range = request.headers.get('if-range')
+        if if_range and if_range != etag:
+            return None  # Changed since the client's partial copy: send it all
+        spec = header[len('bytes='):].strip()
+        if ',' in spec:
+            return None  # Multiple ranges aren't supported; the whole file is a valid answer
+
+        first, _, last = spec.partition('-')
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else size - 1
+            else:
+                # Suffix range: the last N bytes
+                length = int(last)
+                if length <= 0:
+                    return False
+                start = max(0, size - length)
+                end = size - 1
+        except ValueError:
+            return None
+        if start >= size or start > end:
+            return False
+        return start, min(end, size - 1)
+
+    def static_file(self, request):
+        """A file with validators (304s), gzip for HTML and Range support, sent with sendfile"""
+        path = self._static_file(request.path)
+        if path is None:
+            return HttpResponse.error(404, "Not found")
+        st = os.stat(path)
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        validators = {
+            'ETag': etag,
+            'Last-Modified': formatdate(st.st_mtime, usegmt=True),
+            'Cache-Control': 'no-cache',  # Always revalidate; unchanged files cost a 304
+        }
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+        if self._not_modified(request, etag, st.st_mtime):
+            return HttpResponse(b'', content_type, 304, validators)
+
+        if content_type == 'text/html':
+            # Pages come from the template cache, which keeps a gzipped copy
+            template = TEMPLATES.get(os.path.basename(path))
+            validators['Vary'] = 'Accept-Encoding'
+            if request.accepts_gzip():
+                validators['Content-Encoding'] = 'gzip'
+                return HttpResponse(template.gzip_body, content_type, headers=validators)
+            return HttpResponse(template.body, content_type, headers=validators)
+
+        byte_range = self._byte_range(request, st.st_size, etag)
+        if byte_range is False:
+            return HttpResponse(b'', 'text/plain', 416, {'Content-Range': f'bytes */{st.st_size}'})
+
+        status = 200
+        start, end = 0, st.st_size - 1
+        if byte_range:
+            status = 206
+            start, end = byte_range
+            validators['Content-Range'] = f'bytes {start}-{end}/{st.st_size}'
+        length = end - start + 1 if st.st_size else 0
+        validators['Accept-Ranges'] = 'bytes'
+        return HttpResponse(content_type=content_type, status=status, headers=validators, file=(path, start, length))
+
+    # -- Pages -------------------------------------------------------------
+
+    def edit_page(self, request):
+        """Edit task page, filled in with the task's fields"""
+        task_id = request.query.get('id', [None])[0]
+        if not task_id or not APP_INSTANCE:
+            return HttpResponse.error(400, "Missing task ID or app instance")
+
+        task = APP_INSTANCE.task_manager.snapshot_view().get_task(task_id)
+        if not task:
+            return HttpResponse.error(404, "Task not found")
+
+        # Prepare data for injection
+        repeat_num = str(task.get('repeat_number') or '')
+        repeat_unit = task.get('repeat_unit') or ''
+        allowed_days = task.get('allowed_days') or []
+
+        # Attribute values are HTML-escaped; values in the page script are script-safe JSON
+        return self._template(request, 'edit_task.html', {
+            'TASK_ID': html.escape(task['id']),
+            'TASK_NAME': html.escape(task['name']),
+            'TASK_PRIORITY': script_json(task['priority']),
+            'REPEAT_NUMBER': html.escape(repeat_num),
+            'REPEAT_UNIT': script_json(repeat_unit),
+            'REPEAT_BY': script_json(task.get('repeat_by') or 'date'),
+            'REPEAT_UNTIL': script_json(task.get('repeat_until') or ''),
+            'PARENT_ID': script_json(task.get('parent_id') or ''),
+            'ALLOWED_DAYS': script_json(allowed_days),  # Checkboxes for days
+        })
+
+    def go_home_page(self, request):
+        """End-of-day page with today's stats"""
+        if not APP_INSTANCE:
+            return HttpResponse.error(500, "App instance not available")
+        session_count, total_minutes = APP_INSTANCE.today_work_stats()
+        return self._template(request, 'go_home.html', {
+            'SESSIONS_COUNT': str(session_count),
+            'TOTAL_MINUTES': str(total_minutes),
+        })
+
+    def feedback_page(self, request):
+        """Session feedback page (defaults to the session awaiting feedback)"""
+        if not APP_INSTANCE:
+            return HttpResponse.error(500, "App instance not available")
+
+        session_id = request.query.get('session', [None])[0]
+        pending = APP_INSTANCE.pending_feedback_session
+        if not session_id and pending:
+            session_id = pending['session_id']
+        if not session_id:
+            return HttpResponse.error(404, "No session awaiting feedback")
+
+        task_name = pending['task_name'] if pending and pending['session_id'] == session_id else "Work session"
+        return self._template(request, 'feedback.html', {
+            'TASK_NAME': html.escape(task_name),
+            'SESSION_ID': script_json(session_id),
+        })
+
+    # -- JSON endpoints ----------------------------------------------------
+
+    def get_settings(self, request):
+        """Current settings"""
+        if not APP_INSTANCE:
+            return HttpResponse.error(500, "App instance not available")
+        return HttpResponse.json(APP_INSTANCE.settings_manager.settings)
+
+    def today_sessions(self, request):
+        """Today's session logs"""
+        if not APP_INSTANCE:
+            return HttpResponse.error(500, "App instance not available")
+        sessions = list(APP_INSTANCE.session_logger.sessions)
+        return HttpResponse.json({'sessions': sessions}, headers={'Access-Control-Allow-Origin': '*'})
+
+    async def stream_events(self, request):
+        """Server-Sent Events: the current state, then live events (activity, elapsed/remaining, tasks, sessions)"""
+        if not APP_INSTANCE:
+            return HttpResponse.error(500, "App instance not available")
+        headers = {'Cache-Control': 'no-cache', 'Access-Control-Allow-Origin': '*'}
+        if request.method == 'HEAD':
+            return HttpResponse(content_type='text/event-stream', headers=headers)
+        # Subscribe before the headers go out, so no event published after them is missed
+        subscription = EVENTS.subscribe(asyncio.get_running_loop())
+        return HttpResponse(content_type='text/event-stream', headers=headers, stream=self._event_stream(subscription))
+
+    async def _event_stream(self, subscription):
+        try:
+            yield b'retry: 3000\n\n' + EVENTS.format('state', APP_INSTANCE.live_state())
+            # An open page keeps the server alive; stop once the server has shut down
+            while self.server.touch():
+                try:
+                    message = await asyncio.wait_for(subscription.get(), EVENTS.KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    message = b': keep-alive\n\n'
+                yield message
+        finally:
+            EVENTS.unsubscribe(subscription)
 
     def _parse_task_data(self, data):
         """Helper to parse and sanitize task data from JSON"""
         name = data.get('name')
         priority = data.get('priority')
-        
+
         # Handle repeat settings
         repeat_number = data.get('repeat_number')
         if repeat_number == "":
             repeat_number = None
         elif repeat_number is not None:
             repeat_number = int(repeat_number)
-            
+
         repeat_unit = data.get('repeat_unit')
         if repeat_unit == "":
             repeat_unit = None
-            
+
         allowed_days = data.get('allowed_days')
         if not allowed_days: # Empty list
             allowed_days = None
-            
-        return name, priority, repeat_number, repeat_unit, allowed_days
 
-    def _schedule_shutdown(self, delay=1.0):
-        """Schedule server shutdown in a separate thread"""
-        def shutdown():
-            time.sleep(delay)
-            if APP_INSTANCE:
-                APP_INSTANCE.stop_server()
-        
-        threading.Thread(target=shutdown, daemon=True).start()
+        # Kept as sent: "" clears them when editing
+        repeat_by = data.get('repeat_by')
+        repeat_until = data.get('repeat_until')
+        parent_id = data.get('parent_id')
 
-    def do_POST(self):
-        """Handle form submission"""
-        if self.path == '/create':
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            try:
-                data = json.loads(post_data.decode('utf-8'))
-                
-                if APP_INSTANCE:
-                    # Extract data using helper
-                    name, priority, repeat_number, repeat_unit, allowed_days = self._parse_task_data(data)
-                    
-                    # Create task
-                    APP_INSTANCE.task_manager.add_task(
-                        name=name, 
-                        priority=priority,
-                        repeat_number=repeat_number,
-                        repeat_unit=repeat_unit,
-                        allowed_days=allowed_days
-                    )
-                    
-                    # Refresh menu
-                    rumps.notification(
-                        title="Task Created",
-                        subtitle=name,
-                        message="Task added successfully via web interface"
-                    )
-                    APP_INSTANCE.refresh_tasks_submenu()
-                    
-                    # Schedule server shutdown after 2 seconds
-                    self._schedule_shutdown(delay=2.0)
-                
-                # Send success response
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({'status': 'success'}).encode('utf-8'))
-                
-            except Exception as e:
-                self.send_error(500, f"Error creating task: {e}")
-                
-        elif self.path == '/create_batch':
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            try:
-                data = json.loads(post_data.decode('utf-8'))
-                tasks = data.get('tasks', [])
-                
-                if APP_INSTANCE and tasks:
-                    count = 0
+        return name, priority, repeat_number, repeat_unit, allowed_days, repeat_by, repeat_until, parent_id
+
+    def create_task(self, request):
+        """Add task form"""
+        if APP_INSTANCE:
+            name, priority, repeat_number, repeat_unit, allowed_days, repeat_by, repeat_until, parent_id = \
+                self._parse_task_data(request.json())
+
+            # Create task (the menu refreshes itself after the write)
+            self._on_main('create_task', lambda: APP_INSTANCE.task_manager.add_task(
+                name=name,
+                priority=priority,
+                repeat_number=repeat_number,
+                repeat_unit=repeat_unit,
+                allowed_days=allowed_days,
+                repeat_by=repeat_by,
+                repeat_until=repeat_until,
+                parent_id=parent_id
+            ))
+
+            notify(
+                title="Task Created",
+                subtitle=name,
+                message="Task added successfully via web interface"
+            )
+        return HttpResponse.json({'status': 'success'})
+
+    def create_batch(self, request):
+        """Paste tasks form: many tasks, one write"""
+        tasks = request.json().get('tasks', [])
+
+        if APP_INSTANCE and tasks:
+            def create_tasks():
+                # One transaction: tasks.json is written once for the whole paste
+                with APP_INSTANCE.task_manager.transaction():
                     for task_data in tasks:
-                        # Extract data
-                        name = task_data.get('name')
-                        priority = task_data.get('priority')
-                        
-                        # Create task
                         APP_INSTANCE.task_manager.add_task(
-                            name=name, 
-                            priority=priority
+                            name=task_data.get('name'),
+                            priority=task_data.get('priority')
                         )
-                        count += 1
-                    
-                    # Refresh menu
-                    rumps.notification(
-                        title="Batch Tasks Created",
-                        subtitle=f"{count} Tasks Added",
-                        message="Tasks added successfully via paste"
-                    )
-                    APP_INSTANCE.refresh_tasks_submenu()
-                
-                # Send success response
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({'status': 'success', 'count': len(tasks)}).encode('utf-8'))
-                
-            except Exception as e:
-                self.send_error(500, f"Error creating batch tasks: {e}")
+                return len(tasks)
+
+            count = self._on_main('create_tasks', create_tasks)
+            notify(
+                title="Batch Tasks Created",
+                subtitle=f"{count} Tasks Added",
+                message="Tasks added successfully via paste"
+            )
+        return HttpResponse.json({'status': 'success', 'count': len(tasks)})
+
+    def save_task(self, request):
+        """Edit task form"""
+        if APP_INSTANCE:
+            data = request.json()
+            task_id = data.get('id')
+            name, priority, repeat_number, repeat_unit, allowed_days, repeat_by, repeat_until, parent_id = \
+                self._parse_task_data(data)
+
+            # Edit task (the menu refreshes itself after the write)
+            self._on_main('edit_task', lambda: APP_INSTANCE.task_manager.edit_task(
+                task_id,
+                name=name,
+                priority=priority,
+                repeat_number=repeat_number,
+                repeat_unit=repeat_unit,
+                allowed_days=allowed_days,
+                repeat_by=repeat_by,
+                repeat_until=repeat_until,
+                parent_id=parent_id
+            ))
+
+            notify(
+                title="Task Updated",
+                subtitle=name,
+                message="Changes saved successfully via web editor"
+            )
+        return HttpResponse.json({'status': 'success'})
+
+    def save_settings(self, request):
+        """Settings form"""
+        if APP_INSTANCE:
+            data = request.json()
+
+            def save_settings():
+                APP_INSTANCE.settings_manager.settings = data
+                APP_INSTANCE.settings_manager.save_settings()
+                APP_INSTANCE.request_refresh()
+
+            self._on_main('save_settings', save_settings)
+            notify(
+                title="Settings Saved",
+                subtitle="Icons Updated",
+                message="Your icon settings have been saved"
+            )
+        return HttpResponse.json({'status': 'success'})
+
+    def save_feedback(self, request):
+        """Session feedback form"""
+        data = request.json()
+        session_id = data.get('session_id')
+        if not session_id:
+            return HttpResponse.error(400, "Missing session ID")
+
+        if APP_INSTANCE:
+            mood = data.get('mood') or None  # Keep any mood already logged when none was picked
+            reflection = data.get('reflection', '')
+            blockers = data.get('blockers', '')
+
+            def save_feedback():
+                APP_INSTANCE.session_logger.update_session_feedback(
+                    session_id,
+                    mood=mood,
+                    reflection=reflection,
+                    blockers=blockers
+                )
+
+                pending = APP_INSTANCE.pending_feedback_session
+                if pending and pending['session_id'] == session_id:
+                    APP_INSTANCE.pending_feedback_session = None
+                APP_INSTANCE.request_refresh()
+
+            self._on_main('save_feedback', save_feedback)
+            notify(
+                title="Feedback Saved",
+                subtitle=f"You felt: {mood}" if mood else "Session details updated",
+                message="Thanks for the feedback!"
+            )
+        return HttpResponse.json({'status': 'success'})
+
+    # -- /api/tasks ----------------------------------------------------------
+
+    def _filter_tasks(self, task_manager, query):
+        """Tasks for GET /api/tasks?filter=active|available|deleted|all&priority=High"""
+        filter_name = query.get('filter', ['active'])[0]
+        priority = query.get('priority', [None])[0]
+        if priority is not None and priority not in TaskManager.PRIORITIES:
+            raise ValueError(f"priority must be one of {', '.join(TaskManager.PRIORITIES)}")
+
+        if filter_name in ('active', 'deleted') and priority is not None:
+            return task_manager.get_tasks_by_priority(filter_name)[priority]
+        if filter_name == 'active':
+            tasks = task_manager.get_all_active_tasks()
+        elif filter_name == 'available':
+            tasks = task_manager.get_available_tasks()
+        elif filter_name == 'deleted':
+            tasks = task_manager.get_deleted_tasks()
+        elif filter_name == 'all':
+            tasks = list(task_manager.tasks) + task_manager.get_deleted_tasks()
+        else:
+            raise ValueError("filter must be one of active, available, deleted, all")
+
+        if priority is not None:
+            tasks = [t for t in tasks if t['priority'] == priority]
+        return tasks
+
+    def _search_tasks(self, task_manager, query):
+        """Tasks for GET /api/tasks/search?q=...&limit=..., each with today_seconds"""
+        text = query.get('q', [''])[0]
+        try:
+            limit = int(query.get('limit', ['10'])[0])
+        except ValueError:
+            raise ValueError("limit must be a number")
+        if not 1 <= limit <= 100:
+            raise ValueError("limit must be between 1 and 100")
+        # Searched under the task lock, not on a snapshot: the index is kept up to date as tasks change
+        today_seconds = APP_INSTANCE.analytics.get_today_task_seconds()
+        tasks = task_manager.search_tasks(text, limit, today_seconds)
+        for task in tasks:
+            task['today_seconds'] = today_seconds.get(task['name'], 0)
+        return tasks
+    
+    def _select_task(self, task_manager, task_id):
+        """Make a task current (main thread); None if there is no such task"""
+        task = task_manager.get_task(task_id)
+        if task is None:
+            return None
+        APP_INSTANCE.set_current_task(task)
+        queued = not (APP_INSTANCE.current_task and APP_INSTANCE.current_task['id'] == task_id)
+        return {'task': dict(task), 'queued': queued}
+    
+    def _create_task(self, task_manager, fields):
+        """Create a task from validated fields (one write)"""
+        with task_manager.transaction():
+            task = task_manager.add_task(fields['name'])
+            task_manager.update_task(task['id'], fields)
+        return task
+    
+    def _apply_bulk(self, task_manager, data):
+        """POST /api/tasks/bulk: {"create": [...], "update": [{"id": ...}], "delete": [id or {"id", "hard"}]}.
+        Everything is validated before anything changes, then applied as one transaction."""
+        if not isinstance(data, dict):
+            raise ValueError("Bulk request must be an object")
+        creates = data.get('create') or []
+        updates = data.get('update') or []
+        deletes = data.get('delete') or []
+        if not all(isinstance(ops, list) for ops in (creates, updates, deletes)):
+            raise ValueError("create, update and delete must be lists")
+        
+        new_tasks = [task_manager.validate_changes(fields, creating=True) for fields in creates]
+        
+        changes = []
+        for fields in updates:
+            task_id = fields.get('id') if isinstance(fields, dict) else None
+            if task_manager.get_task(task_id) is None and task_manager.archive.get(task_id) is None:
+                raise ValueError(f"Unknown task id in update: {task_id}")
+            changes.append((task_id, task_manager.validate_changes(fields)))
+        
+        removals = []
+        for entry in deletes:
+            task_id, hard = (entry.get('id'), bool(entry.get('hard'))) if isinstance(entry, dict) else (entry, False)
+            if task_manager.get_task(task_id) is None and not (hard and task_manager.archive.get(task_id)):
+                raise ValueError(f"Unknown task id in delete: {task_id}")
+            removals.append((task_id, hard))
+        
+        with task_manager.transaction():
+            created = [self._create_task(task_manager, fields) for fields in new_tasks]
+            updated = [task_manager.update_task(task_id, fields) for task_id, fields in changes]
+            for task_id, hard in removals:
+                if hard:
+                    task_manager.hard_delete_task(task_id)
+                else:
+                    task_manager.delete_task(task_id)
+        return {
+            'created': created,
+            'updated': updated,
+            'deleted': [task_id for task_id, _ in removals],
+        }
+    
+    def tasks_api(self, request):
+        """/api/tasks REST endpoints (JSON in and out, errors as {"error": ...}):
+        
+        GET    /api/tasks?filter=...&priority=...  list
+        GET    /api/tasks/week[?date=YYYY-MM-DD]   what's due each day of the week
+        GET    /api/tasks/search?q=...[&limit=10]  best matches by name (typeahead)
+        GET    /api/tasks/projects[?period=all]    focus time rolled up per project (default: today)
+        POST   /api/tasks                          create
+        POST   /api/tasks/bulk                     many creates, edits and deletes, one write
+        GET    /api/tasks/<id>                     get
+        PATCH  /api/tasks/<id>                     edit the fields given
+        DELETE /api/tasks/<id>[?hard=1]            soft (or permanent) delete
+        POST   /api/tasks/<id>/select              work on the task (queued outside a work session)
+        
+        Deleted tasks are served from the archive; PATCH {"status": "active"} restores one.
+        """
+        if not APP_INSTANCE:
+            return HttpResponse.json({'error': "App instance not available"}, 500)
+        method = 'GET' if request.method == 'HEAD' else request.method
+        task_manager = APP_INSTANCE.task_manager
+        parts = request.path.rstrip('/').split('/')[3:]  # Path after /api/tasks
+        
+        try:
+            data = request.json()
+        except ValueError:
+            return HttpResponse.json({'error': "Invalid JSON body"}, 400)
         
-        elif self.path == '/save_settings':
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
+        try:
+            if not parts and method == 'GET':
+                # Reads use a snapshot; changes run on the main thread
+                return HttpResponse.json({'tasks': self._filter_tasks(task_manager.snapshot_view(), request.query)})
+            if not parts and method == 'POST':
+                fields = task_manager.validate_changes(data, creating=True)
+                task = self._on_main('create_task', lambda: dict(self._create_task(task_manager, fields)))
+                return HttpResponse.json({'task': task}, 201)
+            if parts == ['week'] and method == 'GET':
+                day = request.query.get('date', [None])[0]
+                if day is not None and _parse_date(day) is None:
+                    raise ValueError("date must be YYYY-MM-DD")
+                plan = task_manager.snapshot_view().get_week_plan(_parse_date(day))
+                return HttpResponse.json({'days': [{'date': d.isoformat(), 'tasks': tasks} for d, tasks in plan]})
+            if parts == ['projects'] and method == 'GET':
+                period = request.query.get('period', ['today'])[0]
+                return HttpResponse.json({'projects': APP_INSTANCE.analytics.get_project_times(period)})
+            if parts == ['search'] and method == 'GET':
+                return HttpResponse.json({'tasks': self._search_tasks(task_manager, request.query)})
+            if parts == ['bulk'] and method == 'POST':
+                return HttpResponse.json(self._on_main('bulk_tasks', lambda: copy.deepcopy(self._apply_bulk(task_manager, data))))
+            if len(parts) == 2 and parts[1] == 'select' and method == 'POST':
+                selected = self._on_main('select_task', lambda: self._select_task(task_manager, parts[0]))
+                if selected is None:
+                    return HttpResponse.json({'error': f"Task not found: {parts[0]}"}, 404)
+                return HttpResponse.json(selected)
+            if len(parts) != 1 or method not in ('GET', 'PATCH', 'DELETE'):
+                return HttpResponse.json({'error': "Not found"}, 404)
             
-            try:
-                data = json.loads(post_data.decode('utf-8'))
-                
-                if APP_INSTANCE:
-                    # Update settings
-                    APP_INSTANCE.settings_manager.settings = data
-                    APP_INSTANCE.settings_manager.save_settings()
-                    APP_INSTANCE.refresh_tasks_submenu()
-                    
-                    rumps.notification(
-                        title="Settings Saved",
-                        subtitle="Icons Updated",
-                        message="Your icon settings have been saved"
-                    )
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({'status': 'success'}).encode('utf-8'))
-                
-            except Exception as e:
-                self.send_error(500, f"Error saving settings: {e}")
-
-        elif self.path == '/shutdown':
-            # Explicit shutdown request
-            if APP_INSTANCE:
-                self._schedule_shutdown(delay=0.5)
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({'status': 'success'}).encode('utf-8'))
-            
-        elif self.path == '/cancel':
-            # Handle cancellation - just shut down server
-            if APP_INSTANCE:
-                self._schedule_shutdown(delay=1.0)
-                
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
+            task_id = parts[0]
+            if method == 'GET':
+                task = task_manager.snapshot_view().get_task(task_id) or task_manager.archive.get(task_id)
+            elif method == 'PATCH':
+                changes = task_manager.validate_changes(data)
+                task = self._on_main('update_task', lambda: task_manager.update_task(task_id, changes))
+            else:
+                hard = request.query.get('hard', ['0'])[0] in ('1', 'true')
+                remove = task_manager.hard_delete_task if hard else task_manager.delete_task
+                task = self._on_main('delete_task', lambda: (task_manager.get_task(task_id) or
+                                                             hard and task_manager.archive.get(task_id)) and remove(task_id))
             
+            if not task:
+                return HttpResponse.json({'error': f"Task not found: {task_id}"}, 404)
+            if method == 'DELETE':
+                return HttpResponse.json({'deleted': task_id, 'hard': hard})
+            return HttpResponse.json({'task': dict(task)})
+        except ValueError as e:
+            return HttpResponse.json({'error': str(e)}, 400)
+        except TimeoutError as e:
+            return HttpResponse.json({'error': str(e)}, 503)
+
+
+CONTROL_SOCKET_PATH = os.environ.get('POMODORO_SOCKET') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "control.sock")
+
+
+class ControlServer:
+    """Unix-domain socket for the `pomodoro` command line client.
+
+    One JSON object per line each way: {"command": "select", "args": {"query": "docs"}}
+    gets {"ok": true, "status": {...}} or {"ok": false, "error": "..."}. status is answered
+    right on the socket's thread; commands that change anything run on the main thread
+    (MainThreadCommands) through the same methods the menu uses.
+    """
+
+    # command -> method name; each runs on the main thread
+    COMMANDS = {
+        'start': '_start',
+        'stop': '_stop',
+        'select': '_select',
+        'next': '_queue_next',
+        'feedback': '_feedback',
+    }
+
+    def __init__(self, app, path=CONTROL_SOCKET_PATH):
+        self.app = app
+        self.path = path
+        self._sock = None
+
+    def start(self):
+        """Listen on the socket (replacing a stale one); returns False if it couldn't"""
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
             try:
-                data = json.loads(post_data.decode('utf-8'))
-                
-                if APP_INSTANCE:
-                    # Update task
-                    task_id = data.get('id')
-                    
-                    # Extract data using helper
-                    name, priority, repeat_number, repeat_unit, allowed_days = self._parse_task_data(data)
-                    
-                    APP_INSTANCE.task_manager.edit_task(
-                        task_id, 
-                        name=name, 
-                        priority=priority,
-                        repeat_number=repeat_number,
-                        repeat_unit=repeat_unit,
-                        allowed_days=allowed_days
-                    )
-                    
-                    # Refresh menu
-                    rumps.notification(
-                        title="Task Updated",
-                        subtitle=name,
-                        message="Changes saved successfully via web editor"
-                    )
-                    APP_INSTANCE.refresh_tasks_submenu()
-                    
-                    # Schedule server shutdown after 2 seconds (faster than before)
-                    self._schedule_shutdown(delay=2.0)
-                
-                # Send success response
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({'status': 'success'}).encode('utf-8'))
-                
-            except Exception as e:
-                self.send_error(500, f"Error processing update: {e}")
-                
-        elif self.path == '/cancel_op': # renamed to avoid conflict if user meant the other cancel
-            # Handle cancellation - just shut down server
-            if APP_INSTANCE:
-                self._schedule_shutdown(delay=1.0)
-                
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({'status': 'cancelled'}).encode('utf-8'))
-            
-        else:
-            self.send_error(404, "Not found")
+                probe.connect(self.path)
+                print(f"Control socket {self.path} is in use by another instance")
+                return False
+            except OSError:
+                os.remove(self.path)  # Left behind by a previous run
+            finally:
+                probe.close()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(self.path)
+            os.chmod(self.path, 0o600)
+            sock.listen(8)
+        except OSError as e:
+            print(f"Could not open control socket: {e}")
+            return False
+        self._sock = sock
+        threading.Thread(target=self._serve, daemon=True).start()
+        return True
+
+    def close(self):
+        if self._sock is None:
+            return
+        self._sock.close()
+        self._sock = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _serve(self):
+        sock = self._sock
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return  # Closed
+            threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+
+    def _handle_connection(self, conn):
+        with conn, conn.makefile('rwb') as stream:
+            for line in stream:
+                try:
+                    reply = self.dispatch(json.loads(line))
+                except (ValueError, TypeError, TimeoutError) as e:
+                    reply = {'ok': False, 'error': str(e)}
+                except Exception as e:
+                    # Still answer, or the client reports that it can't reach the app
+                    print(f"Error in control command: {e!r}")
+                    reply = {'ok': False, 'error': f"Internal error: {e}"}
+                try:
+                    stream.write(json.dumps(reply).encode('utf-8') + b'\n')
+                    stream.flush()
+                except OSError:
+                    return
+
+    def dispatch(self, request):
+        """Run one request; raises ValueError/TypeError for bad ones"""
+        if not isinstance(request, dict):
+            raise ValueError("Request must be a JSON object")
+        command = request.get('command')
+        if command != 'status':
+            if command not in self.COMMANDS:
+                raise ValueError(f"Unknown command: {command}")
+            method = getattr(self, self.COMMANDS[command])
+            args = request.get('args') or {}
+            if not isinstance(args, dict) or not all(isinstance(v, str) for v in args.values()):
+                raise ValueError("args must be an object of strings")
+            self.app.commands.call(command, lambda: method(**args))
+        return {'ok': True, 'status': self.status()}
+
+    def status(self):
+        """Current state (read without waiting for the main thread)"""
+        status = self.app.live_state()
+        status['running'] = DYNAMIC_SCHEDULE_ACTIVE
+        status['pending_feedback'] = (self.app.pending_feedback_session or {}).get('session_id')
+        activity = status['activity']
+        if activity:
+            now = datetime.now()
+            start = datetime.strptime(activity['start'], "%H:%M")
+            end = datetime.strptime(activity['end'], "%H:%M")
+            start_dt = now.replace(hour=start.hour, minute=start.minute, second=0, microsecond=0)
+            total = int((end - start).total_seconds())
+            activity['elapsed'] = max(0, min(int((now - start_dt).total_seconds()), total))
+            activity['remaining'] = total - activity['elapsed']
+        return status
+
+    def _start(self):
+        if DYNAMIC_SCHEDULE_ACTIVE:
+            raise ValueError("Pomodoro is already running")
+        if self.app.is_within_schedule_hours():
+            raise ValueError("Manual start is disabled during schedule hours")
+        self.app.toggle_manual_timer(None)
+
+    def _stop(self):
+        if not DYNAMIC_SCHEDULE_ACTIVE:
+            raise ValueError("Pomodoro is not running")
+        self.app.toggle_manual_timer(None)
+
+    def _select(self, query):
+        self.app.set_current_task(self.app.task_manager.find_task(query))
+
+    def _queue_next(self, query):
+        self.app.queue_next_task(self.app.task_manager.find_task(query))
+
+    def _feedback(self, session=None, mood=None, reflection=None, blockers=None):
+        """Feedback for session (default: the one awaiting feedback, else the last logged today)"""
+        pending = self.app.pending_feedback_session
+        if not session:
+            if pending:
+                session = pending['session_id']
+            elif self.app.session_logger.today_sessions_cache:
+                session = self.app.session_logger.today_sessions_cache[-1]['id']
+            else:
+                raise ValueError("No session to give feedback on")
+        if not self.app.session_logger.update_session_feedback(session, mood=mood, reflection=reflection, blockers=blockers):
+            raise ValueError(f"Unknown session: {session}")
+        if pending and pending['session_id'] == session:
+            self.app.pending_feedback_session = None
+        self.app.request_refresh()
 
-    def log_message(self, format, *args):
-        return  # Silence server logs
 
 # HARDCODED SCHEDULE (same as pomodoro_timer.py)
 class SettingsManager:
@@ -400,6 +1212,7 @@ class SettingsManager:
     def __init__(self, settings_file="settings.json"):
         self.settings_file = os.path.join(os.path.dirname(__file__), settings_file)
         self.settings = self.load_settings()
+        self.version = 0  # Bumped on every save so cached icons can tell they are stale
     
     def load_settings(self):
         """Load settings from file or create default"""
@@ -413,6 +1226,7 @@ class SettingsManager:
     
     def save_settings(self):
         """Save settings to file"""
+        self.version += 1
         try:
             with open(self.settings_file, 'w') as f:
                 json.dump(self.settings, f, indent=4, ensure_ascii=False)
@@ -548,31 +1362,369 @@ def generate_dynamic_schedule(start_time=None):
     for item in schedule:
         print(f"   {item['type']} {item['session']}: {item['start']} - {item['end']}")
     
-    return schedule
+    return schedule
+
+def clear_dynamic_schedule():
+    """Clear the dynamic schedule and revert to fixed schedule"""
+    global DYNAMIC_SCHEDULE, DYNAMIC_SCHEDULE_ACTIVE
+    DYNAMIC_SCHEDULE = []
+    DYNAMIC_SCHEDULE_ACTIVE = False
+    
+    # Remove persisted file
+    try:
+        if os.path.exists(DYNAMIC_SCHEDULE_FILE):
+            os.remove(DYNAMIC_SCHEDULE_FILE)
+            print("🗑️ Dynamic schedule file removed")
+    except Exception as e:
+        print(f"⚠️ Error removing dynamic schedule file: {e}")
+        
+    print("📅 Dynamic schedule cleared, reverting to fixed schedule")
+
+
+class Recurrence:
+    """Calendar repeat rule of a task, anchored on the day it was created.
+    
+    Occurrences fall every `interval` days, weeks, months or years from the anchor:
+    - day: every interval days; with weekdays, only those days of the week
+    - week: the anchor's weekday (or each of weekdays) every interval weeks
+      (weekdays come from the task's repeat_weekdays; allowed_days is only a filter
+      on availability, applied by TaskManager)
+    - month/year: the anchor's day of the month, clamped to shorter months (by='date'),
+      or its weekday and week of the month, e.g. "2nd Tuesday", a 5th one meaning the
+      last (by='weekday')
+    Nothing occurs after `until`. Occurrences are expanded one period at a time, as
+    they are asked for, and kept.
+    """
+    
+    MAX_CACHED_PERIODS = 64
+    
+    def __init__(self, anchor, interval, unit, by='date', until=None, weekdays=None):
+        self.anchor = anchor
+        self.interval = max(1, interval)
+        self.unit = unit
+        self.by = by
+        self.until = until
+        self.weekdays = sorted(set(weekdays)) if weekdays else None
+        self._week_start = anchor - timedelta(days=anchor.weekday())
+        self._periods = {}  # period number -> its occurrence dates
+    
+    @classmethod
+    def from_task(cls, task):
+        """The task's rule, or None for a one-time task"""
+        interval = task.get('repeat_number')
+        unit = task.get('repeat_unit')
+        if not interval or unit not in TaskManager.REPEAT_UNITS:
+            return None
+        anchor = _parse_date(task.get('created_at')) or _parse_date(task.get('last_completed')) or datetime.now().date()
+        return cls(anchor, int(interval), unit, by=task.get('repeat_by') or 'date',
+                   until=_parse_date(task.get('repeat_until')), weekdays=task.get('repeat_weekdays'))
+    
+    def after(self, day):
+        """First occurrence after day, or None once the rule has ended"""
+        first = max(0, self._period_of(day))
+        # Weekday filters repeat every 7 periods, so if none of these has one, none ever will
+        for period in range(first, first + 8):
+            for occurrence in self._dates(period):
+                if self.until is not None and occurrence > self.until:
+                    return None
+                if occurrence > day:
+                    return occurrence
+        return None
+    
+    def between(self, start, end):
+        """Occurrences from start to end (inclusive)"""
+        if self.until is not None:
+            end = min(end, self.until)
+        occurrences = []
+        for period in range(max(0, self._period_of(start)), self._period_of(end) + 1):
+            occurrences.extend(d for d in self._dates(period) if start <= d <= end)
+        return occurrences
+    
+    def _period_of(self, day):
+        """Number of the period day falls in (negative before the anchor)"""
+        if self.unit == 'day':
+            return (day - self.anchor).days // self.interval
+        if self.unit == 'week':
+            return (day - self._week_start).days // (7 * self.interval)
+        step = self.interval * (12 if self.unit == 'year' else 1)
+        return ((day.year - self.anchor.year) * 12 + day.month - self.anchor.month) // step
+    
+    def _dates(self, period):
+        """Occurrence dates of a period, in order (cached)"""
+        dates = self._periods.get(period)
+        if dates is None:
+            if len(self._periods) >= self.MAX_CACHED_PERIODS:
+                self._periods.clear()
+            dates = self._periods[period] = [d for d in self._expand(period) if d >= self.anchor]
+        return dates
+    
+    def _expand(self, period):
+        if self.unit == 'day':
+            day = self.anchor + timedelta(days=period * self.interval)
+            return [day] if not self.weekdays or day.weekday() in self.weekdays else []
+        if self.unit == 'week':
+            week = self._week_start + timedelta(days=7 * period * self.interval)
+            return [week + timedelta(days=d) for d in self.weekdays or (self.anchor.weekday(),)]
+        months = self.anchor.month - 1 + period * self.interval * (12 if self.unit == 'year' else 1)
+        year, month = self.anchor.year + months // 12, months % 12 + 1
+        days_in_month = calendar.monthrange(year, month)[1]
+        if self.by != 'weekday':
+            return [self.anchor.replace(year=year, month=month, day=min(self.anchor.day, days_in_month))]
+        week_of_month = (self.anchor.day - 1) // 7
+        first = (self.anchor.weekday() - calendar.weekday(year, month, 1)) % 7 + 1
+        day = first + 7 * week_of_month
+        if week_of_month >= 4 or day > days_in_month:
+            day = first + 7 * ((days_in_month - first) // 7)  # Last one in the month
+        return [self.anchor.replace(year=year, month=month, day=day)]
+
+
+def _parse_date(value):
+    """Date of an ISO date or datetime string, or None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).date()
+    except (TypeError, ValueError):
+        return None
+
+
+class TaskSearchIndex:
+    """Name index for typeahead search: word-start grams and trigrams -> task ids.
+    
+    Each word of a name is indexed as " w", " wo" (so one- and two-letter queries find
+    words starting with them) and every trigram of " word" (so longer queries find any
+    substring). A query only ever looks at the ids sharing its grams, then checks those
+    names, so search time follows the number of matches rather than the number of tasks.
+    """
+    
+    WORD = re.compile(r'\w+')
+    FUZZY_MIN_OVERLAP = 0.5  # Share of the query's trigrams a name needs for a fuzzy match
+    
+    def __init__(self, tasks=()):
+        self._names = {}  # id -> (name lowercased, " " + its words joined by spaces)
+        self._postings = {}  # gram -> set of ids
+        for task in tasks:
+            self.add(task)
+    
+    @classmethod
+    def _grams(cls, words):
+        grams = set()
+        for word in words:
+            padded = ' ' + word
+            grams.add(padded[:2])
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        return grams
+    
+    def add(self, task):
+        lowered = task['name'].lower()
+        words = self.WORD.findall(lowered)
+        self._names[task['id']] = (lowered, ' ' + ' '.join(words))
+        for gram in self._grams(words):
+            self._postings.setdefault(gram, set()).add(task['id'])
+    
+    def remove(self, task_id):
+        entry = self._names.pop(task_id, None)
+        if entry is None:
+            return
+        for gram in self._grams(entry[1].split()):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(task_id)
+                if not ids:
+                    del self._postings[gram]
+    
+    def update(self, task):
+        """Re-index task if its name changed"""
+        entry = self._names.get(task['id'])
+        if entry is None or entry[0] != task['name'].lower():
+            self.remove(task['id'])
+            self.add(task)
+    
+    def _candidates(self, token):
+        if len(token) < 3:
+            return self._postings.get(' ' + token, ())
+        ids = None
+        for gram in sorted((token[i:i + 3] for i in range(len(token) - 2)), key=lambda g: len(self._postings.get(g, ()))):
+            postings = self._postings.get(gram)
+            if not postings:
+                return ()
+            ids = set(postings) if ids is None else ids & postings
+            if not ids:
+                return ()
+        return ids
+    
+    def matches(self, query):
+        """{id: rank} of names containing every word of query: 0 the whole name, 1 a name
+        prefix, 2 every word at a word start, 3 anywhere (words under 3 letters only match
+        word starts)"""
+        tokens = self.WORD.findall(query.lower())
+        if not tokens:
+            return {}
+        ids = None
+        for token in sorted(tokens, key=len, reverse=True):  # The longest word narrows it down most
+            found = self._candidates(token)
+            ids = set(found) if ids is None else ids & set(found)
+            if not ids:
+                return {}
+        phrase = ' ' + ' '.join(tokens)
+        ranks = {}
+        for task_id in ids:
+            padded = self._names[task_id][1]
+            if padded == phrase:
+                ranks[task_id] = 0
+            elif padded.startswith(phrase):
+                ranks[task_id] = 1
+            elif all(' ' + token in padded for token in tokens):
+                ranks[task_id] = 2
+            elif all(token in padded for token in tokens):
+                ranks[task_id] = 3
+        return ranks
+    
+    def containing(self, text):
+        """Ids whose lowercased name contains text (lowercase) as is"""
+        ids = None
+        for token in self.WORD.findall(text):
+            if len(token) >= 3:  # Inside any name containing text, whatever surrounds it
+                found = self._candidates(token)
+                ids = set(found) if ids is None else ids & set(found)
+        if ids is None:
+            ids = self._names  # Nothing to narrow it down with; check every name
+        return [task_id for task_id in ids if text in self._names[task_id][0]]
+    
+    def fuzzy(self, query, min_overlap=FUZZY_MIN_OVERLAP):
+        """{id: share of the query's trigrams found in the name} for names close to query (typos)"""
+        grams = self._grams(self.WORD.findall(query.lower()))
+        if not grams:
+            return {}
+        overlap = {}
+        for gram in grams:
+            for task_id in self._postings.get(gram, ()):
+                overlap[task_id] = overlap.get(task_id, 0) + 1
+        needed = len(grams) * min_overlap
+        return {task_id: count / len(grams) for task_id, count in overlap.items() if count >= needed}
+    
+    def name(self, task_id):
+        return self._names[task_id][0]
 
-def clear_dynamic_schedule():
-    """Clear the dynamic schedule and revert to fixed schedule"""
-    global DYNAMIC_SCHEDULE, DYNAMIC_SCHEDULE_ACTIVE
-    DYNAMIC_SCHEDULE = []
-    DYNAMIC_SCHEDULE_ACTIVE = False
+
+class TaskArchive:
+    """Tombstones of deleted tasks, kept out of tasks.json in an append-only JSON lines file.
     
-    # Remove persisted file
-    try:
-        if os.path.exists(DYNAMIC_SCHEDULE_FILE):
-            os.remove(DYNAMIC_SCHEDULE_FILE)
-            print("🗑️ Dynamic schedule file removed")
-    except Exception as e:
-        print(f"⚠️ Error removing dynamic schedule file: {e}")
-        
-    print("📅 Dynamic schedule cleared, reverting to fixed schedule")
+    Deleting a task (completed one-time tasks are deleted too) appends it here, so the
+    live task list that is loaded, saved and scanned all the time only holds tasks that
+    can still come up. Restoring or permanently deleting one appends a removal record.
+    The file is only read when deleted tasks are looked at, and is then kept in memory;
+    compact() rewrites it without removal records and without tombstones past retention.
+    """
+    
+    DEFAULT_RETENTION_DAYS = 365
+    
+    def __init__(self, archive_file):
+        self.archive_file = archive_file
+        self._tasks = None  # id -> tombstone in deletion order, loaded on first use
+        self._lock = threading.Lock()
+    
+    def _load(self):
+        if self._tasks is None:
+            tasks = {}
+            if os.path.exists(self.archive_file):
+                try:
+                    with open(self.archive_file, 'r') as f:
+                        for line in f:
+                            try:
+                                record = json.loads(line)
+                            except ValueError:
+                                continue  # Blank, or a line torn by a crash mid-append
+                            self._apply(tasks, record)
+                except OSError as e:
+                    print(f"Error loading task archive: {e}")
+            self._tasks = tasks
+        return self._tasks
+    
+    @staticmethod
+    def _apply(tasks, record):
+        if record.get('removed'):
+            tasks.pop(record.get('id'), None)
+        elif record.get('id'):
+            tasks[record['id']] = record
+    
+    def tasks(self):
+        """All tombstones, oldest deletion first"""
+        with self._lock:
+            return list(self._load().values())
+    
+    def get(self, task_id):
+        with self._lock:
+            return self._load().get(task_id)
+    
+    def append(self, records):
+        """Add tombstones and {"id": ..., "removed": true} records, in one write"""
+        with self._lock:
+            with open(self.archive_file, 'a') as f:
+                f.write(''.join(json.dumps(record) + '\n' for record in records))
+            if self._tasks is not None:
+                for record in records:
+                    self._apply(self._tasks, record)
+    
+    def compact(self, retention_days=DEFAULT_RETENTION_DAYS):
+        """Rewrite the file with only the current tombstones, dropping those deleted more than
+        retention_days ago (None keeps them all); returns how many were purged"""
+        with self._lock:
+            if not os.path.exists(self.archive_file):
+                return 0
+            loaded = self._tasks is not None
+            tasks = self._load()
+            purged = []
+            if retention_days:
+                cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+                purged = [task_id for task_id, task in tasks.items() if task.get('deleted_at', '') < cutoff]
+                for task_id in purged:
+                    del tasks[task_id]
+            tmp_file = self.archive_file + '.tmp'
+            try:
+                with open(tmp_file, 'w') as f:
+                    f.write(''.join(json.dumps(task) + '\n' for task in tasks.values()))
+                os.replace(tmp_file, self.archive_file)
+            except Exception as e:
+                print(f"Error compacting task archive: {e}")
+            if not loaded:
+                self._tasks = None  # Nobody was looking at deleted tasks; don't keep them in memory
+            return len(purged)
 
 
 class TaskManager:
     """Manages tasks with CRUD operations"""
     
+    PRIORITIES = ('High', 'Medium', 'Low')
+    PRIORITY_RANK = {p: i for i, p in enumerate(PRIORITIES)}
+    REPEAT_UNITS = ('day', 'week', 'month', 'year')
+    REPEAT_BY = ('date', 'weekday')  # Monthly/yearly: same day of the month, or same weekday of the same week
+    STATUSES = ('active', 'deleted')
+    EDITABLE_FIELDS = ('name', 'priority', 'repeat_number', 'repeat_unit', 'repeat_by', 'repeat_until',
+                       'allowed_days', 'repeat_weekdays', 'status', 'parent_id')
+    
     def __init__(self, tasks_file):
         self.tasks_file = tasks_file
         self.tasks = self.load_tasks()
+        self.version = 0  # Bumped on every change so cached menus can tell they are stale
+        self.availability_version = 0  # Bumped whenever the set of available tasks changes
+        self.tree_version = 0  # Bumped whenever a task's parent changes (see FocusRollup.sync)
+        self._listeners = []  # Called after every write (once per transaction)
+        self._lock = threading.RLock()  # Held by a transaction, so other threads' changes wait for it
+        self._transaction_depth = 0
+        self._transaction_dirty = False
+        self._snapshot = None  # (version, read-only TaskManager) for other threads, built on demand
+        # Deleted tasks live in <tasks>_archive.jsonl; records for it wait here until tasks.json is written
+        self.archive = TaskArchive(os.path.splitext(tasks_file)[0] + '_archive.jsonl')
+        self._archive_records = []
+        self._rebuild_index()
+        self.archive_dead_tasks()
+    
+    @property
+    def lock(self):
+        """The task lock (held by transactions). Code that holds a lock of its own while
+        calling in here must take this one first, or it can deadlock with a transaction."""
+        return self._lock
     
     def load_tasks(self):
         """Load tasks from JSON file"""
@@ -585,18 +1737,263 @@ class TaskManager:
                 return []
         return []
     
-    def save_tasks(self):
-        """Save tasks to JSON file"""
+    def _rebuild_index(self):
+        """Index self.tasks from scratch (after loading, a rollback or for a snapshot).
+        
+        _by_id maps id -> task. _buckets maps (status, priority) and (status, None) to
+        {id: task} dicts kept in task list order, so lookups and per-status or
+        per-priority listings never scan the whole list.
+        """
+        self._by_id = {}
+        self._order = {}  # id -> position key; only ever increases, so it sorts like self.tasks
+        self._bucket_key = {}  # id -> (status, priority) the task is filed under
+        self._buckets = {}
+        self._children = {}  # parent id -> {id: task} of its subtasks, in task list order
+        for order, task in enumerate(self.tasks):
+            self._by_id[task['id']] = task
+            self._order[task['id']] = order
+            self._index_task(task)
+            if task.get('parent_id'):
+                self._children.setdefault(task['parent_id'], {})[task['id']] = task
+        self._next_order = len(self.tasks)
+        self._available_day = None  # Availability is recomputed on the next read
+        self._recurrences = {}  # id -> (repeat settings, Recurrence) (see recurrence)
+        self._search = None  # TaskSearchIndex, built by the first search (see search_index)
+        self._week_plan = None  # (version, Monday, plan) (see get_week_plan)
+    
+    def _index_task(self, task):
+        key = (task.get('status'), task.get('priority'))
+        self._bucket_key[task['id']] = key
+        for bucket_key in (key, (key[0], None)):
+            self._insert_ordered(self._buckets.setdefault(bucket_key, {}), task)
+    
+    def _insert_ordered(self, bucket, task):
+        """Add task to an {id: task} bucket, keeping it in task list order"""
+        in_order = not bucket or self._order[next(reversed(bucket))] < self._order[task['id']]
+        bucket[task['id']] = task
+        if not in_order:
+            # New tasks land at the end; a task moving between buckets may belong further up
+            ordered = sorted(bucket.items(), key=lambda item: self._order[item[0]])
+            bucket.clear()
+            bucket.update(ordered)
+    
+    def _unindex_task(self, task_id):
+        key = self._bucket_key.pop(task_id, None)
+        if key is not None:
+            for bucket_key in (key, (key[0], None)):
+                self._buckets[bucket_key].pop(task_id, None)
+    
+    def _reindex(self, task):
+        """Refile task after it changed (status, priority, repeat settings or completion)"""
+        if self._bucket_key.get(task['id']) != (task.get('status'), task.get('priority')):
+            self._unindex_task(task['id'])
+            self._index_task(task)
+        if self._search is not None:
+            self._search.update(task)
+        self._reschedule(task)
+    
+    def add_listener(self, callback):
+        """Call callback() after tasks are written (once per transaction)"""
+        self._listeners.append(callback)
+    
+    def _notify_listeners(self):
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in task change listener: {e}")
+    
+    def _write_tasks(self):
+        """Write tasks.json atomically (temp file + rename), after appending any archive records
+        (a crash in between leaves a task in both files, never in neither)"""
+        self.version += 1
+        tmp_file = self.tasks_file + '.tmp'
         try:
-            with open(self.tasks_file, 'w') as f:
+            if self._archive_records:
+                self.archive.append(self._archive_records)
+                self._archive_records = []
+            with open(tmp_file, 'w') as f:
                 json.dump({'tasks': self.tasks}, f, indent=2)
+            os.replace(tmp_file, self.tasks_file)
             return True
         except Exception as e:
             print(f"Error saving tasks: {e}")
             return False
     
-    def add_task(self, name, priority="Medium", repeat_number=None, repeat_unit=None, allowed_days=None):
-        """Add a new task"""
+    def save_tasks(self):
+        """Save tasks to JSON file (inside a transaction, deferred until it commits)"""
+        with self._lock:
+            if self._transaction_depth:
+                self._transaction_dirty = True
+                return True
+            saved = self._write_tasks()
+        self._notify_listeners()
+        return saved
+    
+    def snapshot_view(self):
+        """Read-only TaskManager over a copy of the tasks as last written, safe to use from other threads.
+        
+        The copy (and its index) is made under the lock (so never mid-change) and reused
+        until the next write.
+        """
+        with self._lock:
+            if self._snapshot is None or self._snapshot[0] != self.version:
+                view = copy.copy(self)
+                view.tasks = tuple(copy.deepcopy(self.tasks))
+                view._snapshot = None
+                view._lock = threading.RLock()  # Its availability is computed lazily, by any thread
+                view._rebuild_index()
+                self._snapshot = (self.version, view)
+            return self._snapshot[1]
+    
+    def validate_tasks(self, before):
+        """Raise ValueError if the task list is inconsistent; only tasks changed since before are checked"""
+        previous = {t['id']: t for t in before}
+        seen = set()
+        for task in self.tasks:
+            task_id = task.get('id')
+            if task_id in seen:
+                raise ValueError(f"Duplicate task id: {task_id}")
+            seen.add(task_id)
+            if previous.get(task_id) == task:
+                continue
+            if not isinstance(task.get('name'), str) or not task['name'].strip():
+                raise ValueError(f"Task {task_id} has no name")
+            if task.get('status') not in self.STATUSES:
+                raise ValueError(f"Task {task_id} has an unknown status: {task.get('status')}")
+    
+    @contextmanager
+    def transaction(self):
+        """Unit of work for several task changes.
+        
+        Inside the block the CRUD methods only change memory. On a clean exit the
+        changes are validated, written once and listeners are notified once; if the
+        block (or validation) raises, the task list is restored and nothing is written.
+        Nested transactions are savepoints: they write with the outer one, but if one
+        raises (or its changes fail validation) only its own changes are undone.
+        """
+        with self._lock:
+            if self._transaction_depth:
+                # Task fields are replaced, never changed in place, so copying each task is enough
+                saved = [(task, dict(task)) for task in self.tasks]
+                archive_records = list(self._archive_records)
+                dirty = self._transaction_dirty
+                self._transaction_depth += 1
+                self._transaction_dirty = False
+                try:
+                    yield self
+                    if self._transaction_dirty:
+                        self.validate_tasks([fields for _, fields in saved])
+                except BaseException:
+                    self._roll_back(saved, archive_records)
+                    self._transaction_dirty = False
+                    raise
+                finally:
+                    self._transaction_depth -= 1
+                    self._transaction_dirty = self._transaction_dirty or dirty
+                return
+            
+            saved = [(task, copy.deepcopy(task)) for task in self.tasks]
+            self._transaction_depth = 1
+            self._transaction_dirty = False
+            try:
+                yield self
+                if self._transaction_dirty:
+                    self.validate_tasks([fields for _, fields in saved])
+            except BaseException:
+                self._roll_back(saved, [])
+                raise
+            finally:
+                self._transaction_depth = 0
+            
+            dirty = self._transaction_dirty
+            if dirty:
+                self._write_tasks()
+        if dirty:
+            self._notify_listeners()
+    
+    def _roll_back(self, saved, archive_records):
+        """Restore the task list and pending archive records saved when a transaction began.
+        saved is [(task, its fields then)]: fields are put back into the same dicts, so tasks
+        held elsewhere (the app's current and next task) stay the live ones."""
+        for task, fields in saved:
+            task.clear()
+            task.update(fields)
+        self.tasks = [task for task, _ in saved]
+        self._archive_records = archive_records
+        self._rebuild_index()
+        self.tree_version += 1
+    
+    def validate_changes(self, changes, creating=False):
+        """Check task fields sent by a client; returns them cleaned up or raises ValueError.
+        A field that is present is set (None/"" clears repeat settings), absent ones are left alone."""
+        if not isinstance(changes, dict):
+            raise ValueError("Task data must be an object")
+        unknown = set(changes) - set(self.EDITABLE_FIELDS) - {'id'}
+        if unknown:
+            raise ValueError(f"Unknown task field(s): {', '.join(sorted(unknown))}")
+        
+        cleaned = {}
+        if creating or 'name' in changes:
+            name = changes.get('name')
+            if not isinstance(name, str) or not name.strip():
+                raise ValueError("Task name is required")
+            cleaned['name'] = name.strip()
+        if 'priority' in changes:
+            if changes['priority'] not in self.PRIORITIES:
+                raise ValueError(f"Priority must be one of {', '.join(self.PRIORITIES)}")
+            cleaned['priority'] = changes['priority']
+        if 'repeat_number' in changes:
+            repeat_number = changes['repeat_number']
+            if repeat_number in (None, ''):
+                repeat_number = None
+            else:
+                try:
+                    repeat_number = int(repeat_number)
+                except (TypeError, ValueError):
+                    raise ValueError("repeat_number must be a whole number")
+                if repeat_number < 1:
+                    raise ValueError("repeat_number must be at least 1")
+            cleaned['repeat_number'] = repeat_number
+        if 'repeat_unit' in changes:
+            repeat_unit = changes['repeat_unit'] or None
+            if repeat_unit is not None and repeat_unit not in self.REPEAT_UNITS:
+                raise ValueError(f"repeat_unit must be one of {', '.join(self.REPEAT_UNITS)}")
+            cleaned['repeat_unit'] = repeat_unit
+        if 'repeat_by' in changes:
+            repeat_by = changes['repeat_by'] or None
+            if repeat_by is not None and repeat_by not in self.REPEAT_BY:
+                raise ValueError(f"repeat_by must be one of {', '.join(self.REPEAT_BY)}")
+            cleaned['repeat_by'] = repeat_by
+        if 'repeat_until' in changes:
+            repeat_until = changes['repeat_until'] or None
+            if repeat_until is not None:
+                if not isinstance(repeat_until, str) or _parse_date(repeat_until) is None:
+                    raise ValueError("repeat_until must be a date (YYYY-MM-DD)")
+                repeat_until = _parse_date(repeat_until).isoformat()
+            cleaned['repeat_until'] = repeat_until
+        for field in ('allowed_days', 'repeat_weekdays'):
+            if field in changes:
+                days = changes[field] or None
+                if days is not None:
+                    if not isinstance(days, list) or not all(isinstance(d, int) and 0 <= d <= 6 for d in days):
+                        raise ValueError(f"{field} must be a list of weekday numbers (0=Mon ... 6=Sun)")
+                    days = sorted(set(days))
+                cleaned[field] = days
+        if 'status' in changes:
+            if changes['status'] not in self.STATUSES:
+                raise ValueError(f"status must be one of {', '.join(self.STATUSES)}")
+            cleaned['status'] = changes['status']
+        if 'parent_id' in changes:
+            parent_id = changes['parent_id'] or None
+            if parent_id is not None and not isinstance(parent_id, str):
+                raise ValueError("parent_id must be a task id")
+            cleaned['parent_id'] = parent_id  # Checked against the task tree when applied
+        return cleaned
+    
+    def add_task(self, name, priority="Medium", repeat_number=None, repeat_unit=None, allowed_days=None,
+                 repeat_by=None, repeat_until=None, parent_id=None):
+        """Add a new task (parent_id: the task, or project, it belongs under)"""
         task = {
             'id': str(uuid.uuid4()),
             'name': name,
@@ -604,126 +2001,510 @@ class TaskManager:
             'created_at': datetime.now().isoformat(),
             'status': 'active',
             'repeat_number': repeat_number,
-            'repeat_unit': repeat_unit,  # 'day', 'week', 'month'
+            'repeat_unit': repeat_unit,  # 'day', 'week', 'month', 'year'
+            'repeat_by': repeat_by or None,  # Months/years: 'date' (default) or 'weekday'
+            'repeat_until': repeat_until or None,  # Last day it can occur (YYYY-MM-DD)
             'allowed_days': allowed_days,  # List of weekday numbers: 0=Mon, 6=Sun
-            'last_completed': None
+            'last_completed': None,
+            'parent_id': None
         }
-        self.tasks.append(task)
-        self.save_tasks()
+        with self._lock:
+            if parent_id:
+                self._check_parent(task['id'], parent_id)  # Before it goes live, so a bad parent adds nothing
+            self._add_live(task)
+            if parent_id:
+                self._set_parent(task, parent_id)
+            self.save_tasks()
         return task
     
-    def edit_task(self, task_id, name=None, priority=None, repeat_number=None, repeat_unit=None, allowed_days=None):
-        """Edit an existing task"""
-        for task in self.tasks:
-            if task['id'] == task_id:
-                if name:
-                    task['name'] = name
-                if priority:
-                    task['priority'] = priority
-                if repeat_number is not None:
-                    task['repeat_number'] = repeat_number
-                if repeat_unit is not None:
-                    task['repeat_unit'] = repeat_unit
-                if allowed_days is not None:
-                    task['allowed_days'] = allowed_days
-                self.save_tasks()
-                return True
-        return False
+    def update_task(self, task_id, changes):
+        """Apply validated changes (see validate_changes) to a task; returns the task or None.
+        Setting status moves the task to or from the archive (see delete_task, restore_task)."""
+        with self._lock:
+            status = changes.get('status')
+            if status == 'active' and task_id not in self._by_id:
+                if changes.get('parent_id'):
+                    self._check_parent(task_id, changes['parent_id'])  # Before restoring anything
+                self.restore_task(task_id)
+            task = self.get_task(task_id)
+            if task is None:
+                return None
+            if 'parent_id' in changes:
+                self._set_parent(task, changes['parent_id'])
+            task.update({k: v for k, v in changes.items() if k not in ('status', 'parent_id')})
+            self._reindex(task)
+            if status == 'deleted':
+                self.delete_task(task_id)
+            self.save_tasks()
+        return task
+    
+    def edit_task(self, task_id, name=None, priority=None, repeat_number=None, repeat_unit=None, allowed_days=None,
+                  repeat_by=None, repeat_until=None, parent_id=None):
+        """Edit an existing task (repeat_by/repeat_until/parent_id: "" clears them)"""
+        with self._lock:
+            task = self.get_task(task_id)
+            if task is None:
+                return False
+            if parent_id is not None:
+                self._set_parent(task, parent_id or None)
+            if name:
+                task['name'] = name
+            if priority:
+                task['priority'] = priority
+            if repeat_number is not None:
+                task['repeat_number'] = repeat_number
+            if repeat_unit is not None:
+                task['repeat_unit'] = repeat_unit
+            if allowed_days is not None:
+                task['allowed_days'] = allowed_days
+            if repeat_by is not None:
+                task['repeat_by'] = repeat_by or None
+            if repeat_until is not None:
+                task['repeat_until'] = repeat_until or None
+            self._reindex(task)
+            self.save_tasks()
+        return True
     
     def delete_task(self, task_id):
-        """Soft delete a task (mark as deleted)"""
-        for task in self.tasks:
-            if task['id'] == task_id:
-                task['status'] = 'deleted'
-                self.save_tasks()
-                return True
-        return False
+        """Soft delete a task (mark as deleted and move it to the archive)"""
+        with self._lock:
+            task = self.get_task(task_id)
+            if task is None:
+                return False
+            self._remove_live(task_id)
+            if task.get('parent_id') not in self._by_id:
+                task['parent_id'] = None  # Its parent went first; the archive only links to live tasks
+            task['status'] = 'deleted'
+            task['deleted_at'] = datetime.now().isoformat()
+            self._archive_records.append(task)
+            self.save_tasks()
+        return True
+    
+    def restore_task(self, task_id):
+        """Bring a deleted task back from the archive; returns the task or None"""
+        with self._lock:
+            if task_id in self._by_id:
+                return self._by_id[task_id]
+            archived = self.archive.get(task_id)
+            if archived is None:
+                return None
+            task = {k: v for k, v in archived.items() if k != 'deleted_at'}
+            task['status'] = 'active'
+            if self._creates_cycle(task_id, task.get('parent_id')):
+                task['parent_id'] = None  # Its old parent has since moved under one of its subtasks
+            self._archive_records.append({'id': task_id, 'removed': True})
+            self._add_live(task)
+            self.save_tasks()
+        return task
     
     def hard_delete_task(self, task_id):
-        """Permanently delete a task"""
-        self.tasks = [t for t in self.tasks if t['id'] != task_id]
-        self.save_tasks()
+        """Permanently delete a task (live or archived)"""
+        with self._lock:
+            if task_id in self._by_id:
+                self._remove_live(task_id)
+            elif self.archive.get(task_id) is not None:
+                self._archive_records.append({'id': task_id, 'removed': True})
+            self.save_tasks()
         return True
     
+    def _add_live(self, task):
+        self.tasks.append(task)
+        self._by_id[task['id']] = task
+        self._order[task['id']] = self._next_order
+        self._next_order += 1
+        self._index_task(task)
+        if task.get('parent_id') or self._children.get(task['id']):
+            self.tree_version += 1  # Links to and from it count again
+        if task.get('parent_id'):
+            self._children.setdefault(task['parent_id'], {})[task['id']] = task
+        if self._search is not None:
+            self._search.add(task)
+        self._reschedule(task)
+    
+    def _remove_live(self, task_id):
+        self.tasks = [t for t in self.tasks if t['id'] != task_id]
+        task = self._by_id.pop(task_id)
+        if task.get('parent_id'):
+            self._children.get(task['parent_id'], {}).pop(task_id, None)
+        if self._children.get(task_id):
+            self.tree_version += 1  # Its subtasks are top-level until it is restored
+        self._unindex_task(task_id)
+        if self._search is not None:
+            self._search.remove(task_id)
+        if self._unschedule(task_id):
+            self.availability_version += 1
+    
+    def _set_parent(self, task, parent_id):
+        """Move task under parent_id (None: to the top level); raises ValueError for an unknown
+        parent or one that would make the task its own ancestor"""
+        old_parent = task.get('parent_id')
+        if parent_id == old_parent:
+            return
+        if parent_id is not None:
+            self._check_parent(task['id'], parent_id)
+        if old_parent:
+            self._children.get(old_parent, {}).pop(task['id'], None)
+        if parent_id is not None:
+            self._insert_ordered(self._children.setdefault(parent_id, {}), task)
+        task['parent_id'] = parent_id
+        self.tree_version += 1
+    
+    def _check_parent(self, task_id, parent_id):
+        """Raise ValueError unless task_id (live or not) can go under parent_id"""
+        if parent_id not in self._by_id:
+            raise ValueError(f"parent_id is not an active task: {parent_id}")
+        if self._creates_cycle(task_id, parent_id):
+            raise ValueError("A task can't be moved under itself or one of its subtasks")
+    
+    def _creates_cycle(self, task_id, parent_id):
+        """True if task_id is parent_id or one of its ancestors"""
+        seen = set()
+        node = parent_id
+        while node is not None and node not in seen:
+            if node == task_id:
+                return True
+            seen.add(node)
+            parent = self._by_id.get(node)
+            node = parent.get('parent_id') if parent is not None else None
+        return False
+    
+    def get_children(self, task_id):
+        """Active subtasks directly under task_id, in task list order"""
+        return list(self._children.get(task_id, {}).values())
+    
+    def get_ancestors(self, task):
+        """Active tasks above task, nearest first"""
+        ancestors = []
+        seen = {task['id']}
+        parent = self._by_id.get(task.get('parent_id'))
+        while parent is not None and parent['id'] not in seen:
+            ancestors.append(parent)
+            seen.add(parent['id'])
+            parent = self._by_id.get(parent.get('parent_id'))
+        return ancestors
+    
+    def get_project(self, task):
+        """The project task belongs to: its top-level ancestor, itself if it has subtasks, else None"""
+        ancestors = self.get_ancestors(task)
+        if ancestors:
+            return ancestors[-1]
+        return task if self._children.get(task['id']) else None
+    
+    def get_project_tree(self):
+        """[(project, [(subtask, [...]), ...])] for every project, read under the lock"""
+        with self._lock:
+            def subtree(task, depth):
+                children = self.get_children(task['id']) if depth < FocusRollup.MAX_DEPTH else []
+                return task, [subtree(child, depth + 1) for child in children]
+            return [subtree(project, 0) for project in self.get_projects()]
+    
+    def get_projects(self):
+        """Top-level tasks that have subtasks, in task list order"""
+        return [t for t in self.tasks if self._children.get(t['id']) and t.get('parent_id') not in self._by_id]
+    
+    def parent_links(self, task_ids=()):
+        """{task id: parent id or None} for every active task and for the deleted ones among
+        task_ids (from the archive), for FocusRollup; a deleted parent counts as None, as it
+        does for get_projects"""
+        with self._lock:
+            links = {t['id']: t.get('parent_id') if t.get('parent_id') in self._by_id else None for t in self.tasks}
+            staged = {record['id']: record for record in self._archive_records}  # Not written yet
+            for task_id in task_ids:
+                if task_id not in links:
+                    archived = staged.get(task_id) or self.archive.get(task_id)
+                    links[task_id] = archived.get('parent_id') if archived else None
+            return links
+    
+    def archive_dead_tasks(self):
+        """Move deleted tasks and completed one-time tasks still in tasks.json to the archive
+        (tasks.json from before the archive existed); writes only if something moved"""
+        with self._lock:
+            dead = [t for t in self.tasks
+                    if t.get('status') == 'deleted' or (t.get('last_completed') and self.recurrence(t) is None)]
+            if not dead:
+                return 0
+            now = datetime.now().isoformat()
+            for task in dead:
+                self._remove_live(task['id'])
+                task['status'] = 'deleted'
+                task.setdefault('deleted_at', task.get('last_completed') or now)
+                self._archive_records.append(task)
+            self.save_tasks()
+        return len(dead)
+    
+    def compact_archive(self, retention_days=TaskArchive.DEFAULT_RETENTION_DAYS):
+        """Scheduled daily: rewrite the archive, purging tombstones older than retention_days"""
+        with self._lock:
+            if self._transaction_depth:
+                return 0  # Tomorrow will do
+            return self.archive.compact(retention_days)
+    
     def get_deleted_tasks(self):
-        """Get all deleted tasks"""
-        return [t for t in self.tasks if t.get('status') == 'deleted']
+        """Get all deleted tasks (reads the archive the first time)"""
+        return self.archive.tasks()
+    
+    def get_tasks_by_priority(self, status='active'):
+        """Tasks with status grouped by priority: {priority: [tasks]} in PRIORITIES order"""
+        if status == 'deleted':
+            grouped = {p: [] for p in self.PRIORITIES}
+            for task in self.get_deleted_tasks():
+                grouped.setdefault(task.get('priority'), []).append(task)
+            return {p: grouped[p] for p in self.PRIORITIES}
+        return {p: list(self._buckets.get((status, p), {}).values()) for p in self.PRIORITIES}
     
     def get_task(self, task_id):
         """Get a specific task"""
-        for task in self.tasks:
-            if task['id'] == task_id:
-                return task
-        return None
+        return self._by_id.get(task_id)
+    
+    def find_task(self, query):
+        """Active task matching query: an id or id prefix, else a (fuzzy) name.
+        Raises ValueError when nothing or more than one task matches."""
+        query = (query or '').strip()
+        if not query:
+            raise ValueError("Task id or name is required")
+        
+        with self._lock:
+            lowered = query.lower()
+            task = self.get_task(query)
+            index = self.search_index()
+            # Names are looked up in the search index; only the tasks it finds are checked
+            containing = self._active_in_order(index.containing(lowered))
+            for matches in (
+                [task] if task is not None and task['status'] == 'active' else [],
+                [t for t in self.get_all_active_tasks() if t['id'].startswith(query)] if len(query) >= 4 else [],
+                [t for t in containing if t['name'].lower() == lowered],
+                containing,
+            ):
+                if len(matches) == 1:
+                    return matches[0]
+                if matches:
+                    names = ', '.join(t['name'] for t in matches[:5])
+                    raise ValueError(f"'{query}' matches {len(matches)} tasks: {names}")
+            
+            by_name = {t['name'].lower(): t for t in self._active_in_order(index.fuzzy(lowered, min_overlap=0))}
+            close = difflib.get_close_matches(lowered, list(by_name), n=1, cutoff=0.6)
+            if close:
+                return by_name[close[0]]
+        raise ValueError(f"No active task matches '{query}'")
+    
+    def _active_in_order(self, task_ids):
+        tasks = (self._by_id[task_id] for task_id in task_ids)
+        return sorted((t for t in tasks if t['status'] == 'active'), key=lambda t: self._order[t['id']])
+    
+    def search_index(self):
+        """The TaskSearchIndex over the task list: built on first use, then kept up to date by every change"""
+        with self._lock:
+            if self._search is None:
+                self._search = TaskSearchIndex(self.tasks)
+            return self._search
+    
+    def search_tasks(self, query, limit=10, today_seconds=None):
+        """Active tasks whose names match query, best first, as copies (safe to hand to another thread).
+        
+        Ranked by how well the name matches (whole name, prefix, word starts, anywhere,
+        then typo-tolerant matches), then priority, time tracked today (today_seconds:
+        {task name: seconds}) and how recently the task was completed or created.
+        """
+        today_seconds = today_seconds or {}
+        with self._lock:
+            index = self.search_index()
+            ranks = index.matches(query)
+            close = {} if ranks else index.fuzzy(query)
+            
+            def key(task_id):
+                task = self._by_id[task_id]
+                return (-ranks.get(task_id, 4), close.get(task_id, 0),
+                        -self.PRIORITY_RANK.get(task['priority'], len(self.PRIORITIES)),
+                        today_seconds.get(task['name'], 0),
+                        task.get('last_completed') or task.get('created_at') or '')
+            
+            found = (task_id for task_id in (ranks or close) if self._by_id[task_id]['status'] == 'active')
+            return [dict(self._by_id[task_id]) for task_id in heapq.nlargest(limit, found, key=key)]
     
     def get_all_active_tasks(self):
         """Get all active tasks"""
-        return [t for t in self.tasks if t['status'] == 'active']
+        return list(self._buckets.get(('active', None), {}).values())
     
     def mark_task_completed(self, task_id):
         """Mark task as completed (update last_completed timestamp)"""
-        for task in self.tasks:
-            if task['id'] == task_id:
-                task['last_completed'] = datetime.now().isoformat()
-                self.save_tasks()
-                return True
-        return False
+        with self._lock:
+            task = self.get_task(task_id)
+            if task is None:
+                return False
+            task['last_completed'] = datetime.now().isoformat()
+            self._reschedule(task)
+            self.save_tasks()
+        return True
     
     def get_available_tasks(self):
         """Get tasks that are currently available based on repeat schedule and allowed days"""
-        active_tasks = self.get_all_active_tasks()
-        available = []
-        today_weekday = datetime.now().weekday()  # 0=Monday, 6=Sunday
-        
-        for task in active_tasks:
-            # First check if task is allowed on today's weekday
-            allowed_days = task.get('allowed_days')
-            if allowed_days is not None and len(allowed_days) > 0:
-                if today_weekday not in allowed_days:
-                    continue  # Skip this task, not allowed today
-            
-            # Then check repeat schedule
-            last_completed = task.get('last_completed')
-            repeat_number = task.get('repeat_number')
-            repeat_unit = task.get('repeat_unit')
-            
-            # If never completed, always show
-            if last_completed is None:
-                available.append(task)
-                continue
-            
-            # If no repeat settings, hide after first completion (one-time task)
-            if repeat_number is None or repeat_unit is None:
+        with self._lock:
+            self.update_availability()
+            return list(self._available[None].values())
+    
+    def get_available_tasks_by_priority(self):
+        """Available tasks grouped by priority, like get_tasks_by_priority"""
+        with self._lock:
+            self.update_availability()
+            return {p: list(self._available[p].values()) for p in self.PRIORITIES}
+    
+    def update_availability(self, now=None):
+        """Bring the available set up to now; returns True if it changed.
+        
+        The set is rebuilt from scratch once a day (allowed_days depends on the
+        weekday). In between, tasks that are waiting for their repeat interval sit in
+        a min-heap by due time, so this only pops the ones that came due, and task
+        changes reschedule just that task (see _reschedule). Cheap enough for every tick.
+        """
+        if now is None:
+            now = datetime.now()
+        with self._lock:
+            day = self._available_day
+            if day is None or now.day != day.day or now.month != day.month or now.year != day.year:
+                self._rebuild_availability(now)
+                return True
+            changed = False
+            heap = self._due_heap
+            while heap and heap[0][0] <= now:
+                due, _, task_id = heapq.heappop(heap)
+                if self._due_at.get(task_id) != due:
+                    continue  # Stale entry: the task was rescheduled or removed since
+                del self._due_at[task_id]
+                task = self._by_id[task_id]
+                if self._allowed_on(task, now):
+                    self._make_available(task)
+                    changed = True
+            if changed:
+                self.availability_version += 1
+            return changed
+    
+    def _rebuild_availability(self, now):
+        self._available_day = now.date()
+        self._available = {p: {} for p in (None,) + self.PRIORITIES}
+        self._due_at = {}  # id -> due time of its live heap entry
+        self._due_heap = []  # (due, order, id)
+        for task in self.get_all_active_tasks():
+            due = self._next_due(task)
+            if due is None:
                 continue
-            
-            # Has repeat settings - check if due
-            last_completed_dt = datetime.fromisoformat(last_completed)
-            
-            # For daily tasks, check if it's a new day (not 24 hours)
-            if repeat_unit == 'day' and repeat_number == 1:
-                # Daily task should appear only on days AFTER completion day
-                # If completed today, should NOT appear
-                last_completed_date = last_completed_dt.date()
-                today_date = datetime.now().date()
-                if today_date > last_completed_date:  # Only show if it's a NEW day
-                    available.append(task)
-                # If today_date == last_completed_date, skip (already completed today)
+            if due <= now:
+                if self._allowed_on(task, now):
+                    self._make_available(task)
             else:
-                # For weekly, monthly, or multi-day repeats, use full datetime
-                interval_days = {
-                    'day': repeat_number,
-                    'week': repeat_number * 7,
-                    'month': repeat_number * 30,  # approximate
-                    'year': repeat_number * 365   # approximate
-                }
-                
-                days = interval_days.get(repeat_unit, 0)
-                next_due = last_completed_dt + timedelta(days=days)
-                
-                if datetime.now() >= next_due:
-                    available.append(task)
+                self._due_at[task['id']] = due
+                self._due_heap.append((due, self._order[task['id']], task['id']))
+        heapq.heapify(self._due_heap)
+        self.availability_version += 1
+    
+    def _reschedule(self, task):
+        """Update the available set and due heap for one changed task"""
+        if self._available_day is None:
+            return  # Not computed yet; the next read builds it
+        now = datetime.now()
+        if now.date() != self._available_day:
+            self._available_day = None  # The day rolled over; rebuild on the next read
+            return
+        was_available = self._unschedule(task['id'])
+        
+        due = self._next_due(task) if task.get('status') == 'active' else None
+        is_available = due is not None and due <= now and self._allowed_on(task, now)
+        if is_available:
+            self._make_available(task)
+        elif due is not None and due > now:
+            self._due_at[task['id']] = due
+            heapq.heappush(self._due_heap, (due, self._order[task['id']], task['id']))
+        if is_available != was_available:
+            self.availability_version += 1
+    
+    def _unschedule(self, task_id):
+        """Drop a task from the available set and due heap; returns whether it was available"""
+        if self._available_day is None:
+            return False
+        self._due_at.pop(task_id, None)  # Its heap entry, if any, is now stale
+        if self._available[None].pop(task_id, None) is None:
+            return False
+        for bucket in self._available.values():
+            bucket.pop(task_id, None)
+        return True
+    
+    def _make_available(self, task):
+        self._insert_ordered(self._available[None], task)
+        if task.get('priority') in self._available:
+            self._insert_ordered(self._available[task['priority']], task)
+    
+    @staticmethod
+    def _allowed_on(task, now):
+        """Whether the task may be done on now's weekday (allowed_days: 0=Monday ... 6=Sunday)"""
+        allowed_days = task.get('allowed_days')
+        return not allowed_days or now.weekday() in allowed_days
+    
+    def _next_due(self, task):
+        """When the task's repeat schedule makes it available again: datetime.min if it
+        already is (never completed), None for a completed one-time task or a finished rule"""
+        last_completed = task.get('last_completed')
+        
+        # If never completed, always show
+        if last_completed is None:
+            return datetime.min
+        
+        # If no repeat settings, hide after first completion (one-time task)
+        rule = self.recurrence(task)
+        if rule is None:
+            return None
+        
+        completed_on = _parse_date(last_completed)
+        if completed_on is None:
+            return datetime.min
         
-        return available
+        # Back at the start of the first occurrence after the day it was completed
+        # (completing it also covers any occurrences missed before that)
+        occurrence = rule.after(completed_on)
+        return datetime.combine(occurrence, datetime.min.time()) if occurrence else None
+    
+    def recurrence(self, task):
+        """The task's Recurrence, or None for a one-time task; cached until its repeat settings change"""
+        key = (task.get('repeat_number'), task.get('repeat_unit'), task.get('repeat_by'),
+               task.get('repeat_until'), task.get('repeat_weekdays'), task.get('created_at'))
+        cached = self._recurrences.get(task['id'])
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        rule = Recurrence.from_task(task)
+        self._recurrences[task['id']] = (key, rule)
+        return rule
+    
+    def get_week_plan(self, day=None):
+        """What's due in the week (Monday to Sunday) of day: [(date, [tasks])], one entry per day.
+        
+        Lists each occurrence of an active repeating task that isn't done yet (completed
+        on or after it), on the first of its allowed days from then on, as that is when it
+        shows up. Cached until the tasks change or the week does.
+        """
+        day = day or datetime.now().date()
+        monday = day - timedelta(days=day.weekday())
+        with self._lock:
+            if self._week_plan is not None and self._week_plan[:2] == (self.version, monday):
+                return self._week_plan[2]
+            sunday = monday + timedelta(days=6)
+            by_day = {monday + timedelta(days=i): [] for i in range(7)}
+            for task in self.get_all_active_tasks():
+                rule = self.recurrence(task)
+                if rule is None:
+                    continue
+                done = _parse_date(task.get('last_completed'))
+                allowed_days = task.get('allowed_days')
+                planned = set()
+                # An occurrence in the week before may only become available this week
+                for occurrence in rule.between(monday - timedelta(days=6), sunday):
+                    if done is not None and occurrence <= done:
+                        continue
+                    if allowed_days:
+                        occurrence += timedelta(days=min((d - occurrence.weekday()) % 7 for d in allowed_days))
+                    if monday <= occurrence <= sunday and occurrence not in planned:
+                        planned.add(occurrence)
+                        by_day[occurrence].append(task)
+            plan = list(by_day.items())
+            self._week_plan = (self.version, monday, plan)
+            return plan
 
 
 class SessionLogger:
@@ -739,6 +2520,7 @@ class SessionLogger:
         
         self.sessions = [] # Holds ALL loaded sessions (today + history if loaded)
         self.today_sessions_cache = [] # Only today's sessions
+        self._listeners = []  # Called with each newly logged session
         
         # 1. Automatic Migration Check
         self._check_and_migrate_legacy()
@@ -855,13 +2637,7 @@ class SessionLogger:
 
     def load_all_sessions(self):
         """Load history AND today sessions (Slow) - Call before Analytics"""
-        history = []
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r') as f:
-                    data = json.load(f)
-                    history = data.get('sessions', [])
-            except: pass
+        history = self.read_history()
             
         # Refresh today just in case
         self.load_today_sessions()
@@ -870,6 +2646,21 @@ class SessionLogger:
         self.sessions = history + self.today_sessions_cache
         return self.sessions
 
+    def read_history(self):
+        """Sessions in the history file (before today), without loading them into self.sessions"""
+        history = []
+        if os.path.exists(self.history_file):
+            try:
+                with open(self.history_file, 'r') as f:
+                    data = json.load(f)
+                    history = data.get('sessions', [])
+            except: pass
+        return history
+
+    def add_listener(self, callback):
+        """Call callback(session) after each session is logged"""
+        self._listeners.append(callback)
+
     def load_sessions(self):
         """Compat method - default to loading today only for safety"""
         return self.load_today_sessions()
@@ -927,6 +2718,12 @@ class SessionLogger:
             self.today_sessions_cache.append(session)
             
         self.save_sessions()
+        EVENTS.publish('session', session)
+        for callback in self._listeners:
+            try:
+                callback(session)
+            except Exception as e:
+                print(f"Error in session listener: {e}")
         return session
 
     def update_session_feedback(self, session_id, mood=None, reflection=None, blockers=None):
@@ -941,6 +2738,7 @@ class SessionLogger:
                 if mood is not None: session['mood'] = mood
                 if reflection is not None: session['reflection'] = reflection
                 if blockers is not None: session['blockers'] = blockers
+                EVENTS.publish('session', session)
                 
                 # Check if this session is in today's cache
                 for ts in self.today_sessions_cache:
@@ -1048,12 +2846,170 @@ class SessionLogger:
         return moods
 
 
+class FocusRollup:
+    """Focus seconds per task, rolled up the task tree (see TaskManager parent_id).
+    
+    own[id] is the time logged on a task itself and total[id] adds the totals of its
+    subtasks. Logging time walks up the task's ancestors and moving a task moves its
+    total between the old and new ancestors, both O(depth), so the sessions are only
+    read once, when the rollup is built. Links of deleted tasks are kept, so their
+    time still counts towards their project.
+    """
+    
+    MAX_DEPTH = 64  # Walks stop here, whatever the links say
+    
+    def __init__(self):
+        self.own = {}
+        self.total = {}
+        self.parent = {}  # id -> parent id
+        self.tree_version = None  # TaskManager.tree_version the links were last synced at
+        self._counted = set()  # Ids of the sessions added so far
+    
+    def _walk(self, task_id):
+        """task_id and its ancestors"""
+        node = task_id
+        for _ in range(self.MAX_DEPTH):
+            if node is None:
+                return
+            yield node
+            node = self.parent.get(node)
+    
+    def add(self, task_id, seconds):
+        """Count seconds logged on task_id (and on each of its ancestors)"""
+        self.own[task_id] = self.own.get(task_id, 0) + seconds
+        for node in self._walk(task_id):
+            self.total[node] = self.total.get(node, 0) + seconds
+    
+    def add_session(self, session):
+        """Count a logged session once (a rollup built while it was being logged already has it)"""
+        task_id = session.get('task_id')
+        if not task_id or session.get('id') in self._counted:
+            return
+        self._counted.add(session.get('id'))
+        self.add(task_id, session.get('duration_seconds', session.get('duration_minutes', 0) * 60))
+    
+    def move(self, task_id, parent_id):
+        """Put task_id under parent_id, taking its rolled-up time along"""
+        old_parent = self.parent.get(task_id)
+        if parent_id == old_parent:
+            return
+        seconds = self.total.get(task_id, 0)
+        if seconds:
+            for node in self._walk(old_parent):
+                self.total[node] -= seconds
+        if parent_id is None:
+            self.parent.pop(task_id, None)
+        else:
+            self.parent[task_id] = parent_id
+        if seconds:
+            for node in self._walk(parent_id):
+                self.total[node] = self.total.get(node, 0) + seconds
+    
+    def sync(self, task_manager):
+        """Pick up parent changes made in task_manager since the last sync"""
+        if self.tree_version == task_manager.tree_version:
+            return
+        self.tree_version = task_manager.tree_version
+        # Tasks with time or a link here may have moved before they were deleted
+        links = task_manager.parent_links(self.own.keys() | self.parent.keys())
+        changed = {task_id: parent_id for task_id, parent_id in links.items()
+                   if self.parent.get(task_id) != parent_id}
+        # Detach first: moving one at a time could briefly loop (A under B before B leaves A)
+        for task_id in changed:
+            self.move(task_id, None)
+        for task_id, parent_id in changed.items():
+            self.move(task_id, parent_id)
+    
+    @classmethod
+    def from_sessions(cls, sessions, task_manager):
+        """Rollup of sessions over task_manager's tree (deleted tasks' links come from the archive)"""
+        rollup = cls()
+        rollup.tree_version = task_manager.tree_version
+        task_ids = {session.get('task_id') for session in sessions} - {None}
+        rollup.parent = {k: v for k, v in task_manager.parent_links(task_ids).items() if v}
+        for session in sessions:
+            rollup.add_session(session)
+        return rollup
+
+
 class Analytics:
     """Generate analytics and reports"""
     
     def __init__(self, session_logger, task_manager):
         self.logger = session_logger
         self.task_manager = task_manager
+        self._rollups = {}  # period -> (day it was built for, FocusRollup) (see focus_rollup)
+        # Logged to on the main thread (inside task transactions), read by the API too. Always
+        # taken after the task lock, as building or syncing a rollup reads the task tree.
+        self._rollup_lock = threading.Lock()
+        session_logger.add_listener(self._on_session_logged)
+    
+    def focus_rollup(self, period='today'):
+        """FocusRollup of 'today' or 'all' the logged sessions: built on first use (all reads the
+        history file), then updated as sessions are logged"""
+        if period not in ('today', 'all'):
+            raise ValueError("period must be today or all")
+        today = datetime.now().date()
+        with self.task_manager.lock, self._rollup_lock:
+            cached = self._rollups.get(period)
+            if cached is None or period == 'today' and cached[0] != today:
+                sessions = list(self.logger.today_sessions_cache)
+                if period == 'all':
+                    sessions = self.logger.read_history() + sessions
+                self._rollups[period] = (today, FocusRollup.from_sessions(sessions, self.task_manager))
+            rollup = self._rollups[period][1]
+            rollup.sync(self.task_manager)
+            return rollup
+    
+    def _on_session_logged(self, session):
+        """Add a newly logged session to the rollups built so far"""
+        if not session.get('task_id'):
+            return
+        try:
+            day = datetime.fromisoformat(session['start_time']).date()
+        except (KeyError, ValueError):
+            day = datetime.now().date()
+        with self.task_manager.lock, self._rollup_lock:
+            for period, (built_for, rollup) in self._rollups.items():
+                if period == 'today' and built_for != day:
+                    continue
+                rollup.sync(self.task_manager)
+                rollup.add_session(session)
+    
+    def get_project_times(self, period='today'):
+        """Rolled-up focus time of each project and its subtasks, as a tree:
+        [{'id', 'name', 'priority', 'seconds' (with subtasks), 'own_seconds', 'subtasks': [...]}]"""
+        rollup = self.focus_rollup(period)
+        
+        def node(task, subtasks):
+            return {
+                'id': task['id'],
+                'name': task['name'],
+                'priority': task['priority'],
+                'seconds': rollup.total.get(task['id'], 0),
+                'own_seconds': rollup.own.get(task['id'], 0),
+                'subtasks': [node(*subtask) for subtask in subtasks],
+            }
+        
+        return [node(*project) for project in self.task_manager.get_project_tree()]
+    
+    def get_project_breakdown(self):
+        """Focus time per project and its subtasks, today and all time"""
+        today, all_time = self.focus_rollup('today'), self.focus_rollup('all')
+        projects = self.task_manager.get_project_tree()
+        if not projects:
+            return "No projects yet.\n\nTo start one, edit a task and pick the project (task) it belongs to."
+        
+        def fmt(task):
+            today_secs, all_secs = today.total.get(task['id'], 0), all_time.total.get(task['id'], 0)
+            return f"{today_secs // 3600}h {(today_secs % 3600) // 60}m / {all_secs // 3600}h {(all_secs % 3600) // 60}m"
+        
+        lines = ["📁 Focus Time per Project (today / all time)", "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"]
+        for project, subtasks in sorted(projects, key=lambda p: all_time.total.get(p[0]['id'], 0), reverse=True):
+            lines.append(f"\n{project['priority'][0]} {project['name']}: {fmt(project)}")
+            for subtask, _ in subtasks:
+                lines.append(f"   • {subtask['name'][:24]}: {fmt(subtask)}")
+        return '\n'.join(lines)
     
     def generate_daily_summary(self):
         """Generate today's summary"""
@@ -1079,7 +3035,7 @@ class Analytics:
         if task_times:
             top_task_id = max(task_times, key=task_times.get)
             top_task_mins = task_times[top_task_id]
-            top_task_obj = self.task_manager.get_task(top_task_id)
+            top_task_obj = self.task_manager.get_task(top_task_id) or self.task_manager.archive.get(top_task_id)
             if top_task_obj:
                 top_task = f"{top_task_obj['name']} ({top_task_mins // 60}h {top_task_mins % 60}m)"
         
@@ -1545,11 +3501,12 @@ def time_in_range(current, start, end):
     return start <= current < end
 
 
-def get_current_activity():
-    """Get what should be happening right now based on schedule"""
+def get_current_activity(now=None):
+    """Get what should be happening right now (or at `now`) based on schedule"""
     global DYNAMIC_SCHEDULE_ACTIVE
     
-    now = datetime.now()
+    if now is None:
+        now = datetime.now()
     current_time = now.strftime("%H:%M")
     current_fixed = None
     current_dynamic = None
@@ -1603,56 +3560,327 @@ def get_current_activity():
     return current_fixed or current_dynamic
 
 
+# A queued notification; sound is a macOS sound name ("Glass") or None for the default
+Notification = namedtuple('Notification', ['title', 'subtitle', 'message', 'sound'])
+
+
+def _applescript_string(text):
+    """Quote text as an AppleScript string literal"""
+    return '"' + str(text).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class RumpsNotificationBackend:
+    """Posts through rumps / Notification Center (always with the default sound).
+
+    AppKit must be called on the main thread, so when PyObjC is available a post from
+    the dispatcher's worker is handed to the main run loop (AppHelper.callAfter).
+    """
+
+    def __init__(self):
+        try:
+            from PyObjCTools import AppHelper
+            self._call_after = AppHelper.callAfter
+        except ImportError:
+            self._call_after = None
+
+    def send(self, note):
+        if self._call_after and threading.current_thread() is not threading.main_thread():
+            self._call_after(self._post, note)
+        else:
+            self._post(note)
+
+    @staticmethod
+    def _post(note):
+        try:
+            rumps.notification(note.title, note.subtitle, note.message)
+        except Exception as e:
+            print(f"⚠️ Could not show notification '{note.title}': {e}")
+
+
+class OsascriptNotificationBackend:
+    """Posts with `osascript -e 'display notification ...'`, which supports named sounds"""
+
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+
+    def send(self, note):
+        script = f'display notification {_applescript_string(note.message)} with title {_applescript_string(note.title)}'
+        if note.subtitle:
+            script += f' subtitle {_applescript_string(note.subtitle)}'
+        if note.sound:
+            script += f' sound name {_applescript_string(note.sound)}'
+        subprocess.run(['osascript', '-e', script], timeout=self.timeout)
+
+
+class AutoNotificationBackend:
+    """osascript for notifications with a named sound (on the worker), rumps for everything
+    else (on the main thread)"""
+
+    def __init__(self):
+        self.rumps = RumpsNotificationBackend()
+        self.osascript = OsascriptNotificationBackend()
+
+    def send(self, note):
+        if note.sound:
+            self.osascript.send(note)
+        else:
+            self.rumps.send(note)
+
+
+class RecordingNotificationBackend:
+    """Keeps sent notifications in memory instead of showing them (tests, headless runs).
+    With maxlen=0 nothing is kept, which makes it a no-op backend."""
+
+    def __init__(self, maxlen=None):
+        self.sent = deque(maxlen=maxlen)
+
+    def send(self, note):
+        self.sent.append(note)
+
+
+NOTIFICATION_BACKENDS = {
+    "auto": AutoNotificationBackend,
+    "rumps": RumpsNotificationBackend,
+    "osascript": OsascriptNotificationBackend,
+    "none": lambda: RecordingNotificationBackend(maxlen=0),
+}
+
+
+class NotificationDispatcher:
+    """Delivers notifications from a worker thread so a slow backend never blocks the timer.
+
+    post() only enqueues. The worker waits BATCH_WINDOW_SECONDS after the first
+    notification for more to arrive, drops any already sent within
+    DEDUPE_WINDOW_SECONDS, and merges whatever is left of a burst into one summary.
+    """
+
+    BATCH_WINDOW_SECONDS = 0.5
+    DEDUPE_WINDOW_SECONDS = 10
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._queue = queue.Queue()
+        self._recent = {}  # (title, subtitle, message) -> monotonic time it was last sent
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def set_backend(self, backend):
+        """Swap the backend; takes effect from the next delivery"""
+        self.backend = backend
+
+    def post(self, title, subtitle="", message="", sound=None):
+        """Queue a notification (any thread, returns immediately)"""
+        self._ensure_worker()
+        self._queue.put(Notification(title, subtitle, message, sound))
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="notifications", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.BATCH_WINDOW_SECONDS
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._deliver(batch)
+
+    def _deliver(self, batch):
+        now = time.monotonic()
+        for key, sent_at in list(self._recent.items()):
+            if now - sent_at >= self.DEDUPE_WINDOW_SECONDS:
+                del self._recent[key]
+        
+        fresh = []
+        for note in batch:
+            key = (note.title, note.subtitle, note.message)
+            if key in self._recent:
+                continue
+            self._recent[key] = now
+            fresh.append(note)
+        if not fresh:
+            return
+        
+        note = fresh[0] if len(fresh) == 1 else self._summarize(fresh)
+        try:
+            self.backend.send(note)
+        except Exception as e:
+            print(f"⚠️ Could not show notification '{note.title}': {e}")
+
+    @staticmethod
+    def _summarize(notes):
+        """One notification standing in for a burst: the latest in full, earlier titles listed"""
+        latest = notes[-1]
+        sound = next((n.sound for n in notes if n.sound), None)
+        earlier = "Also: " + " · ".join(n.title for n in notes[:-1])
+        return Notification(
+            title=f"{latest.title} (+{len(notes) - 1} more)",
+            subtitle=latest.subtitle,
+            message=f"{latest.message}\n{earlier}" if latest.message else earlier,
+            sound=sound,
+        )
+
+
+NOTIFIER = NotificationDispatcher(AutoNotificationBackend())
+
+
+def notify(title, subtitle="", message="", sound=None):
+    """Show a notification without blocking the caller (see NotificationDispatcher)"""
+    NOTIFIER.post(title, subtitle, message, sound)
+
+
 def send_notification(title, message, sound="Glass"):
-    """Send macOS notification"""
-    script = f'display notification "{message}" with title "{title}" sound name "{sound}"'
-    try:
-        subprocess.run(['osascript', '-e', script], timeout=5)
-    except:
-        pass
+    """Send macOS notification with a named sound"""
+    notify(title, "", message, sound)
+
+
+# Immutable per-tick view of the schedule state. update_timer computes it once and
+# passes it down so every decision in a tick agrees, even across a minute boundary.
+TickSnapshot = namedtuple('TickSnapshot', [
+    'now',            # datetime of the tick
+    'activity',       # current schedule item or None
+    'next_activity',  # "Next: ..." text for the menu
+    'in_schedule',    # within fixed schedule hours
+    'icons',          # icon settings at the time of the tick
+])
+
+
+class TickCache:
+    """Values reused across update_timer ticks while their inputs are unchanged.
+
+    Schedule lookups only change on minute boundaries (or when the dynamic schedule
+    or settings change) and activity timing only when the activity does, so a
+    steady-state tick reuses these instead of re-parsing and re-formatting them.
+    """
+
+    def __init__(self):
+        # Minute-level values: [day, hour, minute] they were computed for
+        self._minute_stamp = [None, None, None]
+        self.in_schedule = False
+        self.at_schedule_end = False
+        
+        # Activity lookups, also invalidated when the dynamic schedule changes
+        self._activity_stamp = [None, None, None]
+        self._activity_dynamic = None
+        self._activity_dynamic_active = None
+        self.activity = None
+        
+        # "Next: ..." text, also invalidated when icons change
+        self._next_stamp = [None, None, None]
+        self._next_dynamic = None
+        self._next_dynamic_active = None
+        self._next_settings_version = None
+        self.next_info_title = None
+        
+        self._icons_version = None
+        self.icons = {}
+        
+        # Per-activity timing (parsed once per activity per day)
+        self._timed_activity = None
+        self._timed_day = None
+        self.start_dt = None
+        self.end_dt = None
+        self.total_seconds = 0
+        
+        self._clock_dt = None
+        self._clock_str = None
+        
+        # Menu bar title for WORK with a task (changes only with task or activity)
+        self._work_title_inputs = (None, None, None)
+        self.work_title = None
+
+    @staticmethod
+    def _same_minute(stamp, now):
+        return stamp[2] == now.minute and stamp[1] == now.hour and stamp[0] == now.day
+
+    @staticmethod
+    def _set_stamp(stamp, now):
+        stamp[0] = now.day
+        stamp[1] = now.hour
+        stamp[2] = now.minute
+
+    def update_minute(self, now, is_within_schedule_hours):
+        """Recompute minute-level flags when now is in a new minute"""
+        if self._same_minute(self._minute_stamp, now):
+            return
+        self._set_stamp(self._minute_stamp, now)
+        self.in_schedule = is_within_schedule_hours(now)
+        
+        self.at_schedule_end = False
+        if SCHEDULE:
+            end_hour, end_minute = map(int, SCHEDULE[-1]["end"].split(":"))
+            self.at_schedule_end = now.hour == end_hour and now.minute == end_minute
+
+    def get_activity(self, now):
+        """Current activity, looked up again only on a new minute or dynamic schedule change"""
+        if (not self._same_minute(self._activity_stamp, now)
+                or self._activity_dynamic is not DYNAMIC_SCHEDULE
+                or self._activity_dynamic_active != DYNAMIC_SCHEDULE_ACTIVE):
+            self.activity = get_current_activity(now)
+            # get_current_activity may clear the dynamic schedule, so stamp afterwards
+            self._set_stamp(self._activity_stamp, now)
+            self._activity_dynamic = DYNAMIC_SCHEDULE
+            self._activity_dynamic_active = DYNAMIC_SCHEDULE_ACTIVE
+        return self.activity
+
+    def get_icons(self, settings_manager):
+        """Copy of the icon settings, refreshed only when settings are saved"""
+        if self._icons_version != settings_manager.version:
+            self.icons = dict(settings_manager.settings.get("icons", {}))
+            self._icons_version = settings_manager.version
+        return self.icons
+
+    def get_next_info_title(self, now, settings_version, find_next_activity):
+        """"Next: ..." menu text, rebuilt only when its inputs change"""
+        if (not self._same_minute(self._next_stamp, now)
+                or self._next_dynamic is not DYNAMIC_SCHEDULE
+                or self._next_dynamic_active != DYNAMIC_SCHEDULE_ACTIVE
+                or self._next_settings_version != settings_version):
+            self.next_info_title = f"Next: {find_next_activity(now, self.icons)}"
+            self._set_stamp(self._next_stamp, now)
+            self._next_dynamic = DYNAMIC_SCHEDULE
+            self._next_dynamic_active = DYNAMIC_SCHEDULE_ACTIVE
+            self._next_settings_version = settings_version
+        return self.next_info_title
 
+    def update_timing(self, activity, now):
+        """Parse the activity's start/end into today's datetimes once per activity"""
+        if activity is self._timed_activity and now.day == self._timed_day:
+            return
+        start_time = datetime.strptime(activity["start"], "%H:%M").time()
+        end_time = datetime.strptime(activity["end"], "%H:%M").time()
+        self.start_dt = now.replace(hour=start_time.hour, minute=start_time.minute, second=0, microsecond=0)
+        self.end_dt = now.replace(hour=end_time.hour, minute=end_time.minute, second=0, microsecond=0)
+        self.total_seconds = (self.end_dt - self.start_dt).total_seconds()
+        self._timed_activity = activity
+        self._timed_day = now.day
 
-def open_break_mode(duration_minutes=5):
-    """Open the Zen Mode animation (break.html) with specific duration"""
-    try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        break_path = os.path.join(current_dir, "break.html")
-        
-        if os.path.exists(break_path):
-            # Create a temporary HTML file with duration embedded
-            with open(break_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Replace the default duration in the HTML - look for the exact line
-            content = content.replace(
-                "const durationMinutes = parseInt(urlParams.get('duration')) || 5;",
-                f'const durationMinutes = {duration_minutes}; // Duration set by Python'
-            )
-            
-            # Write to temp file
-            temp_path = os.path.join(current_dir, "break_temp.html")
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
-            # Open the temp file
-            webbrowser.open(f"file://{temp_path}")
-            
-            print(f"Opened Zen Mode with duration: {duration_minutes} minutes")
-            
-            # Schedule cleanup of temp file after 5 minutes
-            def cleanup_temp_file():
-                time.sleep(300)  # 5 minutes
-                try:
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-                        print(f"Cleaned up temp file: {temp_path}")
-                except:
-                    pass
-            
-            threading.Thread(target=cleanup_temp_file, daemon=True).start()
-            
-    except Exception as e:
-        print(f"Error opening Zen Mode: {e}")
+    def format_clock(self, dt):
+        """dt as HH:MM:SS, formatted again only when dt changes"""
+        if dt is not self._clock_dt:
+            self._clock_str = dt.strftime("%H:%M:%S")
+            self._clock_dt = dt
+        return self._clock_str
+
+    def get_work_title(self, task, activity):
+        """"WORK - <task> - <end>" menu bar title, rebuilt only when task or activity changes"""
+        name = task['name']
+        inputs = self._work_title_inputs
+        if inputs[0] is not task or inputs[1] is not name or inputs[2] is not activity:
+            task_name = name
+            if len(task_name) > 15:
+                task_name = task_name[:12] + "..."
+            self.work_title = f"WORK - {task_name} - {activity['end']}"
+            self._work_title_inputs = (task, name, activity)
+        return self.work_title
 
 
 class SleepWakeObserver:
@@ -1741,7 +3969,334 @@ class SleepWakeObserver:
             self._observer_registered = False
 
 
+def longest_increasing_run(values):
+    """Return the indices of a longest strictly increasing subsequence of values"""
+    tails = []  # tails[k] = index of smallest tail of an increasing run of length k+1
+    previous = [None] * len(values)
+
+    for i, value in enumerate(values):
+        # Binary search for the run this value extends
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if values[tails[mid]] < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        previous[i] = tails[lo - 1] if lo > 0 else None
+        if lo == len(tails):
+            tails.append(i)
+        else:
+            tails[lo] = i
+
+    # Walk back from the tail of the longest run
+    indices = []
+    i = tails[-1] if tails else None
+    while i is not None:
+        indices.append(i)
+        i = previous[i]
+    return indices[::-1]
+
+
+_LAZY_MENU_DELEGATE_CLASS = None
+
+
+def _lazy_menu_delegate_class():
+    """Create (once) the NSMenuDelegate class used to populate submenus on open"""
+    global _LAZY_MENU_DELEGATE_CLASS
+    if _LAZY_MENU_DELEGATE_CLASS is None:
+        from AppKit import NSObject
+
+        class LazyMenuDelegate(NSObject):
+            callback = None
+
+            def menuWillOpen_(self, menu):
+                if self.callback:
+                    self.callback()
+
+        _LAZY_MENU_DELEGATE_CLASS = LazyMenuDelegate
+    return _LAZY_MENU_DELEGATE_CLASS
+
+
+# A state change requested by another thread, applied by MainThreadCommands.drain()
+Command = namedtuple('Command', ['name', 'func', 'args', 'future'])
+
+
+class MainThreadCommands:
+    """Queue of state changes from other threads (the local server), applied on the main thread.
+
+    Handlers call() a function and wait for its result; the main thread drain()s the
+    queue each tick, running everything queued so far in order inside one TaskManager
+    transaction (each command in a savepoint of its own), so a burst of web edits is
+    written once and refreshes the menu once. When PyObjC is available the main run loop is also woken right away
+    (AppHelper.callAfter), so commands don't wait for the next tick or idle mode.
+    """
+
+    MAX_BATCH = 100
+    TIMEOUT_SECONDS = 10  # How long a handler waits (e.g. while a modal dialog blocks the main thread)
+
+    def __init__(self, task_manager):
+        self.task_manager = task_manager
+        self._queue = queue.SimpleQueue()
+        self._draining = False
+        try:
+            from PyObjCTools import AppHelper
+            self._wake = lambda: AppHelper.callAfter(self.drain)
+        except ImportError:
+            self._wake = None
+
+    def submit(self, name, func, *args):
+        """Queue func(*args) for the main thread; returns a Future for its result"""
+        future = Future()
+        self._queue.put(Command(name, func, args, future))
+        if self._wake:
+            self._wake()
+        return future
+
+    def call(self, name, func, *args):
+        """Run func(*args) on the main thread and return its result (or raise its exception).
+        Raises TimeoutError if the main thread doesn't get to it in time (it is then dropped)."""
+        if threading.current_thread() is threading.main_thread():
+            return func(*args)
+        future = self.submit(name, func, *args)
+        try:
+            return future.result(self.TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            if not future.cancel():
+                return future.result()  # The main thread just started it; its batch is finishing
+            raise TimeoutError(f"Timed out waiting for the app to run '{name}'") from None
+
+    def drain(self):
+        """Apply queued commands (main thread only); returns how many ran"""
+        if self._queue.empty():
+            return 0  # The common case on every tick; skip building anything
+        if self._draining:
+            # Called again from inside a command (e.g. stop -> update_timer); newer commands
+            # wait for the next drain rather than run inside this command's savepoint
+            return 0
+        self._draining = True
+        try:
+            return self._drain_batch()
+        finally:
+            self._draining = False
+
+    def _drain_batch(self):
+        batch = []
+        while len(batch) < self.MAX_BATCH:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            return 0
+        
+        # Each command runs in its own savepoint, so one that fails (or leaves the tasks
+        # invalid) is undone without spoiling the rest of the batch. Commands whose caller
+        # already gave up (see call) are skipped.
+        outcomes = []
+        try:
+            with self.task_manager.transaction():
+                for command in batch:
+                    if not command.future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with self.task_manager.transaction():
+                            result = command.func(*command.args)
+                    except Exception as e:
+                        outcomes.append((command, None, e))
+                    else:
+                        outcomes.append((command, result, None))
+        except Exception as e:
+            # Only reachable if the batch as a whole can't commit; none of its task changes are kept
+            outcomes = [(command, None, e) for command, _, _ in outcomes]
+        
+        for command, result, error in outcomes:
+            if error is None:
+                command.future.set_result(result)
+            else:
+                command.future.set_exception(error)
+        return len(batch)
+
+
+class RefreshScheduler:
+    """Coalesces menu refresh requests into at most one refresh per timer tick.
+
+    request() only marks the menu dirty, so it is cheap and safe to call from any
+    thread (e.g. HTTP handlers). flush() runs on the main thread from the 1s timer
+    and performs a single refresh however many requests arrived since the last one.
+    """
+
+    def __init__(self, refresh):
+        self.refresh = refresh
+        self._dirty = threading.Event()
+
+    def request(self):
+        """Mark the menu as needing a refresh"""
+        self._dirty.set()
+
+    def flush(self):
+        """Run the refresh if one was requested (main thread only)"""
+        if not self._dirty.is_set():
+            return False
+        # Clear first so requests made during the refresh are not lost
+        self._dirty.clear()
+        self.refresh()
+        return True
+
+
+class TaskMenuModel:
+    """Grouped task submenu that is updated by diffing instead of rebuilding.
+
+    The submenu keeps a skeleton (a header and separator per group - by default the
+    priorities - plus a "No active tasks" placeholder) which is shown or hidden as
+    groups fill up. Task items are keyed by task id, so sync() only inserts, removes,
+    moves or retitles the MenuItems whose task actually changed.
+    """
+
+    PRIORITIES = ['High', 'Medium', 'Low']
+    PRIORITY_GROUPS = [(p, f"=== {p.upper()} PRIORITY ===") for p in PRIORITIES]
+
+    def __init__(self, title, make_callback, groups=PRIORITY_GROUPS):
+        self.menu_item = rumps.MenuItem(title)
+        self.make_callback = make_callback  # task_id -> menu callback
+        self._groups = None  # [(group key, header title)] of the current skeleton
+        self._keys = {}  # group key -> task ids currently shown, in order
+        self._titles = {}  # task_id -> title currently shown
+        self._hidden = {}  # skeleton key -> hidden state currently applied
+
+        # Lazy population (see make_lazy)
+        self.lazy = False
+        self._source = None
+        self._built_version = None
+
+        self.set_groups(groups)
+
+    def set_groups(self, groups):
+        """Use groups ([(key, header title)], in menu order) for the skeleton. Only rebuilds
+        when they changed (e.g. a project was added or renamed), dropping all task items."""
+        groups = list(groups)
+        if groups == self._groups:
+            return
+        # rumps only creates the NSMenu once the first item is added, so a fresh
+        # MenuItem cannot be cleared
+        if self._groups is not None:
+            self.menu_item.clear()
+        self._groups = groups
+        self._keys = {key: [] for key, _ in groups}
+        self._titles = {}
+        self._hidden = {}
+        # Task items are inserted after their group header
+        for i, (key, header) in enumerate(groups):
+            if i:
+                self.menu_item[f"sep:{key}"] = rumps.separator
+            self.menu_item[f"hdr:{key}"] = rumps.MenuItem(header, callback=None)
+        self.menu_item["placeholder"] = rumps.MenuItem("No active tasks", callback=None)
+        self._update_skeleton()
+
+    def sync(self, grouped, format_label):
+        """Bring the submenu in line with grouped ({group key: [tasks]}, e.g. {priority: [tasks]}
+        as TaskManager buckets them), touching only the items that changed"""
+        # 1. Drop items that left their group (deleted, unavailable, re-prioritised or moved)
+        #    before inserting anything, so a task moving between groups never collides
+        #    with its own stale item.
+        # 2. Within a group, keep the longest run already in the right order and
+        #    re-insert the rest.
+        stable_by_group = {}
+        for group, _ in self._groups:
+            position = {t['id']: i for i, t in enumerate(grouped.get(group, ()))}
+            current = []
+            for task_id in self._keys[group]:
+                if task_id in position:
+                    current.append(task_id)
+                else:
+                    self._remove(task_id)
+
+            stable = set(current[i] for i in longest_increasing_run([position[k] for k in current]))
+            for task_id in current:
+                if task_id not in stable:
+                    self._remove(task_id)
+            stable_by_group[group] = stable
+
+        # 3. Walk the new order, inserting missing items and retitling changed ones
+        for group, _ in self._groups:
+            stable = stable_by_group[group]
+            previous_key = f"hdr:{group}"
+            for task in grouped.get(group, ()):
+                task_id = task['id']
+                title = format_label(task)
+                if task_id in stable:
+                    if self._titles[task_id] != title:
+                        self.menu_item[task_id].title = title
+                        self._titles[task_id] = title
+                else:
+                    # Create with the id as title so rumps keys it by id, then set the real label
+                    item = rumps.MenuItem(task_id, callback=self.make_callback(task_id))
+                    self.menu_item.insert_after(previous_key, item)
+                    item.title = title
+                    self._titles[task_id] = title
+                previous_key = task_id
+
+            self._keys[group] = [t['id'] for t in grouped.get(group, ())]
+
+        self._update_skeleton()
+
+    def make_lazy(self, load_tasks, format_label, version):
+        """Only populate the submenu when it is opened and version() has changed since.
+
+        Returns False (and stays eager) if the NSMenu delegate cannot be installed.
+        """
+        self._source = (load_tasks, format_label, version)
+        try:
+            self._delegate = _lazy_menu_delegate_class().alloc().init()
+            self._delegate.callback = self.ensure_current
+            self.menu_item._menu.setDelegate_(self._delegate)
+            self.lazy = True
+        except Exception as e:
+            print(f"⚠️ Could not make '{self.menu_item.title}' lazy, building eagerly: {e}")
+            self.lazy = False
+        return self.lazy
+
+    def ensure_current(self):
+        """Sync from the lazy source if the cached items are from an older version"""
+        load_tasks, format_label, version = self._source
+        current_version = version()
+        if current_version != self._built_version:
+            self.sync(load_tasks(), format_label)
+            self._built_version = current_version
+
+    def _remove(self, task_id):
+        """Remove a single task item from the submenu"""
+        del self.menu_item[task_id]
+        self._titles.pop(task_id, None)
+
+    def _set_hidden(self, key, hidden):
+        """Show or hide a skeleton item, only calling into AppKit when the state changes"""
+        if self._hidden.get(key) == hidden:
+            return
+        item = self.menu_item[key]
+        if hasattr(item, '_menuitem'):
+            item._menuitem.setHidden_(hidden)
+        self._hidden[key] = hidden
+
+    def _update_skeleton(self):
+        """Show headers/separators only around non-empty groups"""
+        seen_any = False
+        for i, (group, _) in enumerate(self._groups):
+            has_tasks = bool(self._keys[group])
+            if i:
+                self._set_hidden(f"sep:{group}", not (has_tasks and seen_any))
+            self._set_hidden(f"hdr:{group}", not has_tasks)
+            seen_any = seen_any or has_tasks
+        self._set_hidden("placeholder", seen_any)
+
+
 class PomodoroMenuBarApp(rumps.App):
+    # Longest single sleep in idle mode; the wake check re-arms itself until the deadline
+    IDLE_MAX_SLEEP_SECONDS = 3600
+    
+    # Local web server stops itself after this long without a request (restarted on demand)
+    SERVER_IDLE_TIMEOUT_SECONDS = 30 * 60
+
     def __init__(self):
         super(PomodoroMenuBarApp, self).__init__("🍅", quit_button=None)
         
@@ -1765,7 +4320,15 @@ class PomodoroMenuBarApp(rumps.App):
         self.analytics = Analytics(self.session_logger, self.task_manager)
         self.settings_manager = SettingsManager()
         
+        # Notification backend: "auto" (default), "rumps", "osascript" or "none"
+        backend_name = self.settings_manager.settings.get("notifications", {}).get("backend")
+        if backend_name in NOTIFICATION_BACKENDS:
+            NOTIFIER.set_backend(NOTIFICATION_BACKENDS[backend_name]())
+        elif backend_name:
+            print(f"⚠️ Unknown notification backend '{backend_name}', using the default")
+        
         self.current_activity = None
+        self._published_state_key = None  # Last state sent to /api/events streams
         self.break_shown = False
         self.current_task = None
         self.session_start_time = None
@@ -1790,8 +4353,28 @@ class PomodoroMenuBarApp(rumps.App):
         self.server_port = 7878
         self.server_thread = None
         self.httpd = None
+        self._server_lock = threading.Lock()
         self.last_go_home_date = None  # Track date of last go home page
         self.last_menu_date = datetime.now().date()  # Track date of last menu refresh
+        self.refresh_scheduler = RefreshScheduler(self.refresh_tasks_submenu)
+        self.task_manager.add_listener(self.request_refresh)  # Any task write refreshes the menu
+        self.commands = MainThreadCommands(self.task_manager)  # State changes from the local server
+        
+        # `pomodoro` command line client
+        self.control_server = ControlServer(self)
+        self.control_server.start()
+        atexit.register(self.control_server.close)
+        
+        # Values reused between ticks, and what is currently shown (to skip redundant Cocoa calls)
+        self.tick_cache = TickCache()
+        self._shown_titles = {}
+        self._shown_hidden = {}
+        self._task_display_inputs = None
+        
+        # Idle low-power mode (1s tick suspended while nothing is scheduled)
+        self._idle_tick_timer = None  # The suspended 1s rumps.Timer, None when ticking
+        self._idle_wake_timer = None
+        self._idle_until = None
         
         # Menu items - Session Info (with no-op callback to appear enabled)
         self.session_info = rumps.MenuItem("Not in session", callback=self.no_op)
@@ -1810,6 +4393,7 @@ class PomodoroMenuBarApp(rumps.App):
         # Build menu
         self.menu = [
             select_task_menu,    # Root level Select Task
+            rumps.MenuItem("🔍 Quick Switch...", callback=self.open_switch_page),  # Type to find a task
             None,                # Separator
             # self.session_info,
             self.task_info,
@@ -1831,7 +4415,6 @@ class PomodoroMenuBarApp(rumps.App):
         
         # Register shutdown handlers to save session on forced termination
         atexit.register(self.save_current_session_on_exit)
-        atexit.register(self.cleanup_temp_files)
         signal.signal(signal.SIGTERM, self._handle_signal)
         signal.signal(signal.SIGINT, self._handle_signal)
         
@@ -1909,9 +4492,10 @@ class PomodoroMenuBarApp(rumps.App):
                 DYNAMIC_SCHEDULE = schedule
                 DYNAMIC_SCHEDULE_ACTIVE = True
                 print("🔄 Dynamic schedule restored from file")
+                self.wake_from_idle()
                 
                 # Update Start/Stop button
-                self.start_stop_item.title = "⏹️ Stop Pomodoro"
+                self._show_title(self.start_stop_item, "⏹️ Stop Pomodoro")
                 self.update_timer(None)
             else:
                 clear_dynamic_schedule()
@@ -1924,7 +4508,6 @@ class PomodoroMenuBarApp(rumps.App):
         """Handle termination signals"""
         print(f"Received signal {signum}, saving session and exiting...")
         self.save_current_session_on_exit()
-        self.cleanup_temp_files()
         # Exit gracefully
         import sys
         sys.exit(0)
@@ -1967,12 +4550,12 @@ class PomodoroMenuBarApp(rumps.App):
             
             # IMPORTANT: Don't clear current_activity or it will look like session ended naturally
             # But we should stop the timer visually or mark it
-            rumps.notification("System Sleep", "Pomodoro session paused/logged", f"{duration_minutes}m logged")
+            notify("System Sleep", "Pomodoro session paused/logged", f"{duration_minutes}m logged")
             # Clear session start time to indicate no active session
             self.session_start_time = None
             
             # Show notification
-            rumps.notification(
+            notify(
                 title="⏸️ Session Paused",
                 subtitle=f"Logged {duration_minutes}min on {task_name}",
                 message="Timer will reset when you return"
@@ -1986,6 +4569,9 @@ class PomodoroMenuBarApp(rumps.App):
         """Handle laptop waking up or screen unlock - reset timer to 0"""
         print("☀️ System waking up/unlocking...")
         
+        # Clock may have jumped past the idle deadline while asleep
+        self.wake_from_idle()
+        
         # Check if we were paused due to sleep
         if self._paused_for_sleep:
             # Reset session start time to now (timer starts from 0)
@@ -1994,7 +4580,7 @@ class PomodoroMenuBarApp(rumps.App):
                 
                 # Show notification
                 task_name = self.current_task['name'] if self.current_task else 'Unknown'
-                rumps.notification(
+                notify(
                     title="▶️ Timer Reset",
                     subtitle=f"Back to {task_name}",
                     message="Timer restarted from 0"
@@ -2006,9 +4592,10 @@ class PomodoroMenuBarApp(rumps.App):
         else:
             print("ℹ️ No sleep-paused session to resume")
     
-    def is_within_schedule_hours(self):
-        """Check if current time is within schedule hours defined in SCHEDULE"""
-        now = datetime.now()
+    def is_within_schedule_hours(self, now=None):
+        """Check if current time (or `now`) is within schedule hours defined in SCHEDULE"""
+        if now is None:
+            now = datetime.now()
         # Weekend = outside schedule
         if now.weekday() >= 5:
             return False
@@ -2024,13 +4611,100 @@ class PomodoroMenuBarApp(rumps.App):
         
         return min(start_bounds) <= current_time_str < max(end_bounds)
     
+    def _show_title(self, target, title):
+        """Set the title of a menu item (or the menu bar when target is self) only if it changed"""
+        key = id(target)
+        if self._shown_titles.get(key) != title:
+            target.title = title
+            self._shown_titles[key] = title
+
+    def _show_hidden(self, item, hidden):
+        """Hide or show a menu item only if its visibility changed"""
+        key = id(item)
+        if self._shown_hidden.get(key) != hidden and hasattr(item, '_menuitem'):
+            item._menuitem.setHidden_(hidden)
+            self._shown_hidden[key] = hidden
+
+    def next_idle_wake_time(self, now):
+        """Next moment idle mode must wake up: the next fixed schedule start or midnight"""
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        if not SCHEDULE:
+            return midnight
+        
+        first_start = min(item["start"] for item in SCHEDULE)
+        hour, minute = map(int, first_start.split(":"))
+        for days_ahead in range(8):
+            day = now + timedelta(days=days_ahead)
+            if day.weekday() >= 5:
+                continue
+            start = day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if start > now:
+                return min(start, midnight)
+        return midnight
+
+    def enter_idle_mode(self, tick_timer, now):
+        """Suspend the 1s tick until the next scheduled start, midnight, a manual start or a wake event"""
+        self._idle_tick_timer = tick_timer
+        self._idle_until = self.next_idle_wake_time(now)
+        tick_timer.stop()
+        self._arm_idle_wake(now)
+        print(f"💤 Idle mode: nothing scheduled until {self._idle_until.strftime('%a %H:%M')}")
+
+    def _arm_idle_wake(self, now):
+        """(Re)start the wake timer for the remaining idle time"""
+        if self._idle_wake_timer:
+            self._idle_wake_timer.stop()
+        remaining = (self._idle_until - now).total_seconds()
+        interval = max(1, min(remaining, self.IDLE_MAX_SLEEP_SECONDS))
+        # rumps timers fire once immediately on start; that first call is skipped
+        self._idle_wake_skip = True
+        self._idle_wake_timer = rumps.Timer(self._check_idle_wake, interval)
+        self._idle_wake_timer.start()
+
+    def _check_idle_wake(self, _):
+        """Wake timer callback: resume ticking once the idle deadline is reached"""
+        if self._idle_wake_skip:
+            self._idle_wake_skip = False
+            return
+        now = datetime.now()
+        if now >= self._idle_until:
+            self.resume_from_idle()
+        else:
+            self._arm_idle_wake(now)
+
+    def resume_from_idle(self):
+        """Restart the 1s tick if idle mode suspended it (main thread only)"""
+        if self._idle_tick_timer is None:
+            return
+        if self._idle_wake_timer:
+            self._idle_wake_timer.stop()
+            self._idle_wake_timer = None
+        tick_timer = self._idle_tick_timer
+        self._idle_tick_timer = None
+        self._idle_until = None
+        print("⏰ Leaving idle mode")
+        tick_timer.start()  # Fires immediately, so the display updates right away
+
+    def wake_from_idle(self):
+        """Leave idle mode from any thread (timers must be restarted on the main run loop)"""
+        if self._idle_tick_timer is None:
+            return
+        if threading.current_thread() is threading.main_thread():
+            self.resume_from_idle()
+        else:
+            try:
+                from PyObjCTools import AppHelper
+                AppHelper.callAfter(self.resume_from_idle)
+            except Exception as e:
+                print(f"⚠️ Could not wake from idle mode: {e}")
+
     def toggle_manual_timer(self, _):
         """Start or stop manual Pomodoro timer using dynamic schedule"""
         global DYNAMIC_SCHEDULE_ACTIVE
         
         if self.is_within_schedule_hours():
             # During schedule hours, don't allow manual start
-            rumps.notification(
+            notify(
                 title="⏰ Schedule Active",
                 subtitle="Manual start disabled",
                 message="Use schedule during work hours (09:00-18:00)"
@@ -2048,15 +4722,16 @@ class PomodoroMenuBarApp(rumps.App):
         """Start manual Pomodoro timer by generating dynamic schedule"""
         # Generate schedule starting from now
         generate_dynamic_schedule(datetime.now())
+        self.wake_from_idle()
         
         # Update menu item
-        self.start_stop_item.title = "⏹️ Stop Pomodoro"
+        self._show_title(self.start_stop_item, "⏹️ Stop Pomodoro")
         
         # Prompt for task selection if no task selected
         if not self.current_task:
             self.prompt_task_selection()
         
-        rumps.notification(
+        notify(
             title="▶️ Pomodoro Started",
             subtitle="4 sessions (25min work + break)",
             message="Dynamic schedule generated! 💪"
@@ -2096,9 +4771,9 @@ class PomodoroMenuBarApp(rumps.App):
         self.reset_app_state()
         
         # Update menu item
-        self.start_stop_item.title = "▶️ Start Pomodoro"
+        self._show_title(self.start_stop_item, "▶️ Start Pomodoro")
         
-        rumps.notification(
+        notify(
             title="⏹️ Pomodoro Stopped",
             subtitle="Dynamic schedule cleared",
             message="Start again when ready"
@@ -2141,7 +4816,7 @@ class PomodoroMenuBarApp(rumps.App):
                 self.manual_time_remaining = 15 * 60  # 15 minutes
                 self.manual_session_count = 0  # Reset counter
                 
-                rumps.notification(
+                notify(
                     title="🎉 Long Break!",
                     subtitle="15 minutes rest",
                     message="Great job completing 4 sessions!"
@@ -2153,7 +4828,7 @@ class PomodoroMenuBarApp(rumps.App):
                 self.manual_phase = 'short_break'
                 self.manual_time_remaining = 5 * 60  # 5 minutes
                 
-                rumps.notification(
+                notify(
                     title="☕ Short Break!",
                     subtitle="5 minutes rest",
                     message=f"Session {self.manual_session_count}/4 done"
@@ -2170,7 +4845,7 @@ class PomodoroMenuBarApp(rumps.App):
             self.manual_start_time = datetime.now()
             self.session_start_time = datetime.now()
             
-            rumps.notification(
+            notify(
                 title="▶️ Back to Work!",
                 subtitle="25 minutes focus",
                 message=f"Session {self.manual_session_count + 1}/4"
@@ -2205,9 +4880,9 @@ class PomodoroMenuBarApp(rumps.App):
         
         # Update menu bar
         if self.manual_phase == 'work':
-            self.title = f"{mins:02d}:{secs:02d}"
+            self._show_title(self, f"{mins:02d}:{secs:02d}")
         else:
-            self.title = f"{emoji} {mins:02d}:{secs:02d}"
+            self._show_title(self, f"{emoji} {mins:02d}:{secs:02d}")
         # self.session_info.title = f"🍅 Manual: {phase_label} ({mins:02d}:{secs:02d})"
         # self.time_info.title = ... (Merged into session info)
         
@@ -2284,20 +4959,6 @@ class PomodoroMenuBarApp(rumps.App):
             except Exception as e:
                 print(f"Error saving session on exit: {e}")
     
-    def cleanup_temp_files(self):
-        """Clean up any temporary HTML files on exit"""
-        try:
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            temp_files = ["break_temp.html", "go_home_temp.html"]
-            
-            for temp_file in temp_files:
-                temp_path = os.path.join(current_dir, temp_file)
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-                    print(f"Cleaned up temp file on exit: {temp_path}")
-        except Exception as e:
-            print(f"Error cleaning up temp files: {e}")
-
     def reset_app_state(self):
         """Reset all session and task related state variables to initial values"""
         print("🧹 Resetting application state...")
@@ -2316,35 +4977,57 @@ class PomodoroMenuBarApp(rumps.App):
         self.update_task_display()
         self.update_timer(None)
 
-    def _run_server(self):
-        """Run the local HTTP server"""
-        try:
-            server_address = ('localhost', self.server_port)
-            self.httpd = HTTPServer(server_address, TaskServer)
-            print(f"Starting local server on port {self.server_port}...")
-            self.httpd.serve_forever()
-        except Exception as e:
-            print(f"Error starting server: {e}")
-            self.httpd = None
+    def _run_server(self, httpd):
+        """Serve until the server goes idle or is stopped (server thread)"""
+        went_idle = httpd.serve_until_idle()
+        print("Local server stopped after being idle" if went_idle else "Local server stopped")
+        with self._server_lock:
+            if self.httpd is httpd:
+                self.httpd = None
+                self.server_thread = None
 
     def start_server(self):
-        """Start the server if not already running"""
-        if self.server_thread is None or not self.server_thread.is_alive():
-            self.server_thread = threading.Thread(target=self._run_server, daemon=True)
+        """Start the local server if it isn't running.
+        
+        The socket is bound before this returns, so a URL opened right after works
+        immediately. The server then stays up until SERVER_IDLE_TIMEOUT_SECONDS pass
+        without a request.
+        """
+        with self._server_lock:
+            if self.httpd is not None and self.httpd.touch():
+                return
+            try:
+                self.httpd = LocalServer(('localhost', self.server_port), TaskServer,
+                                         idle_timeout=self.SERVER_IDLE_TIMEOUT_SECONDS)
+            except OSError as e:
+                print(f"Error starting server: {e}")
+                self.httpd = None
+                return
+            self.server_thread = threading.Thread(target=self._run_server, args=(self.httpd,), daemon=True)
             self.server_thread.start()
-            # Give server time to start
-            time.sleep(0.5)
-            print("Server started on-demand")
+            print(f"Local server started on port {self.server_port}")
     
     def stop_server(self):
-        """Stop the server gracefully"""
-        if self.httpd:
-            print("Shutting down server...")
-            self.httpd.shutdown()
-            self.httpd = None
-            self.server_thread = None
-            print("Server stopped")
+        """Stop the server (it finishes within a second)"""
+        with self._server_lock:
+            if self.httpd:
+                print("Shutting down server...")
+                self.httpd.close()
+                self.httpd = None
+                self.server_thread = None
 
+    def queue_next_task(self, task):
+        """Queue task to become the current task when the next work session starts"""
+        self.next_task = task
+        priority_badge = f"[{task['priority'][0]}]"
+        self._show_title(self.task_info, f"Next: {task['name']} {priority_badge}")
+        
+        notify(
+            title="Task Queued",
+            subtitle=f"Next: {task['name']}",
+            message="Will start at next work session"
+        )
+    
     def set_current_task(self, task):
         """Set the current task from menu selection"""
         # Check if we're in an active work session (uses get_current_activity which handles both scheduled and dynamic)
@@ -2353,15 +5036,7 @@ class PomodoroMenuBarApp(rumps.App):
         
         # If not in active work session, queue the task for next session
         if not is_active_work_session:
-            self.next_task = task
-            priority_badge = f"[{task['priority'][0]}]"
-            self.task_info.title = f"Next: {task['name']} {priority_badge}"
-            
-            rumps.notification(
-                title="Task Queued",
-                subtitle=f"Next: {task['name']}",
-                message="Will start at next work session"
-            )
+            self.queue_next_task(task)
             return
         
         # If we're switching tasks during an active work session, log the previous task's session first
@@ -2401,12 +5076,12 @@ class PomodoroMenuBarApp(rumps.App):
             self.session_logger.log_session(session_data)
             
             # Refresh tasks menu to update duration stats
-            self.refresh_tasks_submenu()
+            self.request_refresh()
             
             # Reset session start time for the new task
             self.session_start_time = datetime.now()
             
-            rumps.notification(
+            notify(
                 title="Session Logged",
                 subtitle=f"Previous task: {self.current_task['name']}",
                 message=f"Logged {duration_minutes}min. Now tracking: {task['name']}"
@@ -2426,7 +5101,7 @@ class PomodoroMenuBarApp(rumps.App):
              self._task_switched_once = True
              
         self.update_task_display()
-        rumps.notification(
+        notify(
             title="Task Selected",
             subtitle=task['name'],
             message=f"Priority: {task['priority']}"
@@ -2470,97 +5145,67 @@ class PomodoroMenuBarApp(rumps.App):
     #     except Exception as e:
     #         print(f"Error refreshing tasks menu: {e}")
 
+    def _task_callback(self, handler):
+        """Build a per-task callback factory that resolves the task by id at click time"""
+        def make_callback(task_id):
+            def callback(sender):
+                task = self.task_manager.get_task(task_id)
+                if task:
+                    handler(task)
+            return callback
+        return make_callback
+
+    def _format_task_label(self, t, today_seconds):
+        """Format a Select Task label with today's tracked duration"""
+        # Get raw seconds for this task from session logs only
+        total_secs = today_seconds.get(t['name'], 0)
+
+        # Round total seconds to avoid float precision issues in display
+        total_secs = round(total_secs, 0)
+
+        # Format duration string manually to avoid extra calls
+        h = int(total_secs // 3600)
+        m = int((total_secs % 3600) // 60)
+        s = int(total_secs % 60)
+        
+        if h > 0: duration_str = f"{h}h {m}m {s}s"
+        elif m > 0: duration_str = f"{m}m {s}s"
+        else: duration_str = f"{int(s)}s"
+        if total_secs == 0: duration_str = "0m"
+
+        return f"{t['name']} ({duration_str})"
+
     def _build_select_task_menu(self, tasks=None):
-        """Build the Select Task submenu"""
+        """Build the Select Task submenu (tasks: available tasks grouped by priority)"""
         if tasks is None:
-            tasks = self.task_manager.get_available_tasks()
-            
-        select_task_menu = rumps.MenuItem("📝 Select Task")
-        
-        # Populate task items
-        if not tasks:
-            select_task_menu.add(rumps.MenuItem("No active tasks", callback=None))
-        else:
-            # 1. Get raw seconds stats efficiently (Single source of truth)
-            today_seconds = self.analytics.get_today_task_seconds()
-            
-            current_activity = get_current_activity()
-
-            # Helper to create callback
-            def make_callback(t):
-                return lambda sender: self.set_current_task(t)
-            
-            # Group by priority
-            high = [t for t in tasks if t['priority'] == 'High']
-            medium = [t for t in tasks if t['priority'] == 'Medium']
-            low = [t for t in tasks if t['priority'] == 'Low']
+            tasks = self.task_manager.get_available_tasks_by_priority()
             
-            def format_task_label(t):
-                # Get raw seconds for this task from session logs only
-                total_secs = today_seconds.get(t['name'], 0)
+        self.select_task_model = TaskMenuModel("📝 Select Task", self._task_callback(self.set_current_task))
+        self._sync_select_task_menu(tasks)
+        return self.select_task_model.menu_item
 
-                # Round total seconds to avoid float precision issues in display
-                total_secs = round(total_secs, 0)
-
-                # Format duration string manually to avoid extra calls
-                h = int(total_secs // 3600)
-                m = int((total_secs % 3600) // 60)
-                s = int(total_secs % 60)
-                
-                if h > 0: duration_str = f"{h}h {m}m {s}s"
-                elif m > 0: duration_str = f"{m}m {s}s"
-                else: duration_str = f"{int(s)}s"
-                if total_secs == 0: duration_str = "0m"
+    def _sync_select_task_menu(self, tasks):
+        """Diff the Select Task submenu against the available tasks (grouped by priority,
+        regrouped by project if that is switched on)"""
+        # Get raw seconds stats efficiently (Single source of truth)
+        today_seconds = self.analytics.get_today_task_seconds()
+        groups = TaskMenuModel.PRIORITY_GROUPS
+        if self.settings_manager.settings.get("menu", {}).get("group_tasks_by") == "project":
+            groups, tasks = self._group_by_project(tasks)
+        self.select_task_model.set_groups(groups)
+        self.select_task_model.sync(tasks, lambda t: self._format_task_label(t, today_seconds))
 
-                
-                # Add repeat info if available
-                repeat_num = t.get('repeat_number')
-                repeat_unit = t.get('repeat_unit')
-                
-                if repeat_num and repeat_unit:
-                    repeat_str = f" [↻{repeat_num}{repeat_unit[0]}]"  # e.g., [↻1w] for "every 1 week"
-                else:
-                    repeat_str = " [Once]"  # One-time task
-                
-                # Add day info if restricted
-                allowed_days = t.get('allowed_days')
-                if allowed_days:
-                    day_names = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-                    # Check for common patterns
-                    if set(allowed_days) == {0, 1, 2, 3, 4}:
-                        day_str = " [Weekdays]"
-                    elif set(allowed_days) == {5, 6}:
-                        day_str = " [Weekend]"
-                    else:
-                        days = [day_names[d] for d in sorted(allowed_days) if 0 <= d <= 6]
-                        day_str = f" [{','.join(days)}]"
-                else:
-                    day_str = ""
-                
-                # return f"[{t['priority'][0]}] {t['name']} ({duration_str}){repeat_str}{day_str}"
-                return f"{t['name']} ({duration_str})"
-
-            # High
-            if high:
-                select_task_menu.add(rumps.MenuItem("=== HIGH PRIORITY ===", callback=None))
-                for task in high:
-                    select_task_menu.add(rumps.MenuItem(format_task_label(task), callback=make_callback(task)))
-            
-            # Medium
-            if medium:
-                if select_task_menu.items: select_task_menu.add(rumps.separator)
-                select_task_menu.add(rumps.MenuItem("=== MEDIUM PRIORITY ===", callback=None))
-                for task in medium:
-                    select_task_menu.add(rumps.MenuItem(format_task_label(task), callback=make_callback(task)))
-            
-            # Low
-            if low:
-                if select_task_menu.items: select_task_menu.add(rumps.separator)
-                select_task_menu.add(rumps.MenuItem("=== LOW PRIORITY ===", callback=None))
-                for task in low:
-                    select_task_menu.add(rumps.MenuItem(format_task_label(task), callback=make_callback(task)))
-                    
-        return select_task_menu
+    def _group_by_project(self, tasks):
+        """Regroup {priority: [tasks]} by project: (menu groups, {project id or None: [tasks]}).
+        Every project gets a group, empty or not, so the menu skeleton only changes with the projects."""
+        grouped = {}
+        for priority in TaskManager.PRIORITIES:
+            for task in tasks.get(priority, ()):
+                project = self.task_manager.get_project(task)
+                grouped.setdefault(project['id'] if project else None, []).append(task)
+        groups = [(p['id'], f"=== 📁 {p['name'].upper()} ===") for p in self.task_manager.get_projects()]
+        groups.append((None, "=== NO PROJECT ==="))
+        return groups, grouped
 
     def _build_manage_tasks_menu(self):
         """Build the Manage Tasks submenu"""
@@ -2570,136 +5215,53 @@ class PomodoroMenuBarApp(rumps.App):
         manage_menu.add(rumps.MenuItem("Quick Add (Paste)", callback=self.paste_task))
         manage_menu.add(rumps.separator)
         
-        # Get ALL active tasks for Edit/Delete menus
-        all_active_tasks = self.task_manager.get_all_active_tasks()
-        
-        # Build Edit Task submenu
-        edit_task_menu = rumps.MenuItem("Edit Task")
-        if not all_active_tasks:
-            edit_task_menu.add(rumps.MenuItem("No active tasks", callback=None))
-        else:
-            def make_edit_callback(t):
-                return lambda sender: self.edit_task_callback(t)
-            # Group by priority for edit
-            high = [t for t in all_active_tasks if t['priority'] == 'High']
-            medium = [t for t in all_active_tasks if t['priority'] == 'Medium']
-            low = [t for t in all_active_tasks if t['priority'] == 'Low']
-            if high:
-                edit_task_menu.add(rumps.MenuItem("=== HIGH PRIORITY ===", callback=None))
-                for task in high:
-                    edit_task_menu.add(rumps.MenuItem(task['name'], callback=make_edit_callback(task)))
-            if medium:
-                if edit_task_menu.items: edit_task_menu.add(rumps.separator)
-                edit_task_menu.add(rumps.MenuItem("=== MEDIUM PRIORITY ===", callback=None))
-                for task in medium:
-                    edit_task_menu.add(rumps.MenuItem(task['name'], callback=make_edit_callback(task)))
-            if low:
-                if edit_task_menu.items: edit_task_menu.add(rumps.separator)
-                edit_task_menu.add(rumps.MenuItem("=== LOW PRIORITY ===", callback=None))
-                for task in low:
-                    edit_task_menu.add(rumps.MenuItem(task['name'], callback=make_edit_callback(task)))
-        manage_menu.add(edit_task_menu)
-        
-        # Build Delete Task submenu
-        delete_task_menu = rumps.MenuItem("Delete Task")
-        if not all_active_tasks:
-            delete_task_menu.add(rumps.MenuItem("No active tasks", callback=None))
-        else:
-            def make_delete_callback(t):
-                return lambda sender: self.delete_task_callback(t)
-            # Group by priority for delete (reuse same grouping)
-            high = [t for t in all_active_tasks if t['priority'] == 'High']
-            medium = [t for t in all_active_tasks if t['priority'] == 'Medium']
-            low = [t for t in all_active_tasks if t['priority'] == 'Low']
-            if high:
-                delete_task_menu.add(rumps.MenuItem("=== HIGH PRIORITY ===", callback=None))
-                for task in high:
-                    delete_task_menu.add(rumps.MenuItem(task['name'], callback=make_delete_callback(task)))
-            if medium:
-                if delete_task_menu.items: delete_task_menu.add(rumps.separator)
-                delete_task_menu.add(rumps.MenuItem("=== MEDIUM PRIORITY ===", callback=None))
-                for task in medium:
-                    delete_task_menu.add(rumps.MenuItem(task['name'], callback=make_delete_callback(task)))
-            if low:
-                if delete_task_menu.items: delete_task_menu.add(rumps.separator)
-                delete_task_menu.add(rumps.MenuItem("=== LOW PRIORITY ===", callback=None))
-                for task in low:
-                    delete_task_menu.add(rumps.MenuItem(task['name'], callback=make_delete_callback(task)))
-        manage_menu.add(delete_task_menu)
-        
-        # Build Mark Complete submenu (Keep using 'tasks' i.e. available tasks only, or all?)
-        # Usually you only mark complete tasks you can do today. So keeping 'tasks' (available) makes sense.
-        tasks = self.task_manager.get_available_tasks()
-        mark_complete_menu = rumps.MenuItem("Mark Complete for Today")
-        if not tasks:
-            mark_complete_menu.add(rumps.MenuItem("No active tasks", callback=None))
-        else:
-            def make_complete_callback(t):
-                return lambda sender: self.mark_complete_callback(t)
-            # Group by priority
-            high = [t for t in tasks if t['priority'] == 'High']
-            medium = [t for t in tasks if t['priority'] == 'Medium']
-            low = [t for t in tasks if t['priority'] == 'Low']
-            if high:
-                mark_complete_menu.add(rumps.MenuItem("=== HIGH PRIORITY ===", callback=None))
-                for task in high:
-                    mark_complete_menu.add(rumps.MenuItem(task['name'], callback=make_complete_callback(task)))
-            if medium:
-                if mark_complete_menu.items: mark_complete_menu.add(rumps.separator)
-                mark_complete_menu.add(rumps.MenuItem("=== MEDIUM PRIORITY ===", callback=None))
-                for task in medium:
-                    mark_complete_menu.add(rumps.MenuItem(task['name'], callback=make_complete_callback(task)))
-            if low:
-                if mark_complete_menu.items: mark_complete_menu.add(rumps.separator)
-                mark_complete_menu.add(rumps.MenuItem("=== LOW PRIORITY ===", callback=None))
-                for task in low:
-                    mark_complete_menu.add(rumps.MenuItem(task['name'], callback=make_complete_callback(task)))
-        manage_menu.add(mark_complete_menu)
+        # Edit/Delete list ALL active tasks, Mark Complete only tasks available today.
+        # They are rarely opened, so items are only built when a submenu is opened
+        # after the task list changed.
+        task_name = lambda t: t['name']
+        self.edit_task_model = TaskMenuModel("Edit Task", self._task_callback(self.edit_task_callback))
+        self.edit_task_model.make_lazy(self.task_manager.get_tasks_by_priority, task_name,
+                                       lambda: self.task_manager.version)
+        self.delete_task_model = TaskMenuModel("Delete Task", self._task_callback(self.delete_task_callback))
+        self.delete_task_model.make_lazy(self.task_manager.get_tasks_by_priority, task_name,
+                                         lambda: self.task_manager.version)
+        # Availability also changes with time (tasks coming due, a new day)
+        self.mark_complete_model = TaskMenuModel("Mark Complete for Today", self._task_callback(self.mark_complete_callback))
+        self.mark_complete_model.make_lazy(self.task_manager.get_available_tasks_by_priority, task_name,
+                                           lambda: (self.task_manager.version, self.task_manager.availability_version))
+        manage_menu.add(self.edit_task_model.menu_item)
+        manage_menu.add(self.delete_task_model.menu_item)
+        manage_menu.add(self.mark_complete_model.menu_item)
+        self._sync_manage_tasks_menu()
         
         manage_menu.add(rumps.separator)
+        manage_menu.add(rumps.MenuItem("Due This Week", callback=self.view_week_plan))
         manage_menu.add(rumps.MenuItem("View Deleted Tasks", callback=self.view_deleted_tasks))
         
         return manage_menu
 
+    def _sync_manage_tasks_menu(self):
+        """Bring the Edit/Delete/Mark Complete submenus up to date when they can't be lazy
+        (lazy ones notice the task and availability versions when opened)"""
+        for model in (self.edit_task_model, self.delete_task_model, self.mark_complete_model):
+            if not model.lazy:
+                model.ensure_current()
+
+    def request_refresh(self):
+        """Ask for a menu refresh; bursts are coalesced into one refresh on the next tick"""
+        self.refresh_scheduler.request()
+        self.wake_from_idle()
+
     def refresh_tasks_submenu(self):
-        """Refresh the tasks submenu by rebuilding it and replacing in the main menu"""
+        """Refresh the task submenus in place, only touching items that changed"""
         try:
             # Force reload sessions to ensure latest data
             self.session_logger.sessions = self.session_logger.load_sessions()
             
-            tasks = self.task_manager.get_available_tasks()
-            
-            # Build new menus
-            select_task_menu = self._build_select_task_menu(tasks)
-            manage_tasks_menu = self._build_manage_tasks_menu()
-            
-            # Construct the full menu list
-            # Construct the full menu list
-            new_menu = [
-                select_task_menu,    # Root level Select Task
-                None,  # Separator
-                # self.session_info,
-                self.task_info,
-                # self.progress_info,  # Temporarily hidden (time_info merged into session_info)
-                None,  # Separator
-                self.next_info,
-                None,  # Separator
-                self.start_stop_item,  # Manual start/stop
-                None,  # Separator
-                manage_tasks_menu,   # Root level Manage Tasks
-                None,  # Separator
-                self._build_statistics_menu(),
-                self._build_settings_menu(),
-                # None,  # Separator
-                # rumps.MenuItem("🧘 Open Zen Mode", callback=self.open_zen),
-                None,  # Separator
-                rumps.MenuItem("👋 Quit", callback=self.quit_app)
-            ]
-            
-            # Clear existing menu to detach items
-            self.menu.clear()
-            # Assign new menu
-            self.menu = new_menu
+            tasks = self.task_manager.get_available_tasks_by_priority()
+            
+            self._sync_select_task_menu(tasks)
+            self._sync_manage_tasks_menu()
             
         except Exception as e:
             print(f"Error refreshing tasks menu: {e}")
@@ -2730,6 +5292,8 @@ class PomodoroMenuBarApp(rumps.App):
         mood_menu.add(rumps.MenuItem("📊 All Time", callback=self.show_mood_analysis))
         stats_menu.add(mood_menu)
         
+        stats_menu.add(rumps.MenuItem("📁 Project Time", callback=self.show_project_time))
+        
         # Add separator and history link
         stats_menu.add(rumps.separator)
         stats_menu.add(rumps.MenuItem("🌐 View Today's History", callback=self.open_history_page))
@@ -2743,8 +5307,19 @@ class PomodoroMenuBarApp(rumps.App):
         
         settings_menu.add(rumps.MenuItem("🌐 Open Settings Page", callback=self.open_settings_page))
         
+        self.group_by_project_item = rumps.MenuItem("📁 Group Tasks by Project", callback=self.toggle_group_by_project)
+        self.group_by_project_item.state = self.settings_manager.settings.get("menu", {}).get("group_tasks_by") == "project"
+        settings_menu.add(self.group_by_project_item)
+        
         return settings_menu
     
+    def toggle_group_by_project(self, sender):
+        """Group the Select Task menu by project instead of priority (or back)"""
+        sender.state = not sender.state
+        self.settings_manager.settings.setdefault("menu", {})["group_tasks_by"] = "project" if sender.state else "priority"
+        self.settings_manager.save_settings()
+        self.request_refresh()
+    
     def open_settings_page(self, _):
         """Open settings HTML page in browser"""
         self.start_server()
@@ -2755,6 +5330,11 @@ class PomodoroMenuBarApp(rumps.App):
         self.start_server()
         webbrowser.open(f"http://localhost:{self.server_port}/history")
 
+    def open_switch_page(self, _):
+        """Open the quick switcher (search tasks by name) in browser"""
+        self.start_server()
+        webbrowser.open(f"http://localhost:{self.server_port}/switch")
+
     # def open_zen(self, _):
     #     """Callback to open Zen Mode with correct duration based on current activity"""
     #     # Force update current activity to be sure
@@ -2774,84 +5354,51 @@ class PomodoroMenuBarApp(rumps.App):
     #     print(f"DEBUG: Opening Zen Mode with duration: {duration}")
     #     open_zen_mode(duration)
     
-    def open_go_home_page(self):
-        """Open GO HOME NOW page at 18:00 with dynamic stats"""
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        go_home_path = os.path.join(current_dir, "go_home.html")
+    def today_work_stats(self):
+        """(sessions, focus minutes) for today's WORK logs; split or resumed logs of one session count once"""
+        today = datetime.now().date()
         
-        if os.path.exists(go_home_path):
+        today_sessions = []
+        for s in self.session_logger.sessions:
             try:
-                # Calculate today's stats
-                sessions = self.session_logger.sessions
-                today = datetime.now().date()
-                
-                today_sessions = []
-                for s in sessions:
-                    try:
-                        if datetime.fromisoformat(s['start_time']).date() == today:
-                            # Only count WORK sessions
-                            if s.get('session_type') == 'WORK':
-                                today_sessions.append(s)
-                    except: pass
-                    
-                # Sort by start time (handling potential missing start_time gracefully)
-                today_sessions.sort(key=lambda x: x.get('start_time', ''))
+                if datetime.fromisoformat(s['start_time']).date() == today:
+                    # Only count WORK sessions
+                    if s.get('session_type') == 'WORK':
+                        today_sessions.append(s)
+            except: pass
+            
+        # Sort by start time (handling potential missing start_time gracefully)
+        today_sessions.sort(key=lambda x: x.get('start_time', ''))
 
-                # Count sessions based on number transitions to handle resets and splits
-                session_count = 0
-                last_session_num = None
-                
-                for s in today_sessions:
-                    s_num = s.get('session_number')
-                    if s_num != last_session_num:
-                        session_count += 1
-                        last_session_num = s_num
-                     
-                total_seconds = sum(s.get('duration_seconds', s.get('duration_minutes', 0) * 60) for s in today_sessions)
-                total_minutes = total_seconds // 60
-                
-                # Read template
-                with open(go_home_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Replace placeholders
-                content = content.replace('id="sessions-count">-<', f'id="sessions-count">{session_count}<')
-                content = content.replace('id="total-minutes">-<', f'id="total-minutes">{total_minutes}<')
-                
-                # Also disable the fetch logic in the HTML since we are injecting data
-                content = content.replace('loadStats();', '// loadStats(); // Disabled by Python injection')
-                
-                # Write to temp file
-                temp_path = os.path.join(current_dir, "go_home_temp.html")
-                with open(temp_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                
-                webbrowser.open(f"file://{temp_path}")
-                
-                send_notification(
-                    "GO HOME NOW! 🎉",
-                    "Time to rest, today's work is finished!",
-                    "Glass"
-                )
-                
-                # Schedule cleanup of temp file after 10 minutes
-                def cleanup_temp_file():
-                    time.sleep(600)  # 10 minutes
-                    try:
-                        if os.path.exists(temp_path):
-                            os.remove(temp_path)
-                            print(f"Cleaned up temp file: {temp_path}")
-                    except:
-                        pass
-                
-                threading.Thread(target=cleanup_temp_file, daemon=True).start()
-                
-            except Exception as e:
-                print(f"Error opening/generating go home page: {e}")
-                # Fallback to original
-                webbrowser.open(f"file://{go_home_path}")
-        else:
-            print(f"Warning: go_home.html not found at {go_home_path}")
+        # Count sessions based on number transitions to handle resets and splits
+        session_count = 0
+        last_session_num = None
+        
+        for s in today_sessions:
+            s_num = s.get('session_number')
+            if s_num != last_session_num:
+                session_count += 1
+                last_session_num = s_num
+             
+        total_seconds = sum(s.get('duration_seconds', s.get('duration_minutes', 0) * 60) for s in today_sessions)
+        return session_count, total_seconds // 60
+    
+    def open_break_mode(self, duration_minutes=5):
+        """Open the Zen Mode animation (served /break page) with specific duration"""
+        self.start_server()
+        webbrowser.open(f"http://localhost:{self.server_port}/break?duration={duration_minutes}")
+        print(f"Opened Zen Mode with duration: {duration_minutes} minutes")
+    
+    def open_go_home_page(self):
+        """Open GO HOME NOW page at 18:00 with dynamic stats (rendered by the /go_home route)"""
+        self.start_server()
+        webbrowser.open(f"http://localhost:{self.server_port}/go_home")
+        
+        send_notification(
+            "GO HOME NOW! 🎉",
+            "Time to rest, today's work is finished!",
+            "Glass"
+        )
     
     def no_op(self, _):
         """Empty callback for info-only menu items"""
@@ -2861,19 +5408,23 @@ class PomodoroMenuBarApp(rumps.App):
         """Quit the application"""
         # Save current session using shared method
         self.save_current_session_on_exit()
-        self.cleanup_temp_files()
         rumps.quit_application()
 
-    def get_emoji_and_label(self, type_str):
-        """Get emoji and label based on activity type (uses custom icons from settings)"""
+    def get_emoji_and_label(self, type_str, icons=None):
+        """Get emoji and label based on activity type (uses custom icons from settings, or `icons` if given)"""
+        if icons is None:
+            get_icon = self.settings_manager.get_icon
+        else:
+            get_icon = lambda session_type: icons.get(session_type, "⏸️")
+        
         if type_str == "WORK":
-            return self.settings_manager.get_icon("work"), "WORK"
+            return get_icon("work"), "WORK"
         elif "LONG" in type_str:
-            return self.settings_manager.get_icon("long_break"), "LONG BREAK"
+            return get_icon("long_break"), "LONG BREAK"
         elif "SHORT" in type_str:
-            return self.settings_manager.get_icon("short_break"), "SHORT BREAK"
+            return get_icon("short_break"), "SHORT BREAK"
         elif type_str == "LUNCH":
-            return self.settings_manager.get_icon("lunch"), "LUNCH"
+            return get_icon("lunch"), "LUNCH"
         else:
             return "⏸️", "IDLE"
 
@@ -2885,16 +5436,17 @@ class PomodoroMenuBarApp(rumps.App):
         # 🟦 = filled (blue), ⬜ = empty (light gray)
         return "🟦" * filled + "⬜" * empty
 
-    def find_next_activity(self):
-        """Find the next scheduled activity"""
-        now = datetime.now()
+    def find_next_activity(self, now=None, icons=None):
+        """Find the next scheduled activity (relative to `now`, using `icons` if given)"""
+        if now is None:
+            now = datetime.now()
         current_time = now.strftime("%H:%M")
         
         # Check dynamic schedule first if active
         if DYNAMIC_SCHEDULE_ACTIVE and DYNAMIC_SCHEDULE:
             for item in DYNAMIC_SCHEDULE:
                 if item["start"] > current_time:
-                    emoji, label = self.get_emoji_and_label(item["type"])
+                    emoji, label = self.get_emoji_and_label(item["type"], icons)
                     return f"{emoji} {label} at {item['start']}"
             # If we're at the end of dynamic schedule
             return "Dynamic session ending..."
@@ -2903,7 +5455,7 @@ class PomodoroMenuBarApp(rumps.App):
         for item in SCHEDULE:
             if item["start"] > current_time:
                 # period = "Morning" if item["start"] < "12:00" else ("Lunch" if item["type"] == "LUNCH" else "Afternoon")
-                emoji, label = self.get_emoji_and_label(item["type"])
+                emoji, label = self.get_emoji_and_label(item["type"], icons)
                 return f"{emoji} {label} at {item['start']}"
         
         return "No more sessions today"
@@ -2921,7 +5473,7 @@ class PomodoroMenuBarApp(rumps.App):
         webbrowser.open(url)
         
         # Show notification
-        rumps.notification(
+        notify(
             title="Opening Task Creator",
             subtitle="New Task",
             message="Please create the task in the browser window that just opened."
@@ -2937,7 +5489,7 @@ class PomodoroMenuBarApp(rumps.App):
         webbrowser.open(url)
         
         # Show notification
-        rumps.notification(
+        notify(
             title="Quick Add Tasks",
             subtitle="Paste to Create",
             message="Paste your tasks (one per line) in the browser window that just opened."
@@ -2962,7 +5514,7 @@ class PomodoroMenuBarApp(rumps.App):
         webbrowser.open(url)
         
         # Show notification
-        rumps.notification(
+        notify(
             title="Opening Editor",
             subtitle=task['name'],
             message="Please edit the task in the browser window that just opened."
@@ -3034,31 +5586,32 @@ class PomodoroMenuBarApp(rumps.App):
                 # Update task display immediately
                 self.update_task_display()
                 
-                rumps.notification(
+                notify(
                     title="Session Logged",
                     subtitle=f"Task completed: {task['name']}",
                     message=f"Logged {duration_minutes}min. Task cleared from current session."
                 )
             
-            # Mark task as completed
-            self.task_manager.mark_task_completed(task['id'])
+            # Mark task as completed, and auto-delete one-time tasks, in a single write
+            with self.task_manager.transaction():
+                self.task_manager.mark_task_completed(task['id'])
+                if is_one_time:
+                    self.task_manager.delete_task(task['id'])
             
-            # Auto-delete one-time tasks
             if is_one_time:
-                self.task_manager.delete_task(task['id'])
-                rumps.notification(
+                notify(
                     title="Task Completed & Deleted",
                     subtitle=task['name'],
                     message="One-time task has been removed."
                 )
             else:
-                rumps.notification(
+                notify(
                     title="Task Marked Complete",
                     subtitle=task['name'],
                     message="This task will reappear based on its repeat schedule."
                 )
             
-            self.refresh_tasks_submenu()
+            self.request_refresh()
 
     def delete_task_callback(self, task):
         """Delete task callback from dropdown menu (soft delete)"""
@@ -3083,28 +5636,25 @@ class PomodoroMenuBarApp(rumps.App):
             self.task_manager.delete_task(task['id'])
             
             # Show notification
-            rumps.notification(
+            notify(
                 title="Task Deleted",
                 subtitle=task['name'],
                 message="Task has been marked as deleted"
             )
             
             # Refresh menu
-            self.refresh_tasks_submenu()
+            self.request_refresh()
 
     def view_deleted_tasks(self, _):
-        """View all deleted tasks with option to hard delete"""
-        deleted_tasks = self.task_manager.get_deleted_tasks()
+        """View all deleted tasks with options to restore or hard delete"""
+        # Deleted tasks grouped by priority
+        grouped = self.task_manager.get_tasks_by_priority('deleted')
+        high_priority, medium_priority, low_priority = grouped['High'], grouped['Medium'], grouped['Low']
         
-        if not deleted_tasks:
+        if not any(grouped.values()):
             rumps.alert("No Deleted Tasks", "No tasks have been deleted yet.")
             return
         
-        # Group deleted tasks by priority
-        high_priority = [t for t in deleted_tasks if t['priority'] == 'High']
-        medium_priority = [t for t in deleted_tasks if t['priority'] == 'Medium']
-        low_priority = [t for t in deleted_tasks if t['priority'] == 'Low']
-        
         # Build display list
         task_displays = []
         all_tasks_sorted = []  # To match numbering
@@ -3137,9 +5687,9 @@ class PomodoroMenuBarApp(rumps.App):
         
         message = "\n".join(task_displays)
         
-        # Ask user to select task to hard delete
+        # Ask user to select task to restore or hard delete
         window = rumps.Window(
-            message=f"Deleted Tasks\n\nEnter task number to PERMANENTLY delete (1-{len(all_tasks_sorted)}), or cancel to close:\n\n{message}\u200E",
+            message=f"Deleted Tasks\n\nEnter task number to restore or PERMANENTLY delete (1-{len(all_tasks_sorted)}), or cancel to close:\n\n{message}\u200E",
             title="Deleted Tasks",
             dimensions=(400, 24)
         )
@@ -3151,6 +5701,24 @@ class PomodoroMenuBarApp(rumps.App):
                 if 1 <= task_num <= len(all_tasks_sorted):
                     task_to_delete = all_tasks_sorted[task_num - 1]
                     
+                    action = rumps.alert(
+                        title=task_to_delete['name'],
+                        message="Restore this task to your task list, or delete it permanently?",
+                        ok="Restore",
+                        cancel="Cancel",
+                        other="Permanently Delete"
+                    )
+                    if action == 1:  # Restore
+                        self.task_manager.restore_task(task_to_delete['id'])
+                        notify(
+                            title="Task Restored",
+                            subtitle=task_to_delete['name'],
+                            message="Task is back in your task list"
+                        )
+                        return
+                    if action != -1:  # Cancel
+                        return
+                    
                     # Final confirmation for hard delete
                     confirm = rumps.alert(
                         title=f"Permanently Delete: {task_to_delete['name']}?",
@@ -3161,7 +5729,7 @@ class PomodoroMenuBarApp(rumps.App):
                     
                     if confirm == 1:  # User confirmed hard delete
                         self.task_manager.hard_delete_task(task_to_delete['id'])
-                        rumps.notification(
+                        notify(
                             title="Task Permanently Deleted",
                             subtitle=task_to_delete['name'],
                             message="Task has been removed from the system"
@@ -3173,17 +5741,14 @@ class PomodoroMenuBarApp(rumps.App):
 
     def view_all_tasks(self, _):
         """View all tasks grouped by priority"""
-        tasks = self.task_manager.get_all_active_tasks()
+        # Active tasks grouped by priority
+        grouped = self.task_manager.get_tasks_by_priority()
+        high_priority, medium_priority, low_priority = grouped['High'], grouped['Medium'], grouped['Low']
         
-        if not tasks:
+        if not any(grouped.values()):
             rumps.alert("No Tasks", "You don't have any tasks yet!\n\nCreate one using 'Add New Task'.")
             return
         
-        # Group tasks by priority
-        high_priority = [t for t in tasks if t['priority'] == 'High']
-        medium_priority = [t for t in tasks if t['priority'] == 'Medium']
-        low_priority = [t for t in tasks if t['priority'] == 'Low']
-        
         # Build task list display grouped by priority with left padding
         task_list = []
         numbered_index = 1
@@ -3215,6 +5780,25 @@ class PomodoroMenuBarApp(rumps.App):
         # Add LTR mark for left alignment
         rumps.alert(title="All Tasks", message=message + "\u200E")
 
+    def view_week_plan(self, _):
+        """Show the repeating tasks due each day this week"""
+        today = datetime.now().date()
+        task_list = []
+        for day, tasks in self.task_manager.get_week_plan(today):
+            if not tasks:
+                continue
+            if task_list:  # Add blank line between days
+                task_list.append("")
+            marker = " (TODAY)" if day == today else ""
+            task_list.append(f"  === {day.strftime('%A %d %b').upper()}{marker} ===")
+            for task in tasks:
+                task_list.append(f"  [{task['priority'][0]}] {task['name']}")
+        
+        if not task_list:
+            rumps.alert("Nothing Due This Week", "No repeating tasks come due this week.")
+            return
+        rumps.alert(title="Due This Week", message="\n".join(task_list) + "\u200E")
+
     # Statistics Callbacks
     def show_daily_summary(self, _):
         """Show today's summary"""
@@ -3249,6 +5833,10 @@ class PomodoroMenuBarApp(rumps.App):
         analysis = self.analytics.get_mood_analysis()
         rumps.alert(title="Mood Analysis - All Time", message=analysis)
 
+    def show_project_time(self, _):
+        """Show focus time rolled up per project"""
+        rumps.alert(title="Project Time", message=self.analytics.get_project_breakdown())
+
     def show_duration_daily(self, _):
         """Show daily task duration"""
         # Daily usually only needs today, but if "Last 7 days" it needs history
@@ -3269,12 +5857,21 @@ class PomodoroMenuBarApp(rumps.App):
         stats = self.analytics.get_task_duration_monthly()
         rumps.alert(title="Monthly Task Duration", message=stats)
 
-    def update_task_display(self, time_str=None):
+    def update_task_display(self, time_str=None, snapshot=None):
         """Update task info in menu: Show current task during Work, queued task during Break/Idle"""
         
         # Get current activity to determine if we are in WORK or BREAK
-        activity = get_current_activity()
-        is_work_session = activity and activity.get('type') == 'WORK'
+        # (reuse the tick's snapshot when called from update_timer)
+        activity = snapshot.activity if snapshot else get_current_activity()
+        is_work_session = bool(activity and activity.get('type') == 'WORK')
+        
+        # This runs every tick: skip rebuilding the title when none of its inputs changed
+        task = self.current_task if is_work_session else self.next_task
+        inputs = (is_work_session, task, task and task['name'], task and task['priority'],
+                  self.task_selection_time, time_str)
+        if inputs == self._task_display_inputs:
+            return
+        self._task_display_inputs = inputs
         
         should_show = False
         
@@ -3290,25 +5887,24 @@ class PomodoroMenuBarApp(rumps.App):
                     
                 if time_str:
                     title += f" from {time_str}"
-                self.task_info.title = title
+                self._show_title(self.task_info, title)
                 should_show = True
             else:
-                self.task_info.title = "No task selected"
+                self._show_title(self.task_info, "No task selected")
                 should_show = True # Or False if we want to hide it when no task selected in WORK? Prefer showing "No Task" warning.
 
         # 2. During BREAK/IDLE: Show ONLY if there is a queued 'next_task'
         else:
             if self.next_task:
                 priority_badge = f"[{self.next_task['priority'][0]}]"
-                self.task_info.title = f"Next: {self.next_task['name']} {priority_badge}"
+                self._show_title(self.task_info, f"Next: {self.next_task['name']} {priority_badge}")
                 should_show = True
             else:
                 # Hide to clean up interface during break
                 should_show = False
         
         # Apply visibility
-        if hasattr(self.task_info, '_menuitem'):
-            self.task_info._menuitem.setHidden_(not should_show)
+        self._show_hidden(self.task_info, not should_show)
 
     def prompt_task_selection(self):
         """Prompt user to select a task at start of work session"""
@@ -3320,7 +5916,7 @@ class PomodoroMenuBarApp(rumps.App):
         
         if not tasks:
             # Use notification instead of blocking alert
-            rumps.notification(
+            notify(
                 title="No Tasks Available",
                 subtitle="Work session started",
                 message="Please add a task using 'Manage Tasks > Add New Task'"
@@ -3329,7 +5925,7 @@ class PomodoroMenuBarApp(rumps.App):
         else:
             # If still no task after dialog, show reminder
             if not self.current_task:
-                rumps.notification(
+                notify(
                     title="No Task Selected",
                     subtitle="Work session started",
                     message="⚠️ Please select a task from '📝 Select Task' menu"
@@ -3394,8 +5990,7 @@ class PomodoroMenuBarApp(rumps.App):
         logged_session = self.session_logger.log_session(session_data)
         
         # Refresh tasks menu to update duration stats
-        self.refresh_tasks_submenu()
-        self.refresh_tasks_submenu()
+        self.request_refresh()
         
         # Store for potential feedback update later
         task_name = self.current_task['name'] if self.current_task else "(No Task)"
@@ -3406,95 +6001,88 @@ class PomodoroMenuBarApp(rumps.App):
         }
         
         # Show simple notification - break can start immediately!
-        rumps.notification(
+        notify(
             title="Session Complete!",
             subtitle=f"{duration_minutes}min on {task_name}",
             message="Enjoy your break! ☕"
         )
     
     def prompt_feedback_during_break(self):
-        """Show feedback dialogs during break time (optional, non-blocking)"""
+        """Open the feedback page for the last work session in the browser.
+        
+        Returns immediately so the timer keeps ticking; the page posts mood,
+        reflection and blockers to /feedback whenever the user gets to it.
+        """
         if not self.pending_feedback_session:
             return
         
-        task_name = self.pending_feedback_session['task_name']
-        
-        # Mood tracker
-        # Mood tracker using AppleScript for list selection
-        try:
-            # Updated list with labels
-            cmd = """osascript -e 'choose from list {"😊 Happy", "😣 Difficult", "😢 Sad", "😎 Cool", "😁 Joyful", "💪 Productive", "😓 Struggling", "🔥 Amazing"} with title "How was your session?" with prompt "Select your mood:" default items {"😊 Happy"} OK button name "Select" cancel button name "Skip"'"""
-            result = subprocess.check_output(cmd, shell=True).decode('utf-8').strip()
-            if not result or result == "false":
-                # User cancelled or skipped mood selection
-                # We don't set pending_feedback_session to None here, as they might still provide reflection/blockers
-                pass
-            else:
-                # Extract just the emoji (first character) for logging
-                mood_emoji = result[0]
-                
-                self.session_logger.update_session_feedback(
-                    self.pending_feedback_session['session_id'],
-                    mood=mood_emoji
-                )
-                
-                rumps.notification("Feedback Saved", "Thanks for tracking your mood!", f"You felt: {result}")
-                # Don't set pending_feedback_session to None yet, as reflection/blockers are still to come
-            
-        except Exception as e:
-            print(f"Error in mood tracker: {e}")
-            # If mood dialog failed, we can still proceed with reflection/blockers
-        
-        # Reflection (optional)
-        reflection_window = rumps.Window(
-            message="What did you accomplish? (optional)",
-            title="Quick Reflection",
-            dimensions=(320, 60)
-        )
-        reflection_response = reflection_window.run()
-        reflection = reflection_response.text if reflection_response.clicked else ""
-        
-        # Blockers (optional)
-        blocker_window = rumps.Window(
-            message="Any blockers or issues? (optional)",
-            title="Blocker Tracking",
-            dimensions=(320, 60)
-        )
-        blocker_response = blocker_window.run()
-        blockers = blocker_response.text if blocker_response.clicked else ""
-        
-        # Update the logged session with reflection and blockers
-        # Note: Mood is already updated above if selected
-        self.session_logger.update_session_feedback(
-            self.pending_feedback_session['session_id'],
-            reflection=reflection,
-            blockers=blockers
+        self.start_server()
+        url = f"http://localhost:{self.server_port}/feedback?session={self.pending_feedback_session['session_id']}"
+        webbrowser.open(url)
+
+    def live_state(self):
+        """Activity, tasks and "Next: ..." text as sent in /api/events 'state' events"""
+        activity = self.current_activity
+        task_fields = lambda task: {'id': task['id'], 'name': task['name'], 'priority': task.get('priority')} if task else None
+        return {
+            'activity': {
+                'type': activity['type'],
+                'session': activity.get('session'),
+                'start': activity['start'],
+                'end': activity['end'],
+            } if activity else None,
+            'current_task': task_fields(self.current_task),
+            'next_task': task_fields(self.next_task),
+            'next': self.next_info.title,
+        }
+
+    def publish_tick_events(self, snapshot):
+        """Send a 'state' event when the activity, tasks or next-up text changed, and a 'tick' during an activity"""
+        activity = snapshot.activity
+        state_key = (
+            activity,
+            self.current_task and self.current_task['id'],
+            self.next_task and self.next_task['id'],
+            snapshot.next_activity,
         )
-        
-        self.pending_feedback_session = None
-        
-        # Show confirmation if reflection/blockers provided
-        if reflection or blockers:
-            rumps.notification(
-                title="Feedback Saved",
-                subtitle="Session details updated",
-                message="Thanks for the feedback!"
-            )
+        if state_key != self._published_state_key:
+            self._published_state_key = state_key
+            EVENTS.publish('state', self.live_state())
+        
+        if activity is not None:
+            cache = self.tick_cache
+            total = int(cache.total_seconds)
+            elapsed = max(0, min(int((snapshot.now - cache.start_dt).total_seconds()), total))
+            EVENTS.publish('tick', {
+                'type': activity['type'],
+                'elapsed': elapsed,
+                'remaining': total - elapsed,
+                'total': total,
+            })
 
     @rumps.timer(1)
-    def update_timer(self, _):
-        """Update timer every second"""
+    def update_timer(self, sender):
+        """Update timer every second (sender is the rumps.Timer, or None for a direct call)"""
+        
+        # Apply changes queued by the local server before reading any state
+        self.commands.drain()
+        
+        # Single clock read for the whole tick; minute-level lookups are reused from the cache
+        now = datetime.now()
+        cache = self.tick_cache
+        cache.update_minute(now, self.is_within_schedule_hours)
+        in_schedule = cache.in_schedule
         
         # Enforce Fixed Schedule Priority:
         # If DYNAMIC_SCHEDULE is active but we are now inside fixed work hours (09:00-18:00 Weekday),
         # automatically kill the dynamic schedule to prevent conflicts.
-        if DYNAMIC_SCHEDULE_ACTIVE and self.is_within_schedule_hours():
+        if DYNAMIC_SCHEDULE_ACTIVE and in_schedule:
             print("⚠️ Entering fixed schedule hours - Terminating Dynamic Schedule")
             
             # Log current task before clearing if in WORK session
             if self.current_activity and self.current_activity.get('type') == 'WORK' and self.current_task and self.session_start_time:
                  # Calculate duration until NOW
-                 end_time = datetime.now()
+                 end_time = now
                  actual_duration_seconds = int((end_time - self.session_start_time).total_seconds())
                  duration_minutes = min(actual_duration_seconds // 60, 25)
                  duration_seconds = min(actual_duration_seconds, 25 * 60)
@@ -3515,15 +6103,15 @@ class PomodoroMenuBarApp(rumps.App):
                     'completed': True
                 }
                  self.session_logger.log_session(session_data)
-                 self.refresh_tasks_submenu()
+                 self.request_refresh()
                  
-                 rumps.notification(
+                 notify(
                     title="Schedule Switched", 
                     subtitle="Entering Fixed Work Hours",
                     message=f"Logged {duration_minutes}m on {self.current_task['name']}"
                  )
             else:
-                 rumps.notification("Schedule Switched", "Entering Fixed Work Hours", "Dynamic schedule cleared.")
+                 notify("Schedule Switched", "Entering Fixed Work Hours", "Dynamic schedule cleared.")
 
             clear_dynamic_schedule()
             # Force re-check of activity in next pass
@@ -3531,24 +6119,22 @@ class PomodoroMenuBarApp(rumps.App):
 
         # Show/hide Start Pomodoro button based on schedule hours and dynamic schedule state
         # Uses internal _menuitem (NSMenuItem) to properly hide it
-        if hasattr(self.start_stop_item, '_menuitem'):
-            should_hide = self.is_within_schedule_hours()
-            self.start_stop_item._menuitem.setHidden_(should_hide)
+        should_hide = in_schedule
+        self._show_hidden(self.start_stop_item, should_hide)
         
 
         # Update Start/Stop button title based on state
         if DYNAMIC_SCHEDULE_ACTIVE:
-            self.start_stop_item.title = "⏹️ Stop Pomodoro"
+            self._show_title(self.start_stop_item, "⏹️ Stop Pomodoro")
         else:
-            self.start_stop_item.title = "▶️ Start Pomodoro"
+            self._show_title(self.start_stop_item, "▶️ Start Pomodoro")
         
-        now = datetime.now()
-        activity = get_current_activity()
+        activity = cache.get_activity(now)
 
         # Check for Dynamic Schedule Completion
         # If schedule is active but no activity is returned, and we are not in fixed hours
         # it means we passed the end of the last dynamic session.
-        if DYNAMIC_SCHEDULE_ACTIVE and activity is None and not self.is_within_schedule_hours():
+        if DYNAMIC_SCHEDULE_ACTIVE and activity is None and not in_schedule:
              # Double check we are actually *after* the schedule started (avoid race condition at very start)
              if DYNAMIC_SCHEDULE:
                  last_item = DYNAMIC_SCHEDULE[-1]
@@ -3559,16 +6145,26 @@ class PomodoroMenuBarApp(rumps.App):
                      clear_dynamic_schedule()
                      self.reset_app_state()
                      
-                     rumps.notification(
+                     notify(
                         title="All Sessions Completed",
                         subtitle="Great job! 🎉",
                         message="You've finished your manual Pomodoro schedule."
                      )
                      
-                     self.start_stop_item.title = "▶️ Start Pomodoro"
-                     self.title = "⏸️" # Reset icon immediately
+                     self._show_title(self.start_stop_item, "▶️ Start Pomodoro")
+                     self._show_title(self, "⏸️") # Reset icon immediately
                      # activity is already None, so the display update block below will handle the rest
 
+        # Everything below reads the same snapshot of this tick's state
+        icons = cache.get_icons(self.settings_manager)
+        snapshot = TickSnapshot(
+            now=now,
+            activity=activity,
+            next_activity=cache.get_next_info_title(now, self.settings_manager.version, self.find_next_activity),
+            in_schedule=in_schedule,
+            icons=icons,
+        )
+
         # Check for activity change
         if activity != self.current_activity:
             # Session ended - save immediately, don't block for feedback
@@ -3595,9 +6191,9 @@ class PomodoroMenuBarApp(rumps.App):
                     self.current_task = self.next_task
                     self.next_task = None
                     self.task_selection_time = now
-                    self.update_task_display()
+                    self.update_task_display(snapshot=snapshot)
                     
-                    rumps.notification(
+                    notify(
                         title="Task Started",
                         subtitle=self.current_task['name'],
                         message="Work session started"
@@ -3624,13 +6220,13 @@ class PomodoroMenuBarApp(rumps.App):
                     send_notification("Break", f"Session {session}: {type_str}", "Crystal")
                     # Open Zen Mode for breaks
                     if not self.break_shown:
-                        open_break_mode(duration)
+                        self.open_break_mode(duration)
                         self.break_shown = True
                 elif type_str == "LUNCH":
                     send_notification("Lunch", "Enjoy your lunch!", "Submarine")
                     # Open Zen Mode for lunch (60 mins)
                     if not self.break_shown:
-                        open_break_mode(60)
+                        self.open_break_mode(60)
                         self.break_shown = True
         
         # Show feedback dialog after 1 minute into break (non-blocking)
@@ -3642,19 +6238,18 @@ class PomodoroMenuBarApp(rumps.App):
                     self.prompt_feedback_during_break()
                     self.feedback_shown_this_break = True
         
-        # Check for end of work day - open GO HOME page (dynamic based on SCHEDULE)
-        if SCHEDULE:
-            last_schedule_end = SCHEDULE[-1]["end"]  # e.g., "21:02"
-            end_hour, end_minute = map(int, last_schedule_end.split(":"))
-            if now.hour == end_hour and now.minute == end_minute:
-                today_date = now.date()
-                if self.last_go_home_date != today_date:
-                    self.last_go_home_date = today_date
-                    self.open_go_home_page()
-                    self.reset_app_state()  # Reset state when workday ends
+        # Check for end of work day - open GO HOME page (dynamic based on SCHEDULE's last end, cached per minute)
+        if cache.at_schedule_end:
+            today_date = now.date()
+            if self.last_go_home_date != today_date:
+                self.last_go_home_date = today_date
+                self.open_go_home_page()
+                self.reset_app_state()  # Reset state when workday ends
         
         # Check for date change to refresh menu (reset daily stats)
-        if self.last_menu_date != now.date():
+        # (compare fields first so steady-state ticks don't allocate a date)
+        last = self.last_menu_date
+        if (now.day != last.day or now.month != last.month or now.year != last.year) and last != now.date():
             self.last_menu_date = now.date()
             
             # Archive yesterday's logs to history
@@ -3662,32 +6257,37 @@ class PomodoroMenuBarApp(rumps.App):
             self.session_logger._archive_old_today_logs()
             self.session_logger.load_today_sessions()  # Reload to get fresh today data
             
-            self.refresh_tasks_submenu()
+            # Rewrite the deleted-task archive, purging tombstones past retention
+            retention_days = self.settings_manager.settings.get("archive", {}).get(
+                "retention_days", TaskArchive.DEFAULT_RETENTION_DAYS)
+            self.task_manager.compact_archive(retention_days)
+            
+            self.request_refresh()
             self.reset_app_state()  # Reset state on date change (e.g. waking up next morning)
             print(f"Date changed to {self.last_menu_date}, refreshed menu and reset state")
+        
+        # A repeating task came due (nothing was edited, so nothing else asks for a refresh)
+        if self.task_manager.update_availability(now):
+            self.request_refresh()
 
         # Update display
         if activity is None:
             # Weekend or outside work hours
             if now.weekday() >= 5:
-                self.title = "🏖️"
+                self._show_title(self, "🏖️")
             else:
-                self.title = "⏸️"
+                self._show_title(self, "⏸️")
             
-            self.time_info.title = "No active session"
-            self.next_info.title = f"Next: {self.find_next_activity()}"
-            self.task_info.title = "No task selected"
+            self._show_title(self.time_info, "No active session")
+            self._show_title(self.next_info, snapshot.next_activity)
+            self._show_title(self.task_info, "No task selected")
+            self._task_display_inputs = None  # Title written outside update_task_display
         else:
-            # Calculate time
-            start_time = datetime.strptime(activity["start"], "%H:%M").time()
-            end_time = datetime.strptime(activity["end"], "%H:%M").time()
-
-            start_dt = now.replace(hour=start_time.hour, minute=start_time.minute, second=0, microsecond=0)
-            end_dt = now.replace(hour=end_time.hour, minute=end_time.minute, second=0, microsecond=0)
-
-            total_seconds = (end_dt - start_dt).total_seconds()
+            # Calculate time (start/end are parsed once per activity)
+            cache.update_timing(activity, now)
+            start_dt = cache.start_dt
+            total_seconds = cache.total_seconds
             elapsed_seconds = (now - start_dt).total_seconds()
-            remaining_seconds = (end_dt - now).total_seconds()
 
             # Ensure values are within bounds
             elapsed_seconds = max(0, min(elapsed_seconds, total_seconds))
@@ -3699,28 +6299,37 @@ class PomodoroMenuBarApp(rumps.App):
 
             type_str = activity["type"]
             session = activity["session"]
-            emoji, label = self.get_emoji_and_label(type_str)
+            emoji, label = self.get_emoji_and_label(type_str, snapshot.icons)
 
             # Update menu bar title
             if type_str == "WORK":
                 if self.current_task:
-                    task_name = self.current_task['name']
-                    if len(task_name) > 15:
-                        task_name = task_name[:12] + "..."
-                    self.title = f"WORK - {task_name} - {activity['end']}"
+                    self._show_title(self, cache.get_work_title(self.current_task, activity))
                 else:
-                    self.title = f"{mins:02d}:{secs:02d} · 🔘📝"
+                    self._show_title(self, f"{mins:02d}:{secs:02d} · 🔘📝")
             else:
-                self.title = f"{emoji} · {mins:02d}:{secs:02d}"
+                self._show_title(self, f"{emoji} · {mins:02d}:{secs:02d}")
 
             # Update info items
-            self.next_info.title = f"Next: {self.find_next_activity()}"
+            self._show_title(self.next_info, snapshot.next_activity)
             
             # Update task display
             time_str = None
             if type_str == "WORK" and self.session_start_time:
-                time_str = self.session_start_time.strftime("%H:%M:%S")
-            self.update_task_display(time_str)
+                time_str = cache.format_clock(self.session_start_time)
+            self.update_task_display(time_str, snapshot)
+
+        # Push live state to /api/events streams (skipped entirely when no page is listening)
+        if EVENTS.active:
+            self.publish_tick_events(snapshot)
+
+        # Apply any menu refresh requested since the last tick (at most one per tick)
+        self.refresh_scheduler.flush()
+        
+        # Nothing scheduled and nothing running: stop ticking every second until the
+        # next scheduled start, midnight, a manual start or a wake event
+        if sender is not None and activity is None and not DYNAMIC_SCHEDULE_ACTIVE and not in_schedule:
+            self.enter_idle_mode(sender, now)
 
 
 if __name__ == "__main__":